@@ -3,41 +3,316 @@ VAYU - NASA Competition Ready Weather App
 Enhanced with NASA POWER API Integration for Satellite-Derived Weather Data
 """
 
-from flask import Flask, render_template, request, session, redirect, url_for, jsonify
+from flask import Flask, Blueprint, render_template, request, session, redirect, url_for, jsonify, g, Response
 import os
+import click
 from dotenv import load_dotenv
-from models import db, User, WeatherLog
+from models import db, User, WeatherLog, database_config, init_schema, migrate_schema
 from utils.weather_api import WeatherAPI  # Updated to use NASA integration
-from utils.comfort_calculator import ComfortCalculator
+from utils.comfort_calculator import ComfortCalculator, PROFILE_KEYS, blend_score, classify_comfort, ml_blend_weight
 from utils.ml_engine import MLEngine
+from utils.metrics import metrics
+from utils.refresh import changed_fields, refresh_cache
+from utils.health import health_prober
+from utils.admission import begin_deadline, end_deadline, client_limiter, throttled
+from utils.sharding import HOP_HEADER, location_key, shard_router
+from utils.assets import assets
+from utils.compression import compression
+from utils.json_provider import VayuJSONProvider
+from utils.structured_logging import configure_logging, begin_request, end_request
+import math
 import uuid
+import time
 from datetime import datetime
+from typing import Any, Dict, Optional
 import logging
 
-# Configure logging for NASA API
-logging.basicConfig(level=logging.INFO)
-
 load_dotenv()
-
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'vayu-nasa-competition-2025')
+logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_DIR = os.path.join(BASE_DIR, 'database')
-os.makedirs(DB_DIR, exist_ok=True)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(DB_DIR, 'vayu.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+bp = Blueprint('vayu', __name__, cli_group=None)
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
+    """
+    Build a configured VAYU application
 
-db.init_app(app)
+    Heavy dependencies (scikit-learn, requests) are imported on first use, so
+    creating an app is cheap enough for every gunicorn worker to do at boot.
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+    Args:
+        config: Optional overrides applied on top of the environment defaults
+    """
+    configure_logging()
+
+    app = Flask(__name__)
+    app.secret_key = os.getenv('SECRET_KEY', 'vayu-nasa-competition-2025')
+
+    overrides = dict(config or {})
+    os.makedirs(DB_DIR, exist_ok=True)
+    # An overridden URI still gets backend-appropriate engine/pool options
+    app.config.update(database_config(os.path.join(DB_DIR, 'vayu.db'),
+                                      overrides.pop('SQLALCHEMY_DATABASE_URI', None)))
+    app.config['VAYU_AUTO_INIT_DB'] = os.getenv('VAYU_AUTO_INIT_DB', 'true').lower() in ('1', 'true', 'yes')
+    app.config['VAYU_BUILD_ASSETS'] = os.getenv('VAYU_BUILD_ASSETS', 'true').lower() in ('1', 'true', 'yes')
+    app.config['VAYU_SERVICE_WORKER'] = os.getenv('VAYU_SERVICE_WORKER', 'true').lower() in ('1', 'true', 'yes')
+    # Reverse proxies in front of the app (Heroku's router, nginx): client IPs come from X-Forwarded-For
+    app.config['VAYU_PROXY_HOPS'] = int(os.getenv('VAYU_PROXY_HOPS', '0'))
+    app.config.update(overrides)
+
+    if app.config['VAYU_PROXY_HOPS']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['VAYU_PROXY_HOPS'],
+                                x_proto=app.config['VAYU_PROXY_HOPS'])
+
+    app.json = VayuJSONProvider(app)
+    db.init_app(app)
+    app.register_blueprint(bp)
+    assets.init_app(app, build=app.config['VAYU_BUILD_ASSETS'])
+    compression.init_app(app)
+
+    if app.config['VAYU_AUTO_INIT_DB']:
+        with app.app_context():
+            init_schema()
+
+    return app
+
+def __getattr__(name):
+    # `gunicorn app:app` and `flask --app app` resolve the module-level app on
+    # first access instead of building it as an import side effect
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@bp.cli.command('vayu-init-db')
+def init_db_command():
+    """Create all VAYU tables that do not exist yet."""
+    init_schema()
+    click.echo('Database schema initialized')
+
+@bp.cli.command('vayu-migrate-db')
+def migrate_db_command():
+    """Apply additive schema changes (new tables and columns)."""
+    changes = migrate_schema()
+    for change in changes:
+        click.echo(change)
+    click.echo(f'{len(changes)} schema change(s) applied')
+
+@bp.cli.command('vayu-retrain')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+@click.option('--min-rows', type=int, default=10, show_default=True,
+              help='Skip locations with fewer labelled rows.')
+@click.option('--chunk-size', type=int, default=5000, show_default=True,
+              help='Rows streamed from the database per round trip.')
+def retrain_command(workers, min_rows, chunk_size):
+    """Retrain every location's comfort model in parallel."""
+    from utils.retrain import retrain_all
+
+    started = time.perf_counter()
+    reports = retrain_all(workers=workers, min_rows=min_rows, chunk_size=chunk_size)
+    click.echo(f"{'location':<32} {'rows':>8} {'r2':>8} {'seconds':>8}")
+    for report in reports:
+        if 'error' in report:
+            click.echo(f"{report['location']:<32} failed: {report['error']}")
+            continue
+        r2 = f"{report['r2']:.3f}" if report['r2'] is not None else '-'
+        click.echo(f"{report['location']:<32} {report['rows']:>8} {r2:>8} {report['seconds']:>8.3f}")
+    failed = sum('error' in report for report in reports)
+    click.echo(f'{len(reports) - failed} model(s) trained, {failed} failed '
+               f'in {time.perf_counter() - started:.2f}s')
+    if failed:
+        raise SystemExit(1)
+
+@bp.cli.command('vayu-backfill-scores')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+@click.option('--chunk-size', type=int, default=2000, show_default=True,
+              help='Rows rescored and written per transaction.')
+@click.option('--checkpoint-dir', default='.vayu-backfill', show_default=True,
+              help='Progress directory; an interrupted run resumes from it.')
+@click.option('--restart', is_flag=True, help='Ignore an existing checkpoint and start over.')
+def backfill_scores_command(workers, chunk_size, checkpoint_dir, restart):
+    """Recompute stored comfort scores with the current calculator."""
+    from flask import current_app
+    from utils.backfill import backfill_scores
+
+    result = backfill_scores(current_app.config['SQLALCHEMY_DATABASE_URI'],
+                             current_app.config['SQLALCHEMY_ENGINE_OPTIONS'],
+                             checkpoint_dir, workers=workers, chunk_size=chunk_size, restart=restart)
+    resumed = ' (resumed)' if result['resumed'] else ''
+    click.echo(f"{result['rows']} rows rescored, {result['updated']} changed in "
+               f"{result['seconds']:.2f}s ({result['rows_per_sec']:.0f} rows/sec){resumed}")
+
+@bp.cli.command('vayu-archive')
+@click.option('--older-than-days', type=int, default=int(os.getenv('VAYU_ARCHIVE_AFTER_DAYS', '90')),
+              show_default='VAYU_ARCHIVE_AFTER_DAYS or 90', help='Retention window of the live table.')
+@click.option('--batch-size', type=int, default=5000, show_default=True,
+              help='Rows moved per transaction.')
+@click.option('--vacuum', is_flag=True, help='Compact the SQLite file afterwards.')
+def archive_command(older_than_days, batch_size, vacuum):
+    """Move old weather logs into compressed columnar archive files."""
+    from datetime import timedelta
+    from sqlalchemy import text
+    from utils.archive import ARCHIVE_DIR, archive_weather_logs
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    started = time.perf_counter()
+    stats = archive_weather_logs(cutoff, batch_size)
+    click.echo(f"{stats['rows']} rows older than {cutoff:%Y-%m-%d} archived to {ARCHIVE_DIR} "
+               f"({stats['parts']} part(s), {stats['bytes'] / 1024:.1f} KiB) "
+               f"in {time.perf_counter() - started:.2f}s")
+    if vacuum and db.engine.dialect.name == 'sqlite':
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM'))
+        click.echo('SQLite database compacted')
+
+@bp.cli.command('vayu-alerts')
+@click.option('--interval', type=int, default=0,
+              help='Re-run every N seconds (default: evaluate once and exit).')
+@click.option('--horizon', type=int, default=None,
+              show_default='VAYU_ALERT_HORIZON_HOURS or 12', help='Hours ahead to look for a crossing.')
+def alerts_command(interval, horizon):
+    """Write comfort alerts for users whose score will cross their threshold."""
+    from utils.alerts import AlertEvaluator
+
+    evaluator = AlertEvaluator(horizon=horizon)
+    while True:
+        stats = evaluator.run()
+        click.echo(f"{stats['users']} subscriber(s) in {stats['cells']} cell(s): "
+                   f"{stats['evaluated']} cell(s) re-evaluated, {stats['profiles']} profile(s) scored, "
+                   f"{stats['alerts']} alert(s) written in {stats['seconds']:.2f}s")
+        if interval <= 0:
+            break
+        db.session.remove()
+        time.sleep(interval)
+
+@bp.cli.command('vayu-feedback')
+@click.option('--interval', type=int, default=0,
+              help='Re-run every N seconds (default: fold once and exit).')
+@click.option('--batch-size', type=int, default=5000, show_default=True,
+              help='Events applied per transaction.')
+@click.option('--no-train', is_flag=True, help='Only label weather logs; skip retraining.')
+def feedback_command(interval, batch_size, no_train):
+    """Fold queued feedback events into weather logs and retrain affected locations."""
+    from utils.feedback import fold_feedback
+
+    while True:
+        stats = fold_feedback(batch_size=batch_size, train=not no_train)
+        click.echo(f"{stats['events']} event(s) folded: {stats['labelled']} log(s) labelled, "
+                   f"{stats['unmatched']} without a log, {len(stats['locations'])} location(s) "
+                   f"{'touched' if no_train else 'retrained'} in {stats['seconds']:.2f}s")
+        if interval <= 0:
+            break
+        db.session.remove()
+        time.sleep(interval)
+
+@bp.cli.command('vayu-build-assets')
+def build_assets_command():
+    """Minify, fingerprint and precompress the static CSS/JS."""
+    from flask import current_app
+    from utils.assets import build_assets
+
+    manifest = build_assets(current_app.static_folder)
+    for name, hashed in manifest['assets'].items():
+        sizes = manifest['sizes'][name]
+        brotli_size = f", {sizes['brotli'] / 1024:.1f} KiB br" if 'brotli' in sizes else ''
+        click.echo(f"{name} -> {hashed}: {sizes['source'] / 1024:.1f} KiB source, "
+                   f"{sizes['minified'] / 1024:.1f} KiB minified, {sizes['gzip'] / 1024:.1f} KiB gzip{brotli_size}")
+
+@bp.cli.command('vayu-comfort-vectors')
+@click.option('--write', is_flag=True, help='Regenerate the vector file from the Python calculator.')
+def comfort_vectors_command(write):
+    """Check the Python and JS comfort scoring against the shared test vectors."""
+    from utils.comfort_vectors import VECTOR_FILE, check_js, check_python, write_vectors
+
+    if write:
+        click.echo(f'{write_vectors()} vectors written to {VECTOR_FILE}')
+    failures = check_python()
+    click.echo(f"python: {len(failures) or 'all'} {'mismatch(es)' if failures else 'vectors match'}")
+    js_failures = check_js()
+    if js_failures is None:
+        click.echo('js: skipped (node is not installed)')
+    else:
+        click.echo(f"js: {len(js_failures) or 'all'} {'mismatch(es)' if js_failures else 'vectors match'}")
+        failures += js_failures
+    for failure in failures[:20]:
+        click.echo(f'  {failure}')
+    if failures:
+        raise SystemExit(1)
+
+@bp.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    health_prober.ensure_started()
+    g.request_id = begin_request(request.headers.get('X-Request-ID'))
+    begin_deadline()
+
+def shard_key() -> Optional[str]:
+    """Shard key of a request to a location-bound route, or None for routes any node serves"""
+    endpoint, args = request.endpoint, request.view_args or {}
+    if endpoint in ('vayu.index', 'vayu.api_refresh'):
+        location = request.args.get('location')
+        if not location:
+            session_id = session.get('user_session_id')
+            user = User.query.filter_by(session_id=session_id).first() if session_id else None
+            location = (user.location if user else None) or 'New Delhi'
+        return location_key(location)
+    if endpoint in ('vayu.test_apis', 'vayu.best_time'):
+        return location_key(args['location'])
+    if endpoint == 'vayu.comfort_tile':
+        return f"tile:{args['z']}/{args['x']}/{args['y']}"
+    return None
+
+@bp.before_app_request
+def route_to_shard():
+    """Hand location-bound requests to the node that owns the location (VAYU_SHARD_NODES)"""
+    from flask import current_app
+
+    if not shard_router.enabled:
+        return None
+    if HOP_HEADER in request.headers:
+        # Already forwarded once: serve it here, for the client that asked the first node
+        client = shard_router.forwarded_client(current_app.secret_key, request.headers)
+        if client:
+            request.remote_addr = client
+        return None
+    key = shard_key()
+    if key is None:
+        return None
+    owner = shard_router.owner(key)
+    response = shard_router.forward(owner, request, current_app.secret_key) \
+        if owner != shard_router.self_node else None
+    if response is None:
+        metrics.inc('vayu_shard_requests_total', {'result': 'local'})
+        return None
+    response.headers['X-Vayu-Shard'] = owner
+    return response
+
+@bp.after_app_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        metrics.observe('vayu_http_request_duration_seconds',
+                        time.perf_counter() - started, {'endpoint': endpoint})
+        metrics.inc('vayu_http_requests_total',
+                    {'endpoint': endpoint, 'status': str(response.status_code)})
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@bp.teardown_app_request
+def clear_request_context(exc):
+    end_request()
+    end_deadline()
 
 def get_or_create_user():
     if 'user_session_id' not in session:
         session['user_session_id'] = str(uuid.uuid4())
-        logger.info(f"New session created")
+        logger.debug("New session created")
     
     user = User.query.filter_by(session_id=session['user_session_id']).first()
     if not user:
@@ -47,20 +322,77 @@ def get_or_create_user():
             browser_fingerprint=browser_id
         )
         db.session.add(user)
-        logger.info(f"Created new user")
+        logger.info("Created new user")
     
     user.last_active = datetime.utcnow()
     
     try:
         db.session.commit()
-        logger.info(f"User data saved successfully")
+        logger.debug("User data saved")
     except Exception as e:
-        logger.error(f"Database commit error: {e}")
+        logger.error("Database commit error: %s", e)
         db.session.rollback()
     
     return user
 
-@app.route('/')
+def user_profile(user: User) -> Dict[str, Any]:
+    """Comfort profile of a user (attribute access reloads values a commit expired)"""
+    return {key: getattr(user, key) for key in PROFILE_KEYS}
+
+def dashboard_payload(inputs: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The dashboard's live fields for one location and profile
+
+    `inputs` holds the location name, its WeatherFrame, the merged
+    precipitation and the ML prediction. The values match what index()
+    renders, so /api/refresh can update an open page in place.
+    """
+    frame = inputs['frame']
+    calc = ComfortCalculator(profile)
+    formula = calc.calculate(frame.conditions())
+    score = blend_score(formula['overall_score'], inputs['ml_predicted'], frame.provider)
+    comfort_level, comfort_color = classify_comfort(score)
+    hourly_scores = calc.score_frame(frame)
+    temperature = frame.current['temperature']
+    return {
+        'location': inputs['location'],
+        'temperature': int(temperature),
+        'feels_like': int(temperature + 2),
+        'humidity': int(frame.current['humidity']),
+        'wind': round(frame.current['wind_speed'] * 3.6, 1),  # km/h
+        'precipitation': int(inputs['precipitation']),
+        'comfort_score': score,
+        'comfort_level': comfort_level,
+        'comfort_color': comfort_color,
+        'breakdown': formula['breakdown'],
+        'hourly': [{'time': str(frame.time[i])[11:16],
+                    'temperature': float(frame.temperature[i]),
+                    'comfort': int(round(hourly_scores[i]))}
+                   for i in range(0, min(len(frame), 24), 2)],
+    }
+
+def comfort_series(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A location's weather in the shape static/js/comfort.js scores
+
+    Embedded once in the dashboard (and on /onboarding while the location
+    is cached), so preference changes are previewed in the browser.
+    """
+    frame = inputs['frame']
+    hours = min(len(frame), 24)
+    return {
+        'location': inputs['location'],
+        'current': frame.conditions(),
+        'ml_predicted': inputs['ml_predicted'],
+        'ml_weight': ml_blend_weight(frame.provider),
+        'hourly': {
+            'time': [str(t)[11:16] for t in frame.time[:hours]],
+            **{name: getattr(frame, name)[:hours] for name in
+               ('temperature', 'humidity', 'wind_speed', 'precipitation_probability')},
+        },
+    }
+
+@bp.route('/')
 def index():
     """
     Main weather dashboard with NASA POWER API integration
@@ -74,170 +406,163 @@ def index():
         user.location = request.args.get('location')
         db.session.commit()
     
+    # A client over its rate is only served what is already cached
+    retry_after = client_limiter.admit(session['user_session_id'], request.remote_addr)
+    
     try:
         # Initialize enhanced weather API with NASA POWER
         weather_api = WeatherAPI()
+        cached = refresh_cache.stale(location) if retry_after else None
         
-        # Get coordinates
-        coords = weather_api.get_coordinates(location)
-        if not coords:
-            return render_template('index.html', 
-                                 error=f"Location '{location}' not found", 
+        if retry_after and cached is None:
+            return render_template('index.html',
+                                 error="Too many requests, please try again in a moment",
                                  user=user,
-                                 api_info=weather_api.get_api_status())
-        
-        # Fetch weather data (NASA POWER primary, Open-Meteo fallback)
-        print(f"🌍 Fetching weather for {coords['name']} ({coords['lat']}, {coords['lon']})")
-        weather_data = weather_api.fetch_weather(coords['lat'], coords['lon'], use_nasa=True)
-        
-        if not weather_data:
-            return render_template('index.html', 
-                                 error="Weather data temporarily unavailable", 
-                                 user=user, 
                                  location=location,
-                                 api_info=weather_api.get_api_status())
-        
-        # Process current weather for VAYU compatibility
-        current_weather = {
-            'temperature': weather_data['current_weather']['temperature'],
-            'windspeed_10m': weather_data['current_weather']['windspeed'],
-            'relativehumidity_2m': weather_data['hourly']['relativehumidity_2m'][0] if weather_data.get('hourly') else 50,
-            'precipitation_probability': weather_data['hourly']['precipitation_probability'][0] if weather_data.get('hourly') else 0,
-            'icon': '🛰️',  # NASA satellite icon
-            'description': f"NASA {weather_data.get('api_provider', 'Weather')} Data"
-        }
-        
-        print(f"🌡️ Current weather: {current_weather['temperature']}°C, {current_weather['relativehumidity_2m']}% humidity")
+                                 api_info=weather_api.get_api_status()), 429, {'Retry-After': str(math.ceil(retry_after))}
         
-        # Calculate comfort score using VAYU algorithm
-        comfort_calc = ComfortCalculator(user.__dict__)
-        formula_comfort_result = comfort_calc.calculate(current_weather)
-
-        def get_enhanced_precipitation(nasa_data, lat, lon):
-            """Combine NASA data with real-time precipitation"""
+        if cached is None:
+            # Get coordinates
+            coords = weather_api.get_coordinates(location)
             
-            # Try to get NASA precipitation first
-            nasa_precip = 0
-            if nasa_data.get('hourly', {}).get('precipitation_probability'):
-                nasa_precip = nasa_data['hourly']['precipitation_probability'][0]
+            # Fetch weather data (NASA POWER primary, Open-Meteo fallback)
+            frame = weather_api.fetch_weather(coords['lat'], coords['lon'], use_nasa=True) if coords else None
             
-            # If NASA has no rain data, get real-time
-            if nasa_precip == 0:
-                try:
-                    import requests
-                    url = "https://api.open-meteo.com/v1/forecast"
-                    params = {
-                        'latitude': lat,
-                        'longitude': lon,
-                        'hourly': 'precipitation_probability',
-                        'forecast_days': 1
-                    }
-                    
-                    response = requests.get(url, params=params, timeout=5)
-                    if response.status_code == 200:
-                        data = response.json()
-                        realtime_precip = data.get('hourly', {}).get('precipitation_probability', [0])[0]
-                        print(f"🌧️ Using real-time precipitation: {realtime_precip}%")
-                        return realtime_precip
-                except:
-                    pass
-            
-            print(f"🌧️ Using NASA precipitation: {nasa_precip}%")
-            return nasa_precip
-
-        real_precipitation = get_enhanced_precipitation(weather_data, coords['lat'], coords['lon'])
-        current_weather['precipitation_probability'] = real_precipitation
-
-        # Log weather and comfort data for ML learning
-        weather_log = WeatherLog(
-            user_id=user.id,
-            location=coords['name'],
-            temperature=current_weather['temperature'],
-            humidity=current_weather['relativehumidity_2m'],
-            wind_speed=current_weather['windspeed_10m'],
-            precipitation=current_weather['precipitation_probability'],
-            comfort_score=formula_comfort_result['overall_score']
-        )
-
-        db.session.add(weather_log)
-        db.session.commit()
-        logger.info(f"Weather data logged successfully")
+            # Providers failing, slow or over their outbound budget: show the last dashboard built here
+            if frame is None:
+                cached = refresh_cache.stale(location)
+            if cached is None and not coords:
+                return render_template('index.html', 
+                                     error="Weather service is busy, please try again in a moment" if throttled()
+                                     else f"Location '{location}' not found", 
+                                     user=user,
+                                     api_info=weather_api.get_api_status())
+            if cached is None and frame is None:
+                return render_template('index.html', 
+                                     error="Weather data temporarily unavailable", 
+                                     user=user, 
+                                     location=location,
+                                     api_info=weather_api.get_api_status())
         
-        # NASA-enhanced ML prediction
-        print("🤖 Training ML model on NASA weather data...")
-        ml_engine = MLEngine()
-        ml_engine.train_on_all(coords['name'])
+        if cached is not None:
+            coords = {'name': cached['location']}
+            frame = cached['frame']
+            logger.info("Serving cached dashboard", extra={'fields': {
+                'location': coords['name'], 'throttled': bool(retry_after)}})
         
-        ml_predicted = ml_engine.predict_and_store(coords['name'], {
-            'temperature': current_weather['temperature'],
-            'humidity': current_weather['relativehumidity_2m'],
-            'wind_speed': current_weather['windspeed_10m'],
-            'precipitation': current_weather['precipitation_probability']
+        # Current conditions for scoring and the template
+        current_weather = frame.conditions()
+        current_weather.update({
+            'icon': '🛰️',  # NASA satellite icon
+            'description': f"NASA {frame.provider} Data"
         })
         
-        if weather_data.get('api_provider') == 'NASA POWER':
-            beta = 0.4  # Higher ML weight for NASA's high-quality satellite data
+        logger.debug("Current weather: %s°C, %s%% humidity",
+                     current_weather['temperature'], current_weather['relativehumidity_2m'])
+        
+        # Calculate comfort score using VAYU algorithm
+        with metrics.stage('scoring'):
+            comfort_calc = ComfortCalculator(user_profile(user))
+            formula_comfort_result = comfort_calc.calculate(current_weather)
+
+        if cached is not None:
+            # Conditions the user has already seen: no new training row, the stored prediction
+            real_precipitation = cached['precipitation']
+            ml_predicted = cached['ml_predicted']
+            current_weather['precipitation_probability'] = real_precipitation
         else:
-            beta = 0.3  # Standard blending for fallback data
+            with metrics.stage('precipitation'):
+                # NASA's rain chance, or Open-Meteo's when NASA has no rain data for the day
+                real_precipitation = weather_api.merged_current(frame)['precipitation_probability']
+            current_weather['precipitation_probability'] = real_precipitation
+
+            # Log weather and comfort data for ML learning
+            weather_log = WeatherLog(
+                user_id=user.id,
+                location=coords['name'],
+                temperature=current_weather['temperature'],
+                humidity=current_weather['relativehumidity_2m'],
+                wind_speed=current_weather['windspeed_10m'],
+                precipitation=current_weather['precipitation_probability'],
+                comfort_score=formula_comfort_result['overall_score']
+            )
+
+            with metrics.stage('db_commit'):
+                db.session.add(weather_log)
+                db.session.commit()
+            logger.debug("Weather data logged")
             
-        final_score = round(beta * ml_predicted + (1 - beta) * formula_comfort_result['overall_score'])
-        
-        # Enhanced comfort classification
-        def classify_comfort_nasa(score):
-            """NASA-enhanced comfort classification"""
-            if score >= 85:
-                return "Excellent Conditions", "green"
-            elif score >= 70:
-                return "Very Comfortable", "lightgreen"
-            elif score >= 55:
-                return "Comfortable", "orange"
-            elif score >= 35:
-                return "Uncomfortable", "red"
-            else:
-                return "Poor Conditions", "darkred"
+            # NASA-enhanced ML prediction
+            ml_engine = MLEngine()
+            with metrics.stage('training'):
+                ml_engine.train_on_all(coords['name'])
+            
+            with metrics.stage('prediction'):
+                ml_predicted = ml_engine.predict_and_store(coords['name'], {
+                    'temperature': current_weather['temperature'],
+                    'humidity': current_weather['relativehumidity_2m'],
+                    'wind_speed': current_weather['windspeed_10m'],
+                    'precipitation': current_weather['precipitation_probability']
+                })
         
-        comfort_level, comfort_color = classify_comfort_nasa(final_score)
+        final_score = blend_score(formula_comfort_result['overall_score'], ml_predicted, frame.provider)
+        comfort_level, comfort_color = classify_comfort(final_score)
         
         # Update comfort result with NASA-enhanced data
         formula_comfort_result.update({
             'overall_score': final_score,
             'comfort_level': comfort_level,
             'comfort_color': comfort_color,
-            'nasa_enhanced': weather_data.get('api_provider') == 'NASA POWER',
-            'data_quality': weather_data.get('data_quality', 'standard'),
-            'satellite_derived': weather_data.get('data_source') == 'NASA POWER'
+            'nasa_enhanced': frame.provider == 'NASA POWER',
+            'data_quality': frame.data_quality,
+            'satellite_derived': frame.data_source == 'NASA POWER'
         })
         
         # Enhanced weather data for template
-        if weather_data.get('api_provider') == 'NASA POWER':
+        if frame.provider == 'NASA POWER':
             current_weather.update({
-                'feels_like': weather_data.get('feels_like'),
-                'solar_irradiance': weather_data.get('solar_irradiance'),
-                'dew_point': weather_data.get('dew_point'),
+                'feels_like': frame.extras.get('feels_like'),
+                'solar_irradiance': frame.extras.get('solar_irradiance'),
+                'dew_point': frame.extras.get('dew_point'),
                 'icon': '🌤️',
                 'description': 'Current conditions' 
             })
         
-        print(f"✅ VAYU analysis complete: {final_score}% comfort (NASA-enhanced)")
+        logger.info("Comfort analysis complete", extra={'fields': {
+            'location': coords['name'], 'score': final_score,
+            'provider': frame.provider}})
+        
+        # Open tabs poll /api/refresh; seed it with what this render computed
+        refresh_inputs = {'location': coords['name'], 'frame': frame,
+                          'precipitation': real_precipitation, 'ml_predicted': ml_predicted}
+        if cached is None:
+            refresh_cache.prime(location, refresh_inputs)
+        with metrics.stage('scoring'):
+            live = dashboard_payload(refresh_inputs, user_profile(user))
         
-        return render_template('index.html',
-                               user=user,
-                               location=coords['name'],
-                               weather=current_weather,
-                               comfort=formula_comfort_result,
-                               ml_predicted=ml_predicted,
-                               api_info=weather_api.get_api_status(),
-                               nasa_enhanced=True)
+        with metrics.stage('render'):
+            return render_template('index.html',
+                                   user=user,
+                                   location=coords['name'],
+                                   weather=current_weather,
+                                   hourly=live['hourly'],
+                                   refresh_version=refresh_cache.remember(live),
+                                   refresh_interval=refresh_cache.poll_interval,
+                                   series=comfort_series(refresh_inputs),
+                                   comfort=formula_comfort_result,
+                                   ml_predicted=ml_predicted,
+                                   api_info=weather_api.get_api_status(),
+                                   nasa_enhanced=True)
     
     except Exception as e:
-        app.logger.error(f"NASA Weather API Error: {e}", exc_info=True)
+        logger.error("NASA Weather API Error: %s", e, exc_info=True)
         return render_template('index.html', 
                                error="Weather service temporarily unavailable", 
                                user=user, 
                                location=location,
                                api_info={'error': str(e)})
 
-@app.route('/onboarding', methods=['GET', 'POST'])
+@bp.route('/onboarding', methods=['GET', 'POST'])
 def onboarding():
     user = get_or_create_user()
     
@@ -250,49 +575,64 @@ def onboarding():
             user.wind_tolerance = request.form.get('wind_tolerance', 'medium')
             user.rain_preference = request.form.get('rain_preference', 'neutral')
             user.activity_level = request.form.get('activity_level', 'medium')
+            alert_threshold = request.form.get('alert_threshold', '').strip()
+            user.alert_threshold = int(alert_threshold) if alert_threshold else None
             user.settings_completed = True
             
             db.session.commit()
-            logger.info(f"Settings saved successfully")
-            return redirect(url_for('index'))
+            logger.info("Settings saved")
+            return redirect(url_for('vayu.index'))
             
         except Exception as e:
-            logger.error(f"Settings save error: {e}")
+            logger.error("Settings save error: %s", e)
             db.session.rollback()
             return render_template('onboarding.html', user=user, error="Failed to save settings")
     
-    return render_template('onboarding.html', user=user)
+    # Preview against the dashboard's cached weather; never fetched just for this page
+    inputs = refresh_cache.peek(user.location or 'New Delhi')
+    return render_template('onboarding.html', user=user,
+                           series=comfort_series(inputs) if inputs else None)
 
 
-@app.route('/feedback', methods=['POST'])
+@bp.route('/feedback', methods=['POST'])
 def feedback():
-    user = get_or_create_user()
-    feedback_type = request.form.get('feedback')
+    """
+    Append one click (form or JSON {'feedback'}) or a batch of replayed
+    offline clicks (JSON {'events': [...]}) to the feedback log
+
+    Only the event rows are written here; the weather logs they label and
+    the models they retrain are updated by the fold shortly afterwards.
+    """
+    from flask import current_app
+    from utils.feedback import feedback_folder, parse_events, record_feedback
+
+    session_id = session.get('user_session_id')
+    user = User.query.filter_by(session_id=session_id).first() if session_id else None
+    if user is None:
+        return jsonify({'status': 'error', 'message': 'No recent weather data found'})
     
-    # ADD TRY-CATCH:
     try:
-        recent_log = WeatherLog.query.filter_by(user_id=user.id).order_by(WeatherLog.timestamp.desc()).first()
-        
-        if recent_log:
-            recent_log.user_feedback = feedback_type
-            recent_log.feedback_timestamp = datetime.utcnow()
-            db.session.commit()
-            logger.info(f"Feedback saved: {feedback_type}")
-            
-            return jsonify({
-                'status': 'success',
-                'message': 'Thank you! VAYU is learning from your feedback.',
-                'nasa_enhanced': True
-            })
-        
-        return jsonify({'status': 'error', 'message': 'No recent weather data found'})
-        
+        events = parse_events(request.get_json(silent=True) or request.form)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    try:
+        accepted = record_feedback(user.id, events)
     except Exception as e:
-        logger.error(f"Feedback error: {e}")
+        logger.error("Feedback error: %s", e)
         db.session.rollback()
         return jsonify({'status': 'error', 'message': 'Failed to save feedback'})
+    
+    logger.info("Feedback saved: %d event(s)", accepted)
+    feedback_folder.schedule(current_app._get_current_object())
+    return jsonify({
+        'status': 'success',
+        'message': 'Thank you! VAYU is learning from your feedback.',
+        'accepted': accepted,
+        'nasa_enhanced': True
+    })
 
-@app.route('/api/status')
+@bp.route('/api/status')
 def api_status():
     """NASA API status endpoint for competition monitoring"""
     weather_api = WeatherAPI()
@@ -300,13 +640,18 @@ def api_status():
         'vayu_version': '2.0-NASA-Competition',
         'timestamp': datetime.now().isoformat(),
         'apis': weather_api.get_api_status(),
+        'sharding': shard_router.status(),
         'nasa_integration': 'active',
         'competition_ready': True
     })
 
-@app.route('/api/test/<location>')
+@bp.route('/api/test/<location>')
 def test_apis(location):
     """Test endpoint to compare NASA vs fallback API data"""
+    retry_after = client_limiter.admit(session.get('user_session_id'), request.remote_addr)
+    if retry_after:
+        return jsonify({'error': 'Too many requests'}), 429, {'Retry-After': str(math.ceil(retry_after))}
+    
     try:
         weather_api = WeatherAPI()
         coords = weather_api.get_coordinates(location)
@@ -325,8 +670,145 @@ def test_apis(location):
     except Exception as e:
         return jsonify({'error': str(e)})
 
+@bp.route('/api/refresh')
+def api_refresh():
+    """
+    Side-effect free dashboard update for an open tab
+
+    Send the version the page was rendered with (or last received) as
+    If-None-Match. The response is a 304 when nothing changed, otherwise
+    {'version', 'delta', 'fields'} where `fields` holds only what differs
+    from that version (everything, when the version is unknown). Nothing is
+    written: no user row, weather log, retrain or stored prediction.
+    """
+    session_id = session.get('user_session_id')
+    user = User.query.filter_by(session_id=session_id).first() if session_id else None
+    location = request.args.get('location') or (user.location if user else None) or 'New Delhi'
+    weather_api = WeatherAPI()
+
+    def build():
+        coords = weather_api.get_coordinates(location)
+        if not coords:
+            return None
+        frame = weather_api.fetch_weather(coords['lat'], coords['lon'], use_nasa=True)
+        if frame is None:
+            return None
+        precipitation = weather_api.merged_current(frame)['precipitation_probability']
+        conditions = frame.conditions()
+        return {'location': coords['name'], 'frame': frame, 'precipitation': precipitation,
+                'ml_predicted': MLEngine().predict(coords['name'], {
+                    'temperature': conditions['temperature'],
+                    'humidity': conditions['relativehumidity_2m'],
+                    'wind_speed': conditions['windspeed_10m'],
+                    'precipitation': precipitation})}
+
+    # Keep the tab on its last data while the providers (or their outbound budget) are unavailable
+    inputs = refresh_cache.inputs(location, build) or refresh_cache.stale(location)
+    if inputs is None:
+        return jsonify({'error': 'Weather data temporarily unavailable'}), 503
+
+    profile = user_profile(user) if user else {}
+    payload = dashboard_payload(inputs, profile)
+    version = refresh_cache.remember(payload)
+    if request.if_none_match.contains_weak(version):
+        response = Response(status=304)
+    else:
+        known = (refresh_cache.payload(tag) for tag in request.if_none_match.as_set(include_weak=True))
+        previous = next((payload for payload in known if payload is not None), None)
+        fields = changed_fields(previous, payload) if previous is not None else payload
+        response = jsonify({'version': version, 'delta': previous is not None, 'fields': fields})
+    response.set_etag(version)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Cookie')
+    return response
+
+@bp.route('/api/best-time/<location>')
+def best_time(location):
+    """Most comfortable weeks of the year for this user, from NASA POWER climatology"""
+    from utils.climatology import climatology
+
+    user = get_or_create_user()
+    weather_api = WeatherAPI()
+    coords = weather_api.get_coordinates(location)
+    if not coords:
+        return jsonify({'error': 'Location not found'}), 404
+
+    top = min(max(request.args.get('top', 5, type=int), 1), 52)
+    result = climatology.best_weeks(coords['lat'], coords['lon'], user_profile(user), top)
+    if result is None:
+        return jsonify({'error': 'NASA POWER history temporarily unavailable'}), 503
+
+    return jsonify({'location': coords, 'data_source': 'NASA POWER', **result})
+
+def requested_locations():
+    """Locations from ?locations=a,b,c and/or repeated ?location= arguments"""
+    from utils.compare import parse_locations
+    return parse_locations(request.args.getlist('locations') + request.args.getlist('location'))
+
+@bp.route('/compare')
+def compare():
+    """Several locations side by side for this user, in one request"""
+    from utils.compare import COMPARE_MAX_LOCATIONS, compare_locations
+
+    user = get_or_create_user()
+    names = requested_locations()
+    result = compare_locations(names, user_profile(user)) if names else {'locations': [], 'best': None}
+    with metrics.stage('render'):
+        return render_template('compare.html', user=user, names=names,
+                               max_locations=COMPARE_MAX_LOCATIONS, **result)
+
+@bp.route('/api/compare')
+def api_compare():
+    """JSON variant of /compare"""
+    from utils.compare import COMPARE_MAX_LOCATIONS, compare_locations
+
+    names = requested_locations()
+    if not names:
+        return jsonify({'error': f'Pass up to {COMPARE_MAX_LOCATIONS} locations as ?locations=a,b,c'}), 400
+    user = get_or_create_user()
+    return jsonify(compare_locations(names, user_profile(user)))
+
+@bp.route('/tiles/<int:z>/<int:x>/<int:y>.png', defaults={'fmt': 'png'})
+@bp.route('/tiles/<int:z>/<int:x>/<int:y>.json', defaults={'fmt': 'json'})
+def comfort_tile(z, x, y, fmt):
+    """Personalized comfort heatmap tile (XYZ addressing) as PNG or JSON"""
+    from flask import send_file
+    from utils.tiles import MAX_ZOOM, MIN_ZOOM, tile_renderer
+
+    if not MIN_ZOOM <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({'error': f'Tile out of range (zoom {MIN_ZOOM}-{MAX_ZOOM})'}), 404
+
+    user = get_or_create_user()
+    tile = tile_renderer.render(z, x, y, user_profile(user))
+    if tile is None:
+        return jsonify({'error': 'Weather data temporarily unavailable'}), 503
+
+    path, mimetype = (tile.png_path, 'image/png') if fmt == 'png' else (tile.json_path, 'application/json')
+    # send_file resolves relative paths against the app root, not the cwd the cache lives in
+    path = os.path.abspath(path)
+    # The key changes whenever the tile's data does, so it doubles as the ETag
+    response = send_file(path, mimetype=mimetype, etag=tile.key, max_age=300)
+    response.vary.add('Cookie')
+    return response
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Fingerprinted static asset, immutable and precompressed"""
+    return assets.send(filename)
+
+@bp.route('/sw.js')
+def service_worker():
+    """Service worker, served from the root so its scope covers every page"""
+    from flask import current_app
+    return assets.service_worker(current_app.config['VAYU_SERVICE_WORKER'])
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint with per-stage latency, cache and upstream stats"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # NASA Competition Enhancement Routes
-@app.route('/nasa-info')
+@bp.route('/nasa-info')
 def nasa_info():
     """Information page about NASA POWER integration"""
     weather_api = WeatherAPI()
@@ -349,11 +831,6 @@ def nasa_info():
 
 # Initialize database and run app
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        print("🚀 VAYU NASA Competition App Starting...")
-        print("🛰️ NASA POWER API Integration: ACTIVE")
-        print("🌍 Global Weather Coverage: ENABLED")
-        print("🤖 ML Training on NASA Data: READY")
-    
+    app = create_app()
+    logger.info("VAYU NASA Competition App Starting")
     app.run(debug=True, port=5000)
\ No newline at end of file
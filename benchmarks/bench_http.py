@@ -0,0 +1,113 @@
+"""
+VAYU HTTP Payload Benchmark
+Bytes on the wire per endpoint (identity / gzip / brotli) and JSON
+serialization CPU for the stdlib encoder vs the app's JSON provider.
+
+The app runs in-process against the zero-latency mock upstream with a
+throwaway SQLite database. Debug mode is forced off so responses take the
+same compact path as production.
+
+Usage:
+    python benchmarks/bench_http.py
+    python benchmarks/bench_http.py --repeat 500 --no-save
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from common import print_table, save_results
+from mock_upstream import start_server, upstream_env
+
+ENDPOINTS = {
+    'GET /': ('get', '/?location=London'),
+    'GET /nasa-info': ('get', '/nasa-info'),
+    'GET /api/status': ('get', '/api/status'),
+    'GET /api/test/<location>': ('get', '/api/test/London'),
+    'GET /api/refresh': ('get', '/api/refresh?location=London'),
+    'GET /api/compare': ('get', '/api/compare?locations=London,Paris,Tokyo,Lima,Sydney'),
+    'GET /tiles/<z>/<x>/<y>.json': ('get', '/tiles/6/45/26.json'),
+    'POST /feedback': ('post', '/feedback'),
+}
+
+
+def cpu_per_call(fn, repeat: int) -> float:
+    """Process CPU time per call in microseconds"""
+    fn()
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return round((time.process_time() - start) / repeat * 1e6, 1)
+
+
+def run(repeat: int):
+    import numpy as np
+
+    from app import create_app
+
+    workdir = tempfile.mkdtemp(prefix='vayu-http-')
+    os.chdir(workdir)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'http.db')}"})
+    client = app.test_client()
+    provider = app.json
+    results = {}
+
+    for name, (method, path) in ENDPOINTS.items():
+        row = {}
+        for label, accept in (('identity', 'identity'), ('gzip', 'gzip'), ('br', 'br')):
+            kwargs = {'headers': {'Accept-Encoding': accept}}
+            if method == 'post':
+                kwargs['data'] = {'feedback': 'good'}
+            response = getattr(client, method)(path, **kwargs)
+            if label != 'identity' and response.headers.get('Content-Encoding') != label:
+                continue
+            row[f'{label}_bytes'] = len(response.data)
+            if label == 'identity':
+                row['status'] = response.status_code
+                body = response.get_json(silent=True)
+        if 'gzip_bytes' in row:
+            row['saved_pct'] = round(100 * (1 - row['gzip_bytes'] / row['identity_bytes']), 1)
+        if body is not None:
+            row['json_us'] = cpu_per_call(lambda: json.dumps(body, separators=(',', ':')), repeat)
+            row['provider_us'] = cpu_per_call(lambda: provider.dumps_bytes(body), repeat)
+        results[name] = row
+
+    # An hourly series the way the calculators produce it: NumPy arrays
+    hours = 24 * 7
+    series = {'time': [f'2025-01-01T{h % 24:02d}:00' for h in range(hours)],
+              'comfort': np.random.default_rng(0).uniform(0, 100, hours),
+              'temperature': np.random.default_rng(1).normal(20, 5, hours)}
+    results['numpy hourly series (7d)'] = {
+        'identity_bytes': len(provider.dumps_bytes(series)),
+        'json_us': cpu_per_call(lambda: json.dumps({k: np.asarray(v).tolist() for k, v in series.items()},
+                                                   separators=(',', ':')), repeat),
+        'provider_us': cpu_per_call(lambda: provider.dumps_bytes(series), repeat),
+    }
+    return results, provider.backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VAYU HTTP payload benchmark')
+    parser.add_argument('--repeat', type=int, default=2000, help='Serialization calls per case')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    server = start_server()
+    os.environ.update(upstream_env(server))
+    os.environ['FLASK_DEBUG'] = '0'
+    try:
+        results, backend = run(args.repeat)
+    finally:
+        server.shutdown()
+
+    print(f"json backend: {backend}")
+    print_table(results, ['status', 'identity_bytes', 'gzip_bytes', 'br_bytes', 'saved_pct',
+                          'json_us', 'provider_us'])
+    if not args.no_save:
+        print(f"\nsaved {save_results('http', results, {'repeat': args.repeat, 'json_backend': backend})}")
+
+
+if __name__ == '__main__':
+    main()
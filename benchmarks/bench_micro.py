@@ -0,0 +1,124 @@
+"""
+VAYU Microbenchmarks
+Per-call cost of ComfortCalculator, MLEngine and the provider response parsers.
+
+Usage:
+    python benchmarks/bench_micro.py [--repeat 2000] [--no-save]
+"""
+
+import argparse
+import os
+import tempfile
+
+from common import print_table, save_results, time_call
+from mock_upstream import MockUpstream, start_server, upstream_env
+
+PROFILE = {
+    'temp_min': 18, 'temp_max': 26, 'humidity_tolerance': 'medium',
+    'wind_tolerance': 'medium', 'rain_preference': 'neutral', 'activity_level': 'medium',
+}
+WEATHER = {'temperature': 29.5, 'relativehumidity_2m': 72, 'windspeed_10m': 4.2,
+           'precipitation_probability': 35}
+
+
+def bench_calculator(repeat: int):
+    from utils.comfort_calculator import ComfortCalculator
+    import numpy as np
+    calc = ComfortCalculator(PROFILE)
+    series = [np.linspace(5, 35, 168), np.linspace(20, 95, 168), np.linspace(0, 12, 168), np.linspace(0, 100, 168)]
+    return {
+        'comfort.calculate': time_call(lambda: calc.calculate(WEATHER), repeat),
+        'comfort.construct+calculate': time_call(lambda: ComfortCalculator(PROFILE).calculate(WEATHER), repeat),
+        'comfort.score_arrays(168h)': time_call(lambda: calc.score_arrays(*series), repeat),
+    }
+
+
+def bench_parsers(repeat: int):
+    from utils.nasa_power_api import NASAPowerAPI
+    from utils.weather_frame import WeatherFrame
+
+    mock = MockUpstream()
+    nasa = NASAPowerAPI()
+    daily = mock.nasa_point({'latitude': '28.6', 'longitude': '77.2', 'start': '20250101',
+                             'end': '20250102', 'parameters': 'T2M,T2M_MIN,T2M_MAX,RH2M,WS2M,'
+                             'PRECTOTCORR,PS,T2MDEW,ALLSKY_SFC_SW_DWN'}, hourly=False)
+    parameters = daily['properties']['parameter']
+    processed = nasa._process_nasa_data(parameters, '20250102')
+    processed.update({'source': 'NASA POWER', 'data_quality': 'satellite_derived'})
+    hourly = {'time': [f'2025-01-01T{h:02d}:00' for h in range(24)],
+              'temperature': [20.0 + h % 6 for h in range(24)], 'humidity': [55.0] * 24,
+              'wind_speed': [2.5] * 24, 'precipitation': [0.1] * 24}
+    forecast = mock.forecast({'latitude': '28.6', 'longitude': '77.2', 'current_weather': 'true',
+                              'hourly': 'temperature_2m,relativehumidity_2m,windspeed_10m,precipitation_probability',
+                              'daily': 'temperature_2m_max', 'forecast_days': '7'})
+
+    return {
+        'nasa._process_nasa_data': time_call(lambda: nasa._process_nasa_data(parameters, '20250102'), repeat),
+        'frame.from_nasa': time_call(lambda: WeatherFrame.from_nasa(processed, hourly, 28.6, 77.2), repeat),
+        'frame.from_openmeteo(168h)': time_call(lambda: WeatherFrame.from_openmeteo(forecast, 28.6, 77.2), repeat),
+        'frame.to_dict': time_call(WeatherFrame.from_openmeteo(forecast, 28.6, 77.2).to_dict, repeat),
+    }
+
+
+def bench_fetch_paths(repeat: int):
+    """Full client paths (HTTP + JSON + parsing) against a zero-latency mock"""
+    server = start_server()
+    os.environ.update(upstream_env(server))
+    from utils.nasa_power_api import NASAPowerAPI
+    from utils.weather_api import WeatherAPI
+    nasa = NASAPowerAPI()
+    weather_api = WeatherAPI()
+    try:
+        return {
+            'nasa.fetch_current_weather': time_call(lambda: nasa.fetch_current_weather(28.6, 77.2), repeat, 3),
+            'nasa.get_hourly_forecast': time_call(lambda: nasa.get_hourly_forecast(28.6, 77.2), repeat, 3),
+            'weather.fetch_weather': time_call(lambda: weather_api.fetch_weather(28.6, 77.2), repeat, 3),
+        }
+    finally:
+        server.shutdown()
+
+
+def bench_ml(repeat: int):
+    from app import create_app
+    from models import db, User, bulk_insert_weather_logs
+    from utils.ml_engine import MLEngine
+
+    workdir = tempfile.mkdtemp(prefix='vayu-bench-')
+    os.chdir(workdir)  # MLEngine persists its model relative to the cwd
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}"})
+    with app.app_context():
+        user = User(session_id='bench')
+        db.session.add(user)
+        db.session.commit()
+        bulk_insert_weather_logs({'user_id': user.id, 'location': 'Bench City', 'temperature': 15 + i % 20,
+                                  'humidity': 40 + i % 50, 'wind_speed': i % 10, 'precipitation': i % 100,
+                                  'comfort_score': 50 + i % 50, 'user_feedback': 'good'} for i in range(500))
+
+        engine = MLEngine()
+        conditions = {'temperature': 25, 'humidity': 60, 'wind_speed': 3, 'precipitation': 10}
+        return {
+            'ml.train_on_all(500 rows)': time_call(lambda: engine.train_on_all('Bench City'), max(20, repeat // 50), 2),
+            'ml.predict_and_store': time_call(lambda: engine.predict_and_store('Bench City', conditions),
+                                              max(50, repeat // 10), 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VAYU microbenchmarks')
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    results = {}
+    results.update(bench_calculator(args.repeat))
+    results.update(bench_parsers(args.repeat))
+    results.update(bench_fetch_paths(max(20, args.repeat // 20)))
+    results.update(bench_ml(args.repeat))
+
+    print_table(results, ['count', 'p50_ms', 'p95_ms', 'p99_ms', 'ops_per_sec'])
+    if not args.no_save:
+        print(f"\nsaved {save_results('micro', results, {'repeat': args.repeat})}")
+
+
+if __name__ == '__main__':
+    main()
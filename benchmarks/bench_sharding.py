@@ -0,0 +1,191 @@
+"""
+VAYU Sharding Benchmark
+Runs several app processes against the mock upstream and compares upstream
+calls, latency and errors with location sharding off and on. It also
+stops one node mid-run to show its locations failing over.
+
+Every node is its own interpreter with its own working directory (models,
+tiles), as separate hosts would be, sharing one SQLite database. Clients
+spread their requests over random nodes, the way a round-robin load
+balancer would.
+
+Usage:
+    python benchmarks/bench_sharding.py --nodes 3 --clients 12 --duration 15
+"""
+
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from hashlib import md5
+from typing import Dict, List
+
+from common import REPO_ROOT, print_table, save_results, summarize
+from mock_upstream import start_server, upstream_env
+
+LOCATIONS = ['New Delhi', 'Mumbai', 'London', 'Paris', 'Tokyo', 'Nairobi', 'Lima', 'Sydney', 'Cairo',
+             'Oslo', 'Denver', 'Hanoi', 'Quito', 'Perth', 'Dakar', 'Lagos', 'Seoul', 'Riga', 'Kabul', 'Bern']
+
+# Runs inside each node's interpreter: argv is the repo root, the database URL and the port
+NODE = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from werkzeug.serving import make_server
+from app import create_app
+app = create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[2]})
+make_server('127.0.0.1', int(sys.argv[3]), app, threaded=True).serve_forever()
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_nodes(count: int, env: Dict[str, str], sharded: bool) -> List[subprocess.Popen]:
+    """Start `count` nodes one after another (each creates the schema at boot) and wait for them"""
+    import requests
+
+    workdir = tempfile.mkdtemp(prefix='vayu-shard-')
+    database = f"sqlite:///{os.path.join(workdir, 'shared.db')}"
+    ports = [free_port() for _ in range(count)]
+    urls = [f'http://127.0.0.1:{port}' for port in ports]
+    nodes = []
+    for port, url in zip(ports, urls):
+        node_dir = os.path.join(workdir, str(port))
+        os.makedirs(node_dir)
+        # Per-node lock directories, so single-flight files do not collapse fetches across "hosts"
+        node_env = dict(os.environ, **env, VAYU_BUILD_ASSETS='false',
+                        VAYU_SINGLEFLIGHT_DIR=os.path.join(node_dir, 'singleflight'),
+                        VAYU_ADMISSION_DIR=os.path.join(node_dir, 'admission'))
+        if sharded:
+            node_env.update(VAYU_SHARD_NODES=','.join(urls), VAYU_SHARD_SELF=url)
+        process = subprocess.Popen([sys.executable, '-c', NODE, REPO_ROOT, database, str(port)],
+                                   cwd=node_dir, env=node_env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        process.url = url
+        nodes.append(process)
+        deadline = time.time() + 60
+        while True:
+            try:
+                requests.get(f'{url}/api/status', timeout=5)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or time.time() > deadline:
+                    raise RuntimeError(f'node {url} did not start')
+                time.sleep(0.2)
+    return nodes
+
+
+def client_loop(urls: List[str], deadline: float, seed: int, samples: List[float],
+                errors: List[int], lock: threading.Lock):
+    import requests
+
+    rng = random.Random(seed)
+    session = requests.Session()
+    home = rng.choice(LOCATIONS)
+    while time.time() < deadline:
+        # Each request may land on any node
+        base_url = rng.choice(urls)
+        path = '/' if rng.random() < 0.3 else '/api/refresh'
+        start = time.perf_counter()
+        try:
+            ok = session.get(f'{base_url}{path}', params={'location': home}, timeout=60).status_code < 500
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            samples.append(elapsed)
+            if not ok:
+                errors[0] += 1
+
+
+def drive(urls: List[str], clients: int, duration: float, mock, stop=None) -> Dict[str, float]:
+    """Run the clients against `urls`; `stop` is a (seconds, node) pair to terminate mid-run"""
+    mock.state.calls.clear()
+    samples: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+    threads = [threading.Thread(target=client_loop, args=(urls, deadline, i, samples, errors, lock))
+               for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    if stop is not None:
+        time.sleep(stop[0])
+        stop[1].terminate()
+        # The load balancer takes it out of rotation; other nodes find out on their next forward
+        urls.remove(stop[1].url)
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    calls = dict(mock.state.calls)
+    row = summarize(samples)
+    row['rps'] = round(len(samples) / wall, 2)
+    row['errors'] = errors[0]
+    row['upstream'] = sum(calls.values())
+    row['geocode'] = sum(count for route, count in calls.items() if 'search' in route)
+    return row
+
+
+def ring_movement(nodes: int, keys: int = 20000) -> Dict[str, float]:
+    """Share of keys that change owner when a node leaves or joins, against the ideal 1/N"""
+    from utils.sharding import HashRing
+
+    names = [f'http://node-{i}' for i in range(nodes + 1)]
+    sample = [f'loc:{md5(str(i).encode()).hexdigest()}' for i in range(keys)]
+    base, fewer, more = (HashRing(names[:nodes]), HashRing(names[:nodes - 1]), HashRing(names))
+    owners = [base.owner(key) for key in sample]
+    left = sum(owners[i] != fewer.owner(key) for i, key in enumerate(sample)) / keys
+    joined = sum(owners[i] != more.owner(key) for i, key in enumerate(sample)) / keys
+    load = [owners.count(name) / keys for name in names[:nodes]]
+    return {'leave_moved': round(left, 3), 'leave_ideal': round(1 / nodes, 3),
+            'join_moved': round(joined, 3), 'join_ideal': round(1 / (nodes + 1), 3),
+            'max_share': round(max(load), 3), 'min_share': round(min(load), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VAYU sharding benchmark')
+    parser.add_argument('--nodes', type=int, default=3)
+    parser.add_argument('--clients', type=int, default=12)
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per phase')
+    parser.add_argument('--upstream-latency-ms', type=float, default=100.0)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    mock = start_server(latency_ms=args.upstream_latency_ms, jitter_ms=20)
+    env = upstream_env(mock)
+    results = {}
+    for name, sharded in (('unsharded', False), ('sharded', True)):
+        nodes = start_nodes(args.nodes, env, sharded)
+        try:
+            urls = [node.url for node in nodes]
+            results[name] = drive(urls, args.clients, args.duration, mock)
+            if sharded:
+                # Clients keep using every node, including the one that goes away
+                results['sharded, node lost'] = drive(list(urls), args.clients, args.duration, mock,
+                                                      stop=(args.duration / 3, nodes[-1]))
+        finally:
+            for node in nodes:
+                node.terminate()
+                node.wait()
+
+    print_table(results, ['count', 'rps', 'p50_ms', 'p95_ms', 'upstream', 'geocode', 'errors'])
+    movement = ring_movement(args.nodes)
+    print(f'\nring ({args.nodes} nodes): {movement}')
+    results['ring'] = movement
+    if not args.no_save:
+        params = {k: v for k, v in vars(args).items() if k != 'no_save'}
+        print(f"saved {save_results('sharding', results, params)}")
+
+
+if __name__ == '__main__':
+    main()
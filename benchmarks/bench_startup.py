@@ -0,0 +1,66 @@
+"""
+VAYU Startup Benchmark
+Measures how long a fresh interpreter takes to import the app and build it,
+which is what every gunicorn worker pays at boot.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--no-save]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+from common import REPO_ROOT, save_results
+
+# Runs inside the child interpreter; prints import and factory times in ms
+PROBE = """
+import time, sys
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+application = app.create_app({'VAYU_AUTO_INIT_DB': False})
+t2 = time.perf_counter()
+heavy = [m for m in ('sklearn', 'pandas', 'scipy') if m in sys.modules]
+print(f"{(t1 - t0) * 1000:.1f} {(t2 - t1) * 1000:.1f} {','.join(heavy) or '-'}")
+"""
+
+
+def run_once():
+    output = subprocess.check_output([sys.executable, '-c', PROBE], cwd=REPO_ROOT, text=True,
+                                     stderr=subprocess.DEVNULL)
+    import_ms, factory_ms, heavy = output.strip().split()
+    return float(import_ms), float(factory_ms), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    import_ms = [s[0] for s in samples]
+    factory_ms = [s[1] for s in samples]
+    totals = [a + b for a, b in zip(import_ms, factory_ms)]
+
+    print(f"runs:            {args.runs}")
+    print(f"import app:      median {statistics.median(import_ms):.1f} ms")
+    print(f"create_app():    median {statistics.median(factory_ms):.1f} ms")
+    print(f"total:           median {statistics.median(totals):.1f} ms, max {max(totals):.1f} ms")
+    print(f"heavy modules loaded at boot: {samples[-1][2]}")
+
+    if not args.no_save:
+        results = {'startup': {
+            'p50_ms': round(statistics.median(totals), 1),
+            'max_ms': round(max(totals), 1),
+            'import_p50_ms': round(statistics.median(import_ms), 1),
+            'factory_p50_ms': round(statistics.median(factory_ms), 1),
+            'heavy_modules': samples[-1][2],
+        }}
+        print(f"saved {save_results('startup', results, {'runs': args.runs})}")
+
+
+if __name__ == '__main__':
+    main()
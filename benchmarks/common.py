@@ -0,0 +1,98 @@
+"""
+Shared helpers for VAYU benchmarks: timing statistics and result storage.
+
+Each run is written to benchmarks/results/<benchmark>/<timestamp>-<commit>.json
+so two commits can be compared with benchmarks/compare.py.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.environ.get('VAYU_BENCH_RESULTS', os.path.join(BENCH_DIR, 'results'))
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                         text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD'], cwd=REPO_ROOT,
+                                stderr=subprocess.DEVNULL)
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    values = sorted(s * 1000 for s in samples)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3),
+    }
+
+
+def time_call(fn: Callable[[], Any], repeat: int = 1000, warmup: int = 10) -> Dict[str, float]:
+    """Run fn repeatedly and summarize per-call latency"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    summary = summarize(samples)
+    summary['ops_per_sec'] = round(repeat / sum(samples), 1) if sum(samples) else 0.0
+    return summary
+
+
+def save_results(benchmark: str, results: Dict[str, Any], params: Optional[Dict[str, Any]] = None) -> str:
+    """Persist a benchmark run and return the file path"""
+    commit = git_commit()
+    record = {
+        'benchmark': benchmark,
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'params': params or {},
+        'results': results,
+    }
+    directory = os.path.join(RESULTS_DIR, benchmark)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{datetime.now():%Y%m%dT%H%M%S}-{commit}.json")
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=2)
+    return path
+
+
+def print_table(results: Dict[str, Dict[str, Any]], columns: List[str]):
+    width = max(len(name) for name in results) if results else 10
+    print(f"{'case':<{width}}  " + '  '.join(f'{c:>10}' for c in columns))
+    for name, row in results.items():
+        cells = '  '.join(f"{row.get(c, ''):>10}" for c in columns)
+        print(f'{name:<{width}}  {cells}')
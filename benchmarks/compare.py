@@ -0,0 +1,58 @@
+"""
+Compare two stored VAYU benchmark runs.
+
+Usage:
+    python benchmarks/compare.py load                 # latest two runs of 'load'
+    python benchmarks/compare.py old.json new.json    # explicit files
+    python benchmarks/compare.py micro --metric p95_ms --threshold 10
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from common import RESULTS_DIR
+
+
+def load_pair(args):
+    if len(args.runs) == 2:
+        return [json.load(open(path)) for path in args.runs]
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, args.runs[0], '*.json')))
+    if len(files) < 2:
+        sys.exit(f"need at least two stored runs of '{args.runs[0]}' in {RESULTS_DIR}")
+    return [json.load(open(path)) for path in files[-2:]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two VAYU benchmark runs')
+    parser.add_argument('runs', nargs='+', help='benchmark name, or two result files')
+    parser.add_argument('--metric', default='p50_ms')
+    parser.add_argument('--threshold', type=float, default=5.0,
+                        help='percent change flagged as a regression')
+    args = parser.parse_args()
+
+    old, new = load_pair(args)
+    print(f"{old['benchmark']}: {old['commit']} ({old['timestamp']}) -> {new['commit']} ({new['timestamp']})")
+    print(f"{'case':<36} {'old':>10} {'new':>10} {'change':>9}")
+
+    # Latency-like metrics regress upwards, throughput metrics regress downwards
+    higher_is_better = args.metric in ('rps', 'ops_per_sec')
+    regressions = 0
+    for case, row in new['results'].items():
+        before = old['results'].get(case, {})
+        if not isinstance(row, dict) or args.metric not in row or args.metric not in before:
+            continue
+        a, b = before[args.metric], row[args.metric]
+        change = (b - a) / a * 100 if a else 0.0
+        worse = change < -args.threshold if higher_is_better else change > args.threshold
+        regressions += worse
+        flag = '  REGRESSION' if worse else ''
+        print(f"{case:<36} {a:>10.3f} {b:>10.3f} {change:>8.1f}%{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+VAYU End-to-End Load Test
+Drives '/', '/feedback' and '/api/status' with concurrent clients and reports
+throughput plus p50/p95/p99 latency per endpoint.
+
+By default the app runs in-process (threaded werkzeug server, throwaway SQLite
+database) against the local mock upstream, so no live service is touched.
+
+Usage:
+    python benchmarks/loadtest.py --clients 8 --duration 20 --upstream-latency-ms 150
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000   # existing server
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from common import print_table, save_results, summarize
+from mock_upstream import start_server, upstream_env
+
+LOCATIONS = ['New Delhi', 'Mumbai', 'London', 'Paris', 'Tokyo', 'Nairobi', 'Lima', 'Sydney']
+
+# Relative weight of each scenario in the traffic mix
+DEFAULT_MIX = {'dashboard': 6, 'feedback': 2, 'status': 2}
+
+
+def start_app(env: Dict[str, str]) -> str:
+    """Serve a fresh app instance on a free port and return its base URL"""
+    from werkzeug.serving import make_server
+
+    os.environ.update(env)
+    from app import create_app
+
+    workdir = tempfile.mkdtemp(prefix='vayu-load-')
+    os.chdir(workdir)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'load.db')}"})
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def client_loop(base_url: str, deadline: float, mix: Dict[str, int], seed: int,
+                samples: Dict[str, List[float]], errors: Dict[str, int], lock: threading.Lock):
+    import requests
+
+    rng = random.Random(seed)
+    session = requests.Session()
+    scenarios = [name for name, weight in mix.items() for _ in range(weight)]
+    home = rng.choice(LOCATIONS)
+
+    while time.time() < deadline:
+        scenario = rng.choice(scenarios)
+        start = time.perf_counter()
+        try:
+            if scenario == 'dashboard':
+                response = session.get(f'{base_url}/', params={'location': home}, timeout=60)
+            elif scenario == 'feedback':
+                response = session.post(f'{base_url}/feedback',
+                                        data={'feedback': rng.choice(['good', 'bad'])}, timeout=60)
+            else:
+                response = session.get(f'{base_url}/api/status', timeout=60)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            samples.setdefault(scenario, []).append(elapsed)
+            if not ok:
+                errors[scenario] = errors.get(scenario, 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VAYU end-to-end load test')
+    parser.add_argument('--url', help='Target an already running server instead of an in-process app')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds to run')
+    parser.add_argument('--upstream-latency-ms', type=float, default=100.0)
+    parser.add_argument('--upstream-jitter-ms', type=float, default=20.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    mock = None
+    base_url = args.url
+    if not base_url:
+        mock = start_server(latency_ms=args.upstream_latency_ms, jitter_ms=args.upstream_jitter_ms,
+                            failure_rate=args.failure_rate)
+        base_url = start_app(upstream_env(mock))
+
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    deadline = time.time() + args.duration
+    threads = [threading.Thread(target=client_loop,
+                                args=(base_url, deadline, DEFAULT_MIX, i, samples, errors, lock))
+               for i in range(args.clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    results = {}
+    for scenario, values in sorted(samples.items()):
+        row = summarize(values)
+        row['rps'] = round(len(values) / wall, 2)
+        row['errors'] = errors.get(scenario, 0)
+        results[scenario] = row
+    all_samples = [v for values in samples.values() for v in values]
+    results['all'] = dict(summarize(all_samples), rps=round(len(all_samples) / wall, 2),
+                          errors=sum(errors.values()))
+    if mock is not None:
+        results['upstream_calls'] = dict(mock.state.calls)
+
+    print_table({k: v for k, v in results.items() if k != 'upstream_calls'},
+                ['count', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'errors'])
+    if mock is not None:
+        print(f"\nupstream calls: {results['upstream_calls']}")
+    if not args.no_save:
+        params = {k: v for k, v in vars(args).items() if k != 'no_save'}
+        print(f"saved {save_results('load', results, params)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+VAYU Mock Upstream Server
+Local stand-in for NASA POWER (daily/hourly point) and Open-Meteo
+(forecast/geocoding) with configurable latency and failure injection.
+
+Point the app at it with:
+    VAYU_NASA_POWER_URL=http://127.0.0.1:8765/api/temporal
+    VAYU_OPENMETEO_URL=http://127.0.0.1:8765/v1
+    VAYU_GEOCODING_URL=http://127.0.0.1:8765/v1
+
+Usage:
+    python benchmarks/mock_upstream.py --port 8765 --latency-ms 80 --failure-rate 0.02
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_CONFIG = {
+    'latency_ms': 0.0,           # Base latency added to every upstream response
+    'jitter_ms': 0.0,            # Uniform +/- jitter on top of the base latency
+    'failure_rate': 0.0,         # Fraction of requests answered with HTTP 503
+    'nasa_latency_ms': None,     # Per-provider overrides of latency_ms
+    'openmeteo_latency_ms': None,
+    'geocoding_latency_ms': None,
+}
+
+# Open-Meteo's windspeed_unit values, as factors from m/s (its default unit is km/h)
+WIND_UNITS = {'kmh': 3.6, 'ms': 1.0, 'mph': 2.23694, 'kn': 1.94384}
+
+
+def _env_value(lat: float, lon: float, day: datetime, hour: int = 12) -> Dict[str, float]:
+    """Deterministic, plausible weather for a point and time"""
+    season = math.cos(2 * math.pi * (day.timetuple().tm_yday - 200) / 365.0)
+    hemisphere = 1 if lat >= 0 else -1
+    daily = math.sin(2 * math.pi * (hour - 9) / 24.0)
+    base = 28 - abs(lat) * 0.35 + 8 * season * hemisphere
+    seed = zlib.crc32(f'{lat:.2f}{lon:.2f}{day:%Y%m%d}'.encode()) % 1000 / 1000.0
+    temp = base + 4 * daily + (seed - 0.5) * 3
+    return {
+        'T2M': round(temp, 2),
+        'T2M_MIN': round(base - 5, 2),
+        'T2M_MAX': round(base + 5, 2),
+        'T2MDEW': round(temp - 8, 2),
+        'RH2M': round(45 + 30 * seed, 2),
+        'WS2M': round(1 + 5 * seed, 2),
+        'PRECTOTCORR': round(max(0.0, (seed - 0.6) * 20), 2),
+        'PS': 100.5,
+        'ALLSKY_SFC_SW_DWN': round(3 + 4 * seed, 2),
+    }
+
+
+class MockUpstream:
+    """State shared by all handler threads: configuration and call counters"""
+
+    def __init__(self, **config):
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update({k: v for k, v in config.items() if v is not None})
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(42)
+
+    def count(self, route: str):
+        with self._lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+
+    def delay(self, provider: str):
+        base = self.config.get(f'{provider}_latency_ms')
+        if base is None:
+            base = self.config['latency_ms']
+        jitter = self.config['jitter_ms']
+        with self._lock:
+            offset = self._rng.uniform(-jitter, jitter) if jitter else 0.0
+        seconds = max(0.0, base + offset) / 1000.0
+        if seconds:
+            time.sleep(seconds)
+
+    def should_fail(self) -> bool:
+        rate = self.config['failure_rate']
+        if not rate:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    # Response builders -------------------------------------------------
+
+    def nasa_point(self, query: Dict[str, str], hourly: bool) -> Dict[str, Any]:
+        lat = float(query.get('latitude', 0))
+        lon = float(query.get('longitude', 0))
+        start = datetime.strptime(query['start'], '%Y%m%d')
+        end = datetime.strptime(query['end'], '%Y%m%d')
+        wanted = query.get('parameters', 'T2M').split(',')
+        series: Dict[str, Dict[str, float]] = {p: {} for p in wanted}
+
+        day = start
+        while day <= end:
+            hours = range(24) if hourly else (None,)
+            for hour in hours:
+                values = _env_value(lat, lon, day, hour if hour is not None else 12)
+                key = day.strftime('%Y%m%d') + (f'{hour:02d}' if hour is not None else '')
+                for p in wanted:
+                    value = values.get(p, -999.0)
+                    # NASA reports hourly precipitation in mm/hour
+                    if hourly and p == 'PRECTOTCORR':
+                        value = round(value / 24, 3)
+                    series[p][key] = value
+            day += timedelta(days=1)
+
+        return {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat, 0]},
+            'properties': {'parameter': series},
+            'header': {'title': 'NASA/POWER mock', 'fill_value': -999.0},
+        }
+
+    def forecast(self, query: Dict[str, str]) -> Any:
+        lats = [float(v) for v in str(query.get('latitude', '0')).split(',')]
+        lons = [float(v) for v in str(query.get('longitude', '0')).split(',')]
+        points = [self._forecast_point(lat, lon, query) for lat, lon in zip(lats, lons)]
+        # Like Open-Meteo, several coordinates come back as a list
+        return points if len(points) > 1 else points[0]
+
+    def _forecast_point(self, lat: float, lon: float, query: Dict[str, str]) -> Dict[str, Any]:
+        now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        days = int(query.get('forecast_days', 7))
+        times = [now + timedelta(hours=h) for h in range(24 * days)]
+        hourly_vars = [v for v in query.get('hourly', '').split(',') if v]
+        hourly: Dict[str, List[Any]] = {'time': [t.strftime('%Y-%m-%dT%H:00') for t in times]}
+        rows = [_env_value(lat, lon, t, t.hour) for t in times]
+        wind = WIND_UNITS.get(query.get('windspeed_unit', 'kmh'), WIND_UNITS['kmh'])
+        mapping = {
+            'temperature_2m': lambda r: r['T2M'],
+            'relativehumidity_2m': lambda r: r['RH2M'],
+            'windspeed_10m': lambda r: round(r['WS2M'] * wind, 1),
+            'precipitation_probability': lambda r: int(min(100, r['PRECTOTCORR'] * 10)),
+        }
+        for var in hourly_vars:
+            if var in mapping:
+                hourly[var] = [mapping[var](r) for r in rows]
+
+        result: Dict[str, Any] = {
+            'latitude': lat,
+            'longitude': lon,
+            'generationtime_ms': 0.5,
+            'timezone': 'GMT',
+            'hourly': hourly,
+        }
+        if query.get('current_weather') == 'true':
+            current = rows[0]
+            result['current_weather'] = {
+                'temperature': current['T2M'],
+                'windspeed': round(current['WS2M'] * wind, 1),
+                'winddirection': 220,
+                'weathercode': 2,
+                'is_day': 1,
+                'time': hourly['time'][0],
+            }
+        if query.get('daily'):
+            result['daily'] = {
+                'time': [(now + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(days)],
+                'temperature_2m_max': [rows[d * 24]['T2M_MAX'] for d in range(days)],
+                'temperature_2m_min': [rows[d * 24]['T2M_MIN'] for d in range(days)],
+                'precipitation_sum': [rows[d * 24]['PRECTOTCORR'] for d in range(days)],
+            }
+        return result
+
+    def geocode(self, query: Dict[str, str]) -> Dict[str, Any]:
+        name = query.get('name', '').strip()
+        if not name or name.lower().startswith('nowhere'):
+            return {'generationtime_ms': 0.1}
+        seed = zlib.crc32(name.lower().encode())
+        return {'results': [{
+            'name': name.title(),
+            'latitude': round((seed % 12000) / 100.0 - 60, 4),
+            'longitude': round((seed // 12000 % 36000) / 100.0 - 180, 4),
+            'country': 'Mockland',
+            'timezone': 'UTC',
+        }]}
+
+
+def make_handler(state: MockUpstream):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: Any):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+            routes = {
+                '/api/temporal/daily/point': ('nasa', lambda: state.nasa_point(query, hourly=False)),
+                '/api/temporal/hourly/point': ('nasa', lambda: state.nasa_point(query, hourly=True)),
+                '/v1/forecast': ('openmeteo', lambda: state.forecast(query)),
+                '/v1/search': ('geocoding', lambda: state.geocode(query)),
+            }
+            if parsed.path == '/__mock/stats':
+                return self._send(200, {'calls': dict(state.calls), 'config': state.config})
+            if parsed.path not in routes:
+                return self._send(404, {'error': 'unknown route'})
+
+            provider, build = routes[parsed.path]
+            state.count(parsed.path)
+            state.delay(provider)
+            if state.should_fail():
+                return self._send(503, {'error': 'injected failure'})
+            self._send(200, build())
+
+        def do_POST(self):
+            # Reconfigure a running server: POST /__mock/config {"latency_ms": 200}
+            if urlparse(self.path).path != '/__mock/config':
+                return self._send(404, {'error': 'unknown route'})
+            length = int(self.headers.get('Content-Length', 0))
+            updates = json.loads(self.rfile.read(length) or b'{}')
+            state.config.update({k: v for k, v in updates.items() if k in DEFAULT_CONFIG})
+            if updates.get('reset_stats'):
+                state.calls.clear()
+            self._send(200, {'config': state.config})
+
+    return Handler
+
+
+def start_server(port: int = 0, **config) -> ThreadingHTTPServer:
+    """Start the mock in a daemon thread; port 0 picks a free port"""
+    state = MockUpstream(**config)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def upstream_env(server: ThreadingHTTPServer) -> Dict[str, str]:
+    """Environment variables that route VAYU's provider clients to the mock"""
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    return {
+        'VAYU_NASA_POWER_URL': f'{base}/api/temporal',
+        'VAYU_OPENMETEO_URL': f'{base}/v1',
+        'VAYU_GEOCODING_URL': f'{base}/v1',
+        # The mock has no quota to protect; admission limits would only throttle the benchmark
+        'VAYU_NASA_RATE': '0',
+        'VAYU_OPENMETEO_RATE': '0',
+        'VAYU_SESSION_RATE': '0',
+        'VAYU_IP_RATE': '0',
+        # Background probes would add upstream calls the benchmarks do not ask for
+        'VAYU_HEALTH_PROBE_INTERVAL': '0',
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Local NASA POWER / Open-Meteo stand-in')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--nasa-latency-ms', type=float)
+    parser.add_argument('--openmeteo-latency-ms', type=float)
+    parser.add_argument('--geocoding-latency-ms', type=float)
+    args = parser.parse_args(argv)
+
+    server = start_server(args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          failure_rate=args.failure_rate, nasa_latency_ms=args.nasa_latency_ms,
+                          openmeteo_latency_ms=args.openmeteo_latency_ms,
+                          geocoding_latency_ms=args.geocoding_latency_ms)
+    for key, value in upstream_env(server).items():
+        print(f'{key}={value}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,54 @@ VAYU Database Models
 Clean, organized database schema for user preferences and weather data
 """
 
+import logging
+import os
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
 
 db = SQLAlchemy()
+logger = logging.getLogger(__name__)
+
+def database_config(default_sqlite_path: str, url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the SQLAlchemy URI and engine options for the configured backend
+
+    The URL comes from VAYU_DATABASE_URL (or DATABASE_URL as set by most
+    hosting platforms); without one VAYU uses a local SQLite file. Server
+    databases (PostgreSQL via psycopg2, MySQL via PyMySQL) get a sized
+    connection pool so several app nodes can share state.
+
+    Args:
+        default_sqlite_path: SQLite file used when no URL is configured
+        url: Explicit database URL, overriding the environment
+    """
+    url = url or os.getenv('VAYU_DATABASE_URL') or os.getenv('DATABASE_URL')
+    if not url:
+        url = f"sqlite:///{default_sqlite_path}"
+    # Heroku-style URLs use the scheme SQLAlchemy 1.4+ no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    elif url.startswith('mysql://'):
+        url = 'mysql+pymysql://' + url[len('mysql://'):]
+
+    if url.startswith('sqlite'):
+        # SQLite has a single writer; wait for the lock instead of failing fast
+        options = {'connect_args': {'timeout': float(os.getenv('VAYU_DB_TIMEOUT', '15'))}}
+    else:
+        options = {
+            'pool_size': int(os.getenv('VAYU_DB_POOL_SIZE', '5')),
+            'max_overflow': int(os.getenv('VAYU_DB_MAX_OVERFLOW', '10')),
+            'pool_timeout': float(os.getenv('VAYU_DB_POOL_TIMEOUT', '30')),
+            'pool_recycle': int(os.getenv('VAYU_DB_POOL_RECYCLE', '1800')),
+            'pool_pre_ping': True,
+        }
+
+    return {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': options,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    }
 
 class User(db.Model):
     """User model for storing personalized weather preferences"""
@@ -23,6 +67,7 @@ class User(db.Model):
     wind_tolerance = db.Column(db.String(20), default='medium')
     rain_preference = db.Column(db.String(20), default='neutral')
     activity_level = db.Column(db.String(20), default='medium')
+    alert_threshold = db.Column(db.Integer, nullable=True)  # None = no comfort alerts
     
     # Timestamps
     browser_fingerprint = db.Column(db.String(100))
@@ -78,3 +123,147 @@ class MLPrediction(db.Model):
     
     def __repr__(self):
         return f'<MLPrediction {self.location} - Confidence: {self.confidence_score}>'
+
+class AlertOutbox(db.Model):
+    """Comfort alerts waiting for delivery (written by the alert evaluator)"""
+    __tablename__ = 'alert_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    location = db.Column(db.String(100), nullable=False)
+    
+    # Alert
+    direction = db.Column(db.String(10), nullable=False)  # 'above' or 'below'
+    threshold = db.Column(db.Integer, nullable=False)
+    current_score = db.Column(db.Integer)
+    predicted_score = db.Column(db.Integer)
+    forecast_time = db.Column(db.DateTime, nullable=False)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    delivered_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<AlertOutbox user={self.user_id} {self.direction} {self.threshold} at {self.forecast_time}>'
+
+class FeedbackEvent(db.Model):
+    """Feedback clicks, appended as they arrive and folded into weather_logs later"""
+    __tablename__ = 'feedback_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    feedback = db.Column(db.String(20), nullable=False)  # 'good', 'bad'
+    
+    # Timestamps
+    clicked_at = db.Column(db.DateTime, nullable=False)  # Earlier than received_at for replayed offline clicks
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    folded_at = db.Column(db.DateTime, index=True)  # Set by the fold that applied it; NULL until then
+    
+    def __repr__(self):
+        return f'<FeedbackEvent user={self.user_id} {self.feedback}>'
+
+class ConsumerOffset(db.Model):
+    """Last event id a log consumer has applied (read once by the feedback fold to carry over older databases)"""
+    __tablename__ = 'consumer_offsets'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ConsumerOffset {self.name} at {self.position}>'
+
+def _bulk_insert(model, rows: Iterable[Dict[str, Any]], batch_size: int) -> int:
+    """Insert plain dict rows with executemany, committing once per batch"""
+    from sqlalchemy import insert
+    statement = insert(model)
+    batch: List[Dict[str, Any]] = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(statement, batch)
+            db.session.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(statement, batch)
+        db.session.commit()
+        total += len(batch)
+    return total
+
+def bulk_insert_weather_logs(rows: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+    """
+    Insert many WeatherLog rows without building ORM objects
+
+    Rows are dicts keyed by column name; missing timestamps default to now.
+    Returns the number of rows written.
+    """
+    now = datetime.utcnow()
+    return _bulk_insert(WeatherLog, ({'timestamp': now, **row} for row in rows), batch_size)
+
+def bulk_insert_predictions(rows: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+    """Insert many MLPrediction rows; returns the number of rows written"""
+    now = datetime.utcnow()
+    return _bulk_insert(MLPrediction, ({'prediction_date': now, **row} for row in rows), batch_size)
+
+def bulk_insert_alerts(rows: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+    """Insert many AlertOutbox rows; returns the number of rows written"""
+    now = datetime.utcnow()
+    return _bulk_insert(AlertOutbox, ({'created_at': now, **row} for row in rows), batch_size)
+
+def bulk_insert_feedback(rows: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+    """Append many FeedbackEvent rows; returns the number of rows written"""
+    now = datetime.utcnow()
+    return _bulk_insert(FeedbackEvent, ({'received_at': now, 'clicked_at': now, **row} for row in rows), batch_size)
+
+def init_schema():
+    """
+    Create missing tables and add missing columns (safe to call from several
+    workers at once), so a database from an older release keeps working
+    """
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    try:
+        db.create_all()
+    except (OperationalError, ProgrammingError):
+        # Another worker won the race to CREATE TABLE; the schema exists now
+        db.session.rollback()
+    try:
+        for change in migrate_schema():
+            logger.info("Schema migrated: %s", change)
+    except (OperationalError, ProgrammingError):
+        # Another worker is adding the same columns
+        db.session.rollback()
+
+def migrate_schema():
+    """
+    Apply additive schema changes to an existing database
+
+    Creates missing tables, then adds any model column that is missing from
+    an existing table. Columns are added without NOT NULL/defaults so the
+    ALTER works on every backend; destructive changes are never attempted.
+
+    Returns:
+        List of human-readable changes that were applied
+    """
+    from sqlalchemy import inspect, text
+    changes = []
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(db.engine)
+            changes.append(f"created table {table.name}")
+            continue
+
+        existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            changes.append(f"added column {table.name}.{column.name}")
+
+    return changes
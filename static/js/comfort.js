@@ -0,0 +1,181 @@
+// VAYU comfort scoring in the browser
+// A port of ComfortCalculator (utils/comfort_calculator.py) so unsaved preferences can be
+// previewed against the embedded forecast without a server round trip.
+// Both implementations are checked against utils/comfort_vectors.json: run
+// `flask vayu-comfort-vectors` after changing either one.
+
+const VayuComfort = (function() {
+    // Preference tables, identical to the Python module's
+    const ACTIVITY_DECAY = { low: 3, medium: 5, high: 7 };
+    const HUMIDITY_RANGES = { low: [20, 50], medium: [30, 70], high: [40, 85] };
+    const WIND_RANGES_KMH = { low: [0, 15], medium: [5, 25], high: [10, 35] };
+    const RAIN_SCORES = { dislike: [100, 60, 20], neutral: [95, 75, 50], like: [80, 90, 85] };
+    const WEIGHTS = {
+        low: { temperature: 0.4, humidity: 0.3, wind: 0.1, precipitation: 0.2 },
+        medium: { temperature: 0.35, humidity: 0.25, wind: 0.15, precipitation: 0.25 },
+        high: { temperature: 0.3, humidity: 0.2, wind: 0.2, precipitation: 0.3 }
+    };
+
+    function setting(profile, key, fallback) {
+        const value = profile[key];
+        return value === undefined || value === null ? fallback : value;
+    }
+
+    // Python's round(): halves go to the even neighbour
+    function roundHalfEven(x) {
+        const floor = Math.floor(x);
+        const diff = x - floor;
+        if (diff !== 0.5) {
+            return diff < 0.5 ? floor : floor + 1;
+        }
+        return floor % 2 === 0 ? floor : floor + 1;
+    }
+
+    function temperatureComfort(profile, temperature) {
+        const tempMin = setting(profile, 'temp_min', 18);
+        const tempMax = setting(profile, 'temp_max', 26);
+        if (tempMin <= temperature && temperature <= tempMax) {
+            return 100;
+        }
+        const distance = temperature < tempMin ? tempMin - temperature : temperature - tempMax;
+        const factor = ACTIVITY_DECAY[setting(profile, 'activity_level', 'medium')] || 5;
+        return Math.max(0, 100 * Math.exp(-distance / factor));
+    }
+
+    function humidityComfort(profile, humidity) {
+        const [minComfort, maxComfort] = HUMIDITY_RANGES[setting(profile, 'humidity_tolerance', 'medium')];
+        if (minComfort <= humidity && humidity <= maxComfort) {
+            return 100;
+        }
+        const distance = humidity < minComfort ? minComfort - humidity : humidity - maxComfort;
+        return Math.max(0, 100 - distance * 1.5);
+    }
+
+    function windComfort(profile, windSpeed) {
+        const windKmh = windSpeed * 3.6;  // m/s -> km/h
+        const [minWind, maxWind] = WIND_RANGES_KMH[setting(profile, 'wind_tolerance', 'medium')];
+        if (minWind <= windKmh && windKmh <= maxWind) {
+            return 100;
+        }
+        if (windKmh < minWind) {
+            return 80;  // Too calm
+        }
+        return Math.max(0, 100 - (windKmh - maxWind) * 2.5);
+    }
+
+    function precipitationComfort(profile, precipitation) {
+        const [low, moderate, high] = RAIN_SCORES[setting(profile, 'rain_preference', 'neutral')];
+        if (precipitation <= 20) {
+            return low;
+        }
+        return precipitation <= 50 ? moderate : high;
+    }
+
+    function components(profile, temperature, humidity, windSpeed, precipitation) {
+        const weights = WEIGHTS[setting(profile, 'activity_level', 'medium')];
+        const scores = {
+            temperature: temperatureComfort(profile, temperature),
+            humidity: humidityComfort(profile, humidity),
+            wind: windComfort(profile, windSpeed),
+            precipitation: precipitationComfort(profile, precipitation)
+        };
+        // Same summation order as the Python calculator
+        scores.overall = scores.temperature * weights.temperature + scores.humidity * weights.humidity
+            + scores.wind * weights.wind + scores.precipitation * weights.precipitation;
+        return scores;
+    }
+
+    function classify(score) {
+        if (score >= 80) return ['Very Comfortable', 'green'];
+        if (score >= 60) return ['Comfortable', 'lightgreen'];
+        if (score >= 40) return ['Moderately Uncomfortable', 'orange'];
+        if (score >= 20) return ['Uncomfortable', 'red'];
+        return ['Very Uncomfortable', 'darkred'];
+    }
+
+    // Dashboard thresholds (classify_comfort)
+    function classifyDashboard(score) {
+        if (score >= 85) return ['Excellent Conditions', 'green'];
+        if (score >= 70) return ['Very Comfortable', 'lightgreen'];
+        if (score >= 55) return ['Comfortable', 'orange'];
+        if (score >= 35) return ['Uncomfortable', 'red'];
+        return ['Poor Conditions', 'darkred'];
+    }
+
+    // ComfortCalculator.calculate() without the recommendation text
+    function score(profile, weather) {
+        const scores = components(profile,
+            setting(weather, 'temperature', 20), setting(weather, 'relativehumidity_2m', 50),
+            setting(weather, 'windspeed_10m', 0), setting(weather, 'precipitation_probability', 0));
+        const overallScore = roundHalfEven(scores.overall);
+        const [level, color] = classify(scores.overall);
+        return {
+            scores: scores,
+            overall_score: overallScore,
+            comfort_level: level,
+            comfort_color: color,
+            breakdown: {
+                temperature: roundHalfEven(scores.temperature),
+                humidity: roundHalfEven(scores.humidity),
+                wind: roundHalfEven(scores.wind),
+                precipitation: roundHalfEven(scores.precipitation)
+            }
+        };
+    }
+
+    // ComfortCalculator.score_frame(): overall score per hour of an hourly series
+    function scoreSeries(profile, hourly) {
+        return hourly.temperature.map((temperature, i) => components(profile, temperature,
+            hourly.humidity[i], hourly.wind_speed[i], hourly.precipitation_probability[i]).overall);
+    }
+
+    // blend_score(): formula score mixed with the location model's prediction
+    function blend(formulaScore, mlPredicted, mlWeight) {
+        if (mlPredicted === null || mlPredicted === undefined) {
+            return roundHalfEven(formulaScore);
+        }
+        return roundHalfEven(mlWeight * mlPredicted + (1 - mlWeight) * formulaScore);
+    }
+
+    // Replays utils/comfort_vectors.json; returns the fields that disagree
+    function checkVectors(vectors, tolerance) {
+        const failures = [];
+        vectors.cases.forEach((testCase, i) => {
+            const result = score(testCase.profile, testCase.weather);
+            const dashboardScore = blend(result.overall_score, testCase.ml_predicted, testCase.ml_weight);
+            const [dashboardLevel, dashboardColor] = classifyDashboard(dashboardScore);
+            const actual = Object.assign({}, result, {
+                dashboard_score: dashboardScore,
+                dashboard_level: dashboardLevel,
+                dashboard_color: dashboardColor
+            });
+            Object.keys(testCase.expected).forEach(key => {
+                const expected = testCase.expected[key];
+                if (key === 'scores' || key === 'breakdown') {
+                    Object.keys(expected).forEach(part => {
+                        const limit = key === 'scores' ? tolerance : 0;
+                        if (!(Math.abs(actual[key][part] - expected[part]) <= limit)) {
+                            failures.push(`case ${i}: ${key}.${part}`);
+                        }
+                    });
+                } else if (actual[key] !== expected) {
+                    failures.push(`case ${i}: ${key}`);
+                }
+            });
+        });
+        return failures;
+    }
+
+    return {
+        score: score,
+        scoreSeries: scoreSeries,
+        blend: blend,
+        classifyDashboard: classifyDashboard,
+        roundHalfEven: roundHalfEven,
+        checkVectors: checkVectors
+    };
+})();
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = VayuComfort;
+}
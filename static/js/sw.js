@@ -0,0 +1,248 @@
+// VAYU service worker (served as /sw.js so its scope is the whole app)
+// The server prepends `const VAYU_SW = {version, precache, enabled}` for the current asset build.
+//  - /assets/*: precached at install, cache-first (fingerprinted, never change)
+//  - /: a repeat open renders the last dashboard from cache; the page then refreshes in place
+//  - /api/refresh: latest comfort payload per location, stale-while-revalidate
+//  - POST /feedback: queued in IndexedDB while offline, replayed together once back online
+
+const ASSET_CACHE = 'vayu-assets-' + VAYU_SW.version;
+const PAGE_CACHE = 'vayu-pages';
+const COMFORT_CACHE = 'vayu-comfort';
+const PAGE_TTL = 10 * 60 * 1000;        // Cached dashboard served without a network round trip
+const REVALIDATE_AFTER = 60 * 1000;     // Comfort payloads younger than this are not refetched
+const QUEUE_DB = 'vayu-sw';
+const QUEUE_STORE = 'feedback';
+
+self.addEventListener('install', event => {
+    if (!VAYU_SW.enabled) {
+        self.skipWaiting();
+        return;
+    }
+    event.waitUntil(caches.open(ASSET_CACHE)
+        .then(cache => cache.addAll(VAYU_SW.precache))
+        .then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(caches.keys().then(keys => Promise.all(keys
+        .filter(key => key.startsWith('vayu-') && (!VAYU_SW.enabled || (key.startsWith('vayu-assets-') && key !== ASSET_CACHE)))
+        .map(key => caches.delete(key))))
+        .then(() => VAYU_SW.enabled ? self.clients.claim().then(replayFeedback) : self.registration.unregister()));
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (!VAYU_SW.enabled || url.origin !== self.location.origin) return;
+
+    if (request.method === 'POST') {
+        if (url.pathname === '/feedback') {
+            event.respondWith(sendFeedback(request));
+        } else if (url.pathname === '/onboarding') {
+            // New preferences change every cached score
+            event.respondWith(Promise.all([caches.delete(PAGE_CACHE), caches.delete(COMFORT_CACHE)])
+                .then(() => fetch(request)));
+        }
+        return;
+    }
+    if (request.method !== 'GET') return;
+
+    if (url.pathname.startsWith('/assets/')) {
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname === '/api/refresh' && url.searchParams.get('location')) {
+        event.respondWith(comfortPayload(event, request, url));
+    } else if (request.mode === 'navigate' && url.pathname === '/') {
+        event.respondWith(dashboard(event, request, url));
+    }
+});
+
+self.addEventListener('sync', event => {
+    if (event.tag === 'vayu-feedback') {
+        event.waitUntil(replayFeedback());
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'vayu:online') {
+        event.waitUntil(replayFeedback());
+    }
+});
+
+// Static assets --------------------------------------------------------
+
+function cacheFirst(request) {
+    return caches.match(request, { ignoreVary: true }).then(cached => cached || fetch(request).then(response => {
+        if (response.ok) {
+            const copy = response.clone();
+            caches.open(ASSET_CACHE).then(cache => cache.put(request, copy));
+        }
+        return response;
+    }));
+}
+
+// Dashboard page ---------------------------------------------------------
+
+function storePage(response) {
+    if (!response.ok || response.redirected) return Promise.resolve();
+    const headers = new Headers(response.headers);
+    headers.set('X-Vayu-Cached-At', String(Date.now()));
+    return response.clone().blob().then(body => caches.open(PAGE_CACHE).then(cache =>
+        cache.put('/', new Response(body, { status: response.status, headers: headers }))));
+}
+
+function dashboard(event, request, url) {
+    const fromNetwork = () => fetch(request).then(response => {
+        event.waitUntil(storePage(response));
+        return response;
+    });
+    // ?location= is a search (it also changes the user's home location): always ask the server
+    if (url.search) return fromNetwork();
+
+    return caches.open(PAGE_CACHE).then(cache => cache.match('/', { ignoreVary: true })).then(cached => {
+        if (!cached) return fromNetwork();
+        if (Date.now() - Number(cached.headers.get('X-Vayu-Cached-At') || 0) >= PAGE_TTL) {
+            // Older copy: still render it at once, and replace it for the next open
+            event.waitUntil(fromNetwork().catch(() => {}));
+        }
+        return cached;
+    });
+}
+
+// Comfort JSON (/api/refresh) ------------------------------------------
+
+function etagValue(header) {
+    return (header || '').replace(/^W\//, '').replace(/"/g, '');
+}
+
+function comfortKey(url) {
+    return '/api/refresh?location=' + encodeURIComponent(url.searchParams.get('location').trim().toLowerCase());
+}
+
+function readComfort(cache, key) {
+    return cache.match(key).then(response => response ? response.json() : null);
+}
+
+function writeComfort(cache, key, entry) {
+    return cache.put(key, new Response(JSON.stringify(entry), { headers: { 'Content-Type': 'application/json' } }));
+}
+
+// Fetch the latest payload, sending the cached version so the server can answer 304 or a delta
+function revalidate(cache, key, url, cached) {
+    const headers = cached ? { 'If-None-Match': '"' + cached.version + '"' } : {};
+    return fetch(url.pathname + url.search, { headers: headers, credentials: 'same-origin' }).then(response => {
+        if (response.status === 304 && cached) {
+            cached.stored = Date.now();
+            return writeComfort(cache, key, cached).then(() => cached);
+        }
+        if (!response.ok) return cached;
+        return response.json().then(data => {
+            const fields = data.delta && cached ? Object.assign({}, cached.fields, data.fields) : data.fields;
+            const entry = { version: data.version, fields: fields, stored: Date.now() };
+            return writeComfort(cache, key, entry).then(() => entry);
+        });
+    }).catch(() => cached);
+}
+
+function comfortResponse(entry, pageVersion) {
+    if (entry.version === pageVersion) {
+        return new Response(null, { status: 304, headers: { 'ETag': '"' + entry.version + '"' } });
+    }
+    return new Response(JSON.stringify({ version: entry.version, delta: false, fields: entry.fields }),
+        { headers: { 'Content-Type': 'application/json', 'ETag': '"' + entry.version + '"' } });
+}
+
+function notifyClients(location, entry) {
+    return self.clients.matchAll({ type: 'window' }).then(clients => clients.forEach(client => client.postMessage({
+        type: 'vayu:refresh',
+        location: location,
+        payload: { version: entry.version, delta: false, fields: entry.fields }
+    })));
+}
+
+function comfortPayload(event, request, url) {
+    const pageVersion = etagValue(request.headers.get('If-None-Match'));
+    const key = comfortKey(url);
+    return caches.open(COMFORT_CACHE).then(cache => readComfort(cache, key).then(cached => {
+        if (cached && Date.now() - cached.stored < REVALIDATE_AFTER) {
+            return comfortResponse(cached, pageVersion);
+        }
+        const update = revalidate(cache, key, url, cached);
+        // Serve the cached payload at once only when the page already shows it (an unknown
+        // page version may be newer than the cache); the revalidated one is pushed to the page
+        if (cached && cached.version === pageVersion) {
+            event.waitUntil(update.then(entry => {
+                if (entry && entry.version !== cached.version) {
+                    return notifyClients(url.searchParams.get('location'), entry);
+                }
+            }));
+            return comfortResponse(cached, pageVersion);
+        }
+        return update.then(entry => entry ? comfortResponse(entry, pageVersion)
+            : new Response(JSON.stringify({ error: 'Offline' }), { status: 503, headers: { 'Content-Type': 'application/json' } }));
+    }));
+}
+
+// Offline feedback queue -------------------------------------------------
+
+function queueStore(mode, action) {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(QUEUE_DB, 1);
+        open.onupgradeneeded = () => open.result.createObjectStore(QUEUE_STORE, { keyPath: 'id', autoIncrement: true });
+        open.onerror = () => reject(open.error);
+        open.onsuccess = () => {
+            const transaction = open.result.transaction(QUEUE_STORE, mode);
+            const result = action(transaction.objectStore(QUEUE_STORE));
+            transaction.oncomplete = () => resolve(result && result.result);
+            transaction.onerror = () => reject(transaction.error);
+        };
+    });
+}
+
+function sendFeedback(request) {
+    const queued = request.clone();
+    return fetch(request).then(response => {
+        replayFeedback();
+        return response;
+    }).catch(() => queued.text()
+        .then(body => queueStore('readwrite', store => store.add({ body: body, queued_at: Date.now() })))
+        .then(() => self.registration.sync ? self.registration.sync.register('vayu-feedback').catch(() => {}) : null)
+        .then(() => new Response(JSON.stringify({
+            status: 'queued',
+            message: "You're offline. Your feedback will be sent as soon as you reconnect."
+        }), { status: 202, headers: { 'Content-Type': 'application/json' } })));
+}
+
+let replaying = null;
+const REPLAY_BATCH = 100;   // FEEDBACK_MAX_BATCH on the server
+
+function sendBatch(items) {
+    return fetch('/feedback', {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ events: items.map(item => ({
+            feedback: new URLSearchParams(item.body).get('feedback'),
+            queued_at: item.queued_at
+        })) })
+    }).then(response => {
+        if (response.status >= 500) throw new Error('feedback replay failed: ' + response.status);
+        // 4xx means the batch will never be accepted: drop it rather than retry forever
+        return queueStore('readwrite', store => items.forEach(item => store.delete(item.id)));
+    });
+}
+
+// Send the queued clicks in order, a batch per request; stop at the first network failure
+function replayFeedback() {
+    if (replaying) return replaying;
+    replaying = queueStore('readonly', store => store.getAll()).then(items => {
+        let sent = Promise.resolve();
+        for (let i = 0; i < items.length; i += REPLAY_BATCH) {
+            const batch = items.slice(i, i + REPLAY_BATCH);
+            sent = sent.then(() => sendBatch(batch));
+        }
+        return sent;
+    })
+        .catch(() => {})
+        .finally(() => { replaying = null; });
+    return replaying;
+}
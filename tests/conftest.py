@@ -0,0 +1,41 @@
+"""
+VAYU reads its configuration from the environment when a module is first
+imported. This runs before any test module imports the app, so provider
+URLs point at the local mock upstream (benchmarks/mock_upstream.py) and no
+background thread or shared state file reaches outside the test run.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from mock_upstream import start_server, upstream_env  # noqa: E402
+
+_mock = start_server()
+_state_dir = tempfile.mkdtemp(prefix='vayu-tests-')
+os.environ.update(upstream_env(_mock))
+os.environ.update({
+    'VAYU_FEEDBACK_FOLD_DELAY': '0',
+    'VAYU_BUILD_ASSETS': 'false',
+    'VAYU_SINGLEFLIGHT_DIR': os.path.join(_state_dir, 'singleflight'),
+    'VAYU_ADMISSION_DIR': os.path.join(_state_dir, 'admission'),
+})
+
+
+@pytest.fixture
+def mock_upstream():
+    _mock.state.calls.clear()
+    return _mock
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A fresh app on its own SQLite file, run from a scratch directory (models, tiles, archives)"""
+    from app import create_app
+
+    monkeypatch.chdir(tmp_path)
+    return create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'vayu.db'}"})
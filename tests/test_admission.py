@@ -0,0 +1,135 @@
+import time
+from collections import OrderedDict
+
+import pytest
+
+from utils import admission
+from utils.admission import (ClientLimiter, SharedTokenBucket, TokenBucket, UpstreamLimiter, begin_deadline,
+                             client_limiter, end_deadline, throttled)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A frozen time.time that tests move forward by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def deadline():
+    yield begin_deadline
+    end_deadline()
+
+
+def test_bucket_allows_its_burst_then_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+
+    assert [bucket.try_take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.try_take() == pytest.approx(0.5)
+
+    clock[0] += 0.5
+    assert bucket.try_take() == 0
+    # Idle time never fills past the capacity
+    clock[0] += 60
+    assert [bucket.try_take() for _ in range(4)][-1] > 0
+
+
+@pytest.mark.skipif(admission.fcntl is None, reason='shared buckets need fcntl')
+def test_shared_buckets_on_one_file_draw_from_one_budget(tmp_path, clock):
+    path = str(tmp_path / 'nasa_power.bucket')
+    first, second = SharedTokenBucket(1, 2, path), SharedTokenBucket(1, 2, path)
+
+    assert first.try_take() == 0
+    assert second.try_take() == 0
+    assert first.try_take() > 0
+    assert second.try_take() > 0
+
+
+@pytest.mark.skipif(admission.fcntl is None, reason='shared buckets need fcntl')
+def test_shared_bucket_starts_full_from_a_damaged_file(tmp_path, clock):
+    path = tmp_path / 'open_meteo.bucket'
+    path.write_text('not a bucket')
+
+    assert SharedTokenBucket(1, 2, str(path)).try_take() == 0
+    assert len(path.read_text().split()) == 2
+
+
+def test_shared_bucket_falls_back_to_this_process_when_its_file_is_unusable(tmp_path, clock):
+    bucket = SharedTokenBucket(1, 1, str(tmp_path / 'missing' / 'nasa_power.bucket'))
+
+    assert bucket.try_take() == 0
+    assert bucket.try_take() > 0
+
+
+def test_upstream_call_waits_for_a_token_within_the_deadline(deadline):
+    limiter = UpstreamLimiter(rates={'nasa_power': 20}, burst_seconds=0.05, shared=False)
+    deadline(5)
+
+    assert limiter.acquire('nasa_power') is True
+    started = time.monotonic()
+    assert limiter.acquire('nasa_power') is True
+    assert time.monotonic() - started > 0.02
+    assert not throttled()
+
+
+def test_upstream_call_is_refused_when_its_token_comes_after_the_deadline(deadline):
+    limiter = UpstreamLimiter(rates={'nasa_power': 0.1}, burst_seconds=10, shared=False)
+    deadline(1)
+
+    assert limiter.acquire('nasa_power') is True
+    assert limiter.acquire('nasa_power') is False
+    assert throttled()
+    # Unlimited providers are always admitted
+    assert limiter.acquire('open_meteo') is True
+
+
+def test_upstream_call_is_refused_when_the_queue_is_full(deadline):
+    limiter = UpstreamLimiter(rates={'open_meteo': 1}, burst_seconds=1, queue=0, shared=False)
+    deadline(30)
+
+    assert limiter.acquire('open_meteo') is True
+    started = time.monotonic()
+    assert limiter.acquire('open_meteo') is False
+    assert time.monotonic() - started < 0.5
+    assert throttled()
+
+
+def test_ip_rejection_does_not_spend_the_session_budget(clock):
+    limiter = ClientLimiter(session_rate=6, ip_rate=6)  # One token each
+    assert limiter.admit('session-a', '10.0.0.1') == 0
+
+    # Same IP, new session: the IP bucket refuses, and session-b keeps its token
+    assert limiter.admit('session-b', '10.0.0.1') > 0
+    assert limiter.admit('session-b', '10.0.0.2') == 0
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """The app's client limiter at one request per address"""
+    monkeypatch.setattr(client_limiter, 'rates', {'session': 0, 'ip': 6})
+    monkeypatch.setattr(client_limiter, '_buckets', {'session': OrderedDict(), 'ip': OrderedDict()})
+
+
+def test_client_over_its_rate_gets_the_cached_dashboard(app, mock_upstream, limited):
+    client = app.test_client()
+    assert client.get('/', query_string={'location': 'Nairobi'}).status_code == 200
+    mock_upstream.state.calls.clear()
+
+    response = client.get('/', query_string={'location': 'Nairobi'})
+
+    assert response.status_code == 200
+    assert b'Nairobi' in response.data
+    assert mock_upstream.state.calls == {}
+
+
+def test_client_over_its_rate_without_a_cached_dashboard_gets_429(app, mock_upstream, limited):
+    client = app.test_client()
+    client.get('/', query_string={'location': 'Nairobi'})
+    mock_upstream.state.calls.clear()
+
+    response = client.get('/', query_string={'location': 'Atlantis'})
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert mock_upstream.state.calls == {}
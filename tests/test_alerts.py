@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from models import AlertOutbox, User, db
+from utils.alerts import AlertEvaluator, crossings
+
+
+def _crossings(scores, thresholds):
+    first, above = crossings(np.array(scores, dtype=float), np.array(thresholds, dtype=float))
+    return first.tolist(), above.tolist()
+
+
+def test_first_crossing_per_threshold():
+    scores = [70, 65, 58, 49, 55, 62]
+
+    assert _crossings(scores, [60, 50, 40, 66]) == ([2, 3, -1, 1], [True, True, True, True])
+
+
+def test_rising_scores_cross_upwards():
+    assert _crossings([30, 40, 55, 80], [50, 75]) == ([2, 3], [False, False])
+
+
+def test_touching_the_threshold_counts_as_above():
+    # >= threshold is "above", so reaching it exactly from below is a crossing
+    assert _crossings([49, 50], [50]) == ([1], [False])
+    assert _crossings([50, 50, 49], [50]) == ([2], [True])
+
+
+def test_only_the_first_crossing_is_reported():
+    assert _crossings([60, 40, 60, 40], [50]) == ([1], [True])
+
+
+def test_flat_series_never_crosses():
+    assert _crossings([55] * 6, [10, 55, 90]) == ([-1, -1, -1], [True, True, False])
+
+
+def test_no_thresholds():
+    first, above = crossings(np.array([50.0, 60.0]), np.array([], dtype=float))
+    assert first.shape == above.shape == (0,)
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        yield
+
+
+def _subscriber(session_id, threshold, location='Lima', **profile):
+    user = User(session_id=session_id, location=location, alert_threshold=threshold, **profile)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_subscribers_are_grouped_by_cell_and_profile(ctx, mock_upstream):
+    _subscriber('a', 101)
+    _subscriber('b', 101)
+    _subscriber('c', 101, temp_min=5, temp_max=12)
+    _subscriber('d', 101, location='Oslo')
+    db.session.add(User(session_id='no-alerts', location='Lima'))
+    db.session.commit()
+    evaluator = AlertEvaluator(state_path=None)
+
+    stats = evaluator.run()
+
+    assert (stats['users'], stats['cells'], stats['evaluated'], stats['profiles']) == (4, 2, 2, 3)
+    # Unreachable thresholds never alert
+    assert stats['alerts'] == 0
+    # One batched forecast request for all cells
+    assert mock_upstream.state.calls.get('/v1/forecast') == 1
+
+
+def test_unchanged_cells_are_skipped_on_the_next_run(ctx, tmp_path, mock_upstream):
+    _subscriber('a', 101)
+    state = str(tmp_path / 'alerts.json')
+    AlertEvaluator(state_path=state).run()
+
+    # A new process picks the fingerprints up from the state file
+    stats = AlertEvaluator(state_path=state).run()
+
+    assert (stats['cells'], stats['evaluated']) == (1, 0)
+
+    _subscriber('b', 101, temp_min=0, temp_max=5)
+    assert AlertEvaluator(state_path=state).run()['evaluated'] == 1
+
+
+def test_crossing_becomes_an_outbox_alert(ctx, mock_upstream, monkeypatch):
+    class FallingScores:
+        """Stands in for the calculator: the score drops from 70 to 40 over three hours"""
+
+        def __init__(self, profile):
+            pass
+
+        def score_arrays(self, temperature, humidity, wind, precipitation):
+            return {'overall': np.maximum(70 - 10 * np.arange(len(temperature)), 40.0)}
+
+    monkeypatch.setattr('utils.alerts.ComfortCalculator', FallingScores)
+    falling = _subscriber('falling', 55)
+    _subscriber('steady', 30)
+    hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    stats = AlertEvaluator(state_path=None).run()
+
+    assert stats['alerts'] == 1
+    alert = AlertOutbox.query.one()
+    assert (alert.user_id, alert.direction, alert.threshold) == (falling.id, 'below', 55)
+    assert (alert.current_score, alert.predicted_score) == (70, 50)
+    # Two hours after the evaluated hour (one more if the clock ticked over during the run)
+    assert alert.forecast_time in (hour + timedelta(hours=2), hour + timedelta(hours=3))
+
+
+def test_pending_alerts_are_not_repeated(ctx):
+    user = _subscriber('a', 60)
+    now = datetime(2025, 6, 1, 12)
+    alert = {'user_id': user.id, 'location': 'Lima', 'direction': 'below', 'threshold': 60,
+             'current_score': 70, 'predicted_score': 55, 'forecast_time': now + timedelta(hours=3)}
+
+    assert AlertEvaluator._write([alert], now) == 1
+    assert AlertEvaluator._write([alert, dict(alert, direction='above')], now) == 1
+    # Once the forecast time has passed, a new crossing alerts again
+    assert AlertEvaluator._write([alert], now + timedelta(hours=4)) == 1
+    assert AlertOutbox.query.count() == 3
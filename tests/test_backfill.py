@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+
+from models import User, WeatherLog, bulk_insert_weather_logs, db
+from utils import backfill
+from utils.backfill import _backfill_partition, backfill_scores, score_chunk
+from utils.comfort_calculator import PROFILE_KEYS, ComfortCalculator
+
+PROFILE = {'temp_min': 15, 'temp_max': 22, 'humidity_tolerance': 'low', 'wind_tolerance': 'high',
+           'rain_preference': 'like', 'activity_level': 'high'}
+
+
+def _expected(profile, temperature, humidity, wind, precipitation):
+    return ComfortCalculator(profile).calculate({
+        'temperature': temperature, 'relativehumidity_2m': humidity,
+        'windspeed_10m': wind, 'precipitation_probability': precipitation})['overall_score']
+
+
+def test_score_chunk_matches_the_calculator_and_skips_unchanged_rows():
+    profile = tuple(PROFILE[name] for name in PROFILE_KEYS)
+    current = _expected(PROFILE, 21.0, 40.0, 3.0, 10.0)
+    rows = [(1, 21.0, 40.0, 3.0, 10.0, current, *profile),
+            (2, 35.0, 90.0, 12.0, 80.0, 0, *profile),
+            (3, None, None, None, None, -1, *profile)]
+
+    updates = score_chunk(rows, {})
+
+    assert updates == [{'b_id': 2, 'b_score': _expected(PROFILE, 35.0, 90.0, 12.0, 80.0)},
+                       {'b_id': 3, 'b_score': _expected(PROFILE, 20.0, 50.0, 0.0, 0.0)}]
+
+
+@pytest.fixture
+def logs(app):
+    """120 logs with stale scores, spread over two users with different profiles"""
+    with app.app_context():
+        users = [User(session_id='warm', **PROFILE), User(session_id='default')]
+        db.session.add_all(users)
+        db.session.commit()
+        bulk_insert_weather_logs({'user_id': users[i % 2].id, 'location': 'Pune', 'temperature': 5.0 + i % 30,
+                                  'humidity': float(20 + i % 70), 'wind_speed': (i % 9) * 1.5,
+                                  'precipitation': float(i % 100), 'comfort_score': -1} for i in range(120))
+        yield app
+
+
+def _wrong_scores():
+    wrong = 0
+    for log in WeatherLog.query.all():
+        profile = {name: getattr(log.user, name) for name in PROFILE_KEYS}
+        if log.comfort_score != _expected(profile, log.temperature, log.humidity, log.wind_speed, log.precipitation):
+            wrong += 1
+    return wrong
+
+
+def test_interrupted_partition_resumes_from_its_checkpoint(logs, tmp_path, monkeypatch):
+    url, options = logs.config['SQLALCHEMY_DATABASE_URI'], logs.config['SQLALCHEMY_ENGINE_OPTIONS']
+    with logs.app_context():
+        ids = [log.id for log in WeatherLog.query.order_by(WeatherLog.id)]
+    part = {'lo': ids[0], 'hi': ids[-1]}
+    state_path = str(tmp_path / 'part-0.json')
+    real_score_chunk = backfill.score_chunk
+    chunks = []
+
+    def crash_on_third_chunk(rows, calculators):
+        chunks.append(len(rows))
+        if len(chunks) == 3:
+            raise RuntimeError('worker killed')
+        return real_score_chunk(rows, calculators)
+
+    monkeypatch.setattr(backfill, 'score_chunk', crash_on_third_chunk)
+    with pytest.raises(RuntimeError):
+        _backfill_partition(url, options, part, state_path, chunk_size=25)
+
+    with open(state_path) as f:
+        checkpoint = json.load(f)
+    # Two committed chunks; the third rolled back with its transaction
+    assert checkpoint['last_id'] == ids[49]
+    assert checkpoint['rows'] == 50
+    assert not checkpoint.get('done')
+
+    monkeypatch.setattr(backfill, 'score_chunk', real_score_chunk)
+    state = _backfill_partition(url, options, part, state_path, chunk_size=25)
+
+    assert state['done'] and state['rows'] == 120 and state['last_id'] == ids[-1]
+    with logs.app_context():
+        assert _wrong_scores() == 0
+
+
+def test_backfill_runs_partitions_in_parallel_and_cleans_up(logs, tmp_path):
+    checkpoints = str(tmp_path / 'checkpoints')
+    with logs.app_context():
+        result = backfill_scores(logs.config['SQLALCHEMY_DATABASE_URI'], logs.config['SQLALCHEMY_ENGINE_OPTIONS'],
+                                 checkpoints, workers=3, chunk_size=16)
+        assert (result['rows'], result['updated'], result['resumed']) == (120, 120, False)
+        assert _wrong_scores() == 0
+        assert not os.path.exists(checkpoints)
+
+        # Everything is current now: a second pass reads every row and writes none
+        again = backfill_scores(logs.config['SQLALCHEMY_DATABASE_URI'], logs.config['SQLALCHEMY_ENGINE_OPTIONS'],
+                                checkpoints, workers=2, chunk_size=50)
+        assert (again['rows'], again['updated']) == (120, 0)
+
+
+def test_finished_partitions_are_skipped_on_resume(logs, tmp_path):
+    checkpoints = tmp_path / 'checkpoints'
+    checkpoints.mkdir()
+    with logs.app_context():
+        ids = [log.id for log in WeatherLog.query.order_by(WeatherLog.id)]
+        middle = ids[59]
+        (checkpoints / 'plan.json').write_text(json.dumps({'partitions': [{'lo': ids[0], 'hi': middle},
+                                                                          {'lo': middle + 1, 'hi': ids[-1]}]}))
+        # The first partition finished in an earlier run (its rows were left as they are here)
+        (checkpoints / 'part-0.json').write_text(json.dumps({'last_id': middle, 'rows': 60, 'updated': 60,
+                                                             'seconds': 1.0, 'done': True}))
+
+        result = backfill_scores(logs.config['SQLALCHEMY_DATABASE_URI'], logs.config['SQLALCHEMY_ENGINE_OPTIONS'],
+                                 str(checkpoints), chunk_size=20)
+
+        assert (result['rows'], result['resumed']) == (60, True)
+        assert WeatherLog.query.filter(WeatherLog.id <= middle, WeatherLog.comfort_score == -1).count() == 60
+        assert WeatherLog.query.filter(WeatherLog.id > middle, WeatherLog.comfort_score == -1).count() == 0
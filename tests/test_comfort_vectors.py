@@ -0,0 +1,51 @@
+import json
+import shutil
+
+import pytest
+
+from utils.comfort_vectors import VECTOR_FILE, build_vectors, check_js, check_python, write_vectors
+
+needs_node = pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+
+
+def test_python_matches_the_shared_vectors():
+    assert check_python(VECTOR_FILE) == []
+
+
+def test_vector_file_is_current():
+    """The committed file is what `flask vayu-comfort-vectors --write` would produce"""
+    with open(VECTOR_FILE) as f:
+        committed = json.load(f)
+
+    assert committed == json.loads(json.dumps(build_vectors(seed=committed['seed'])))
+
+
+def test_fresh_vectors_round_trip_through_python(tmp_path):
+    path = str(tmp_path / 'vectors.json')
+
+    assert write_vectors(path, count=300, seed=7) == 300
+    assert check_python(path) == []
+
+
+@needs_node
+def test_js_port_matches_the_shared_vectors():
+    assert check_js(VECTOR_FILE) == []
+
+
+@needs_node
+def test_js_port_matches_fresh_vectors(tmp_path):
+    path = str(tmp_path / 'vectors.json')
+    write_vectors(path, count=500, seed=31)
+
+    assert check_js(path) == []
+
+
+@needs_node
+def test_js_check_catches_a_drift(tmp_path):
+    path = tmp_path / 'vectors.json'
+    write_vectors(str(path), count=5, seed=3)
+    vectors = json.loads(path.read_text())
+    vectors['cases'][0]['expected']['overall_score'] += 1
+    path.write_text(json.dumps(vectors))
+
+    assert check_js(str(path)) and check_python(str(path)) == ['case 0: overall_score']
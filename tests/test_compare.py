@@ -0,0 +1,11 @@
+from utils.comfort_calculator import classify_comfort
+
+
+def test_compare_labels_scores_like_the_dashboard(app, mock_upstream):
+    response = app.test_client().get('/api/compare', query_string={'locations': 'Pune,Lima,Oslo'})
+
+    locations = response.get_json()['locations']
+    assert len(locations) == 3
+    for entry in locations:
+        comfort = entry['comfort']
+        assert (comfort['comfort_level'], comfort['comfort_color']) == classify_comfort(comfort['overall_score'])
@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from models import ConsumerOffset, FeedbackEvent, User, WeatherLog, db
+from utils import feedback
+from utils.feedback import CONSUMER, FEEDBACK_MAX_BATCH, MAX_CLICK_AGE, fold_feedback, parse_events, record_feedback
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        yield
+
+
+def _user(session_id='u1'):
+    user = User(session_id=session_id)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _log(user, at, location='Pune'):
+    log = WeatherLog(user_id=user.id, location=location, comfort_score=50, timestamp=at)
+    db.session.add(log)
+    db.session.commit()
+    return log
+
+
+def _ms(at):
+    return (at - datetime(1970, 1, 1)).total_seconds() * 1000
+
+
+def test_parse_single_click_uses_arrival_time():
+    assert parse_events({'feedback': 'good'}, NOW) == [('good', NOW)]
+
+
+def test_parse_batch_keeps_queued_times_within_the_age_limit():
+    queued = NOW - timedelta(hours=3)
+    too_old = NOW - MAX_CLICK_AGE - timedelta(hours=1)
+    events = parse_events({'events': [{'feedback': 'bad', 'queued_at': _ms(queued)},
+                                      {'feedback': 'good', 'queued_at': _ms(too_old)},
+                                      {'feedback': 'good', 'queued_at': _ms(NOW + timedelta(hours=1))},
+                                      {'feedback': 'good', 'queued_at': 'soon'}]}, NOW)
+
+    assert [value for value, _ in events] == ['bad', 'good', 'good', 'good']
+    assert abs(events[0][1] - queued) < timedelta(milliseconds=1)
+    # Too old, from the future or unreadable: stamped with the arrival time
+    assert [at for _, at in events[1:]] == [NOW, NOW, NOW]
+
+
+@pytest.mark.parametrize('payload', [{'feedback': 'meh'}, {'events': []},
+                                     {'events': [{'feedback': 'good'}] * (FEEDBACK_MAX_BATCH + 1)},
+                                     {'events': ['good']}, [], ['good'], 'good', 1, None])
+def test_parse_rejects_bad_payloads(payload):
+    with pytest.raises(ValueError):
+        parse_events(payload, NOW)
+
+
+def test_clicks_label_the_log_shown_before_them(ctx):
+    user = _user()
+    morning = _log(user, NOW - timedelta(hours=4))
+    noon = _log(user, NOW)
+    record_feedback(user.id, [('bad', NOW - timedelta(hours=3)),   # -> morning
+                              ('good', NOW + timedelta(minutes=5)),  # -> noon
+                              ('good', NOW - timedelta(hours=5)),    # before any log
+                              ('bad', NOW + timedelta(hours=25))])   # past the lookback
+
+    stats = fold_feedback(train=False)
+
+    assert stats['events'] == 4
+    assert stats['labelled'] == 2
+    assert stats['unmatched'] == 2
+    assert stats['locations'] == ['Pune']
+    assert db.session.get(WeatherLog, morning.id).user_feedback == 'bad'
+    assert db.session.get(WeatherLog, noon.id).user_feedback == 'good'
+
+
+def test_latest_click_wins_even_when_replayed_later(ctx):
+    user = _user()
+    log = _log(user, NOW)
+    record_feedback(user.id, [('good', NOW + timedelta(minutes=30))])
+    # An offline click from before the online one arrives afterwards
+    record_feedback(user.id, [('bad', NOW + timedelta(minutes=10))])
+
+    fold_feedback(train=False)
+
+    assert db.session.get(WeatherLog, log.id).user_feedback == 'good'
+
+
+def test_clicks_only_label_their_own_users_logs(ctx):
+    alice, bob = _user('alice'), _user('bob')
+    alice_log = _log(alice, NOW)
+    bob_log = _log(bob, NOW + timedelta(minutes=1))
+    record_feedback(alice.id, [('bad', NOW + timedelta(minutes=2))])
+
+    fold_feedback(train=False)
+
+    assert db.session.get(WeatherLog, alice_log.id).user_feedback == 'bad'
+    assert db.session.get(WeatherLog, bob_log.id).user_feedback is None
+
+
+def test_fold_marks_what_it_applies_and_resumes(ctx):
+    user = _user()
+    _log(user, NOW)
+    record_feedback(user.id, [('good', NOW + timedelta(minutes=1))] * 3)
+
+    assert fold_feedback(batch_size=2, train=False)['events'] == 3
+    assert db.session.scalar(select(func.count()).where(FeedbackEvent.folded_at.is_(None))) == 0
+    assert fold_feedback(train=False)['events'] == 0
+
+    record_feedback(user.id, [('bad', NOW + timedelta(minutes=2))])
+    assert fold_feedback(train=False)['events'] == 1
+
+
+def test_an_event_that_commits_after_a_higher_id_is_still_applied(ctx):
+    user = _user()
+    log = _log(user, NOW)
+    # Id 11 commits and is folded before id 10 does, as concurrent inserts can on server databases
+    db.session.add(FeedbackEvent(id=11, user_id=user.id, feedback='good', clicked_at=NOW + timedelta(minutes=1)))
+    db.session.commit()
+    assert fold_feedback(train=False)['events'] == 1
+
+    db.session.add(FeedbackEvent(id=10, user_id=user.id, feedback='bad', clicked_at=NOW + timedelta(minutes=2)))
+    db.session.commit()
+
+    assert fold_feedback(train=False)['events'] == 1
+    assert db.session.get(WeatherLog, log.id).user_feedback == 'bad'
+
+
+def test_fold_carries_over_an_offset_from_an_older_database(ctx):
+    user = _user()
+    log = _log(user, NOW)
+    record_feedback(user.id, [('bad', NOW + timedelta(minutes=1)), ('good', NOW + timedelta(minutes=2))])
+    db.session.add(ConsumerOffset(name=CONSUMER, position=1))
+    db.session.commit()
+
+    # Event 1 was applied by the old fold; only event 2 is new
+    assert fold_feedback(train=False)['events'] == 1
+    assert db.session.get(ConsumerOffset, CONSUMER) is None
+    assert db.session.get(WeatherLog, log.id).user_feedback == 'good'
+
+
+def test_fold_that_loses_the_race_retries_with_what_is_left(ctx, monkeypatch):
+    user = _user()
+    log = _log(user, NOW)
+    record_feedback(user.id, [('bad', NOW + timedelta(minutes=1)), ('bad', NOW + timedelta(minutes=2))])
+    record_feedback(user.id, [('good', NOW + timedelta(minutes=3))])
+    latest_logs = feedback._latest_logs
+    raced = []
+
+    def other_worker_folds_first(events):
+        if not raced:
+            raced.append(True)
+            # Another worker commits the same first batch while this one is matching it
+            with db.engine.begin() as conn:
+                conn.execute(update(FeedbackEvent).where(FeedbackEvent.id <= 2).values(folded_at=NOW))
+        return latest_logs(events)
+
+    monkeypatch.setattr(feedback, '_latest_logs', other_worker_folds_first)
+
+    stats = fold_feedback(batch_size=2, train=False)
+
+    # Only the event the winner left is applied here; the raced batch is not applied twice
+    assert stats['events'] == 1
+    assert db.session.scalar(select(FeedbackEvent.folded_at).where(FeedbackEvent.id <= 2).limit(1)) == NOW
+    db.session.expire_all()
+    assert db.session.get(WeatherLog, log.id).user_feedback == 'good'
+
+
+def test_feedback_endpoint_appends_without_touching_logs(app):
+    client = app.test_client()
+    client.get('/api/status')
+    with client.session_transaction() as browser:
+        browser['user_session_id'] = 'browser-1'
+    with app.app_context():
+        user = _user('browser-1')
+        log = _log(user, datetime.utcnow() - timedelta(minutes=1))
+        log_id = log.id
+
+    response = client.post('/feedback', json={'events': [{'feedback': 'good'}, {'feedback': 'bad'}]})
+
+    assert response.status_code == 200
+    assert response.get_json()['accepted'] == 2
+    with app.app_context():
+        assert db.session.get(WeatherLog, log_id).user_feedback is None
+        fold_feedback(train=False)
+        assert db.session.get(WeatherLog, log_id).user_feedback in ('good', 'bad')
+    assert client.post('/feedback', json={'feedback': 'meh'}).status_code == 400
+    for body in (['good'], 'good', 1):
+        assert client.post('/feedback', json=body).status_code == 400
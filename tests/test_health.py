@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from utils import health
+from utils.health import FAILING_STREAK, STATS_TTL, HealthProber, ProviderHealth
+
+
+def feed(tracker, provider, seconds, ok=True, times=5, data_age=None):
+    for _ in range(times):
+        tracker.record(provider, seconds, ok, data_age=data_age, error=None if ok else 'timeout')
+
+
+def test_route_keeps_the_default_order_without_stats_for_both_providers():
+    tracker = ProviderHealth(slack=1.0)
+    assert tracker.route() == ['nasa_power', 'open_meteo']
+
+    # Only one provider measured: nothing to compare against
+    feed(tracker, 'nasa_power', 9.0, ok=False)
+    assert tracker.route() == ['nasa_power', 'open_meteo']
+
+
+def test_route_ignores_stale_stats(monkeypatch):
+    tracker = ProviderHealth(slack=1.0)
+    feed(tracker, 'nasa_power', 6.0)
+    feed(tracker, 'open_meteo', 0.2)
+    assert tracker.route() == ['open_meteo', 'nasa_power']
+
+    later = time.time() + STATS_TTL + 1
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert tracker.route() == ['nasa_power', 'open_meteo']
+
+
+def test_route_demotes_the_primary_only_beyond_the_slack():
+    tracker = ProviderHealth(slack=1.0)
+    feed(tracker, 'nasa_power', 1.0)
+    feed(tracker, 'open_meteo', 0.2)
+    assert tracker.route() == ['nasa_power', 'open_meteo']
+
+    feed(tracker, 'nasa_power', 3.0, times=10)
+    assert tracker.route() == ['open_meteo', 'nasa_power']
+
+
+def test_route_demotes_a_failing_or_stale_primary():
+    failing = ProviderHealth(slack=1.0)
+    feed(failing, 'nasa_power', 0.1)
+    feed(failing, 'open_meteo', 0.5)
+    feed(failing, 'nasa_power', 0.1, ok=False, times=FAILING_STREAK)
+    assert failing.route() == ['open_meteo', 'nasa_power']
+
+    stale = ProviderHealth(slack=1.0, max_data_age=3600)
+    feed(stale, 'nasa_power', 0.1, data_age=7200)
+    feed(stale, 'open_meteo', 0.5, data_age=60)
+    assert stale.route() == ['open_meteo', 'nasa_power']
+
+
+def test_slow_primary_stays_first_when_the_alternative_is_failing():
+    tracker = ProviderHealth(slack=1.0)
+    feed(tracker, 'nasa_power', 5.0)
+    feed(tracker, 'open_meteo', 0.1, ok=False)
+    assert tracker.route() == ['nasa_power', 'open_meteo']
+
+
+def test_snapshot_reports_status_per_provider():
+    tracker = ProviderHealth()
+    feed(tracker, 'nasa_power', 0.2, data_age=7200)
+    feed(tracker, 'open_meteo', 0.2, ok=False, times=FAILING_STREAK)
+
+    snapshot = tracker.snapshot()
+
+    assert snapshot['nasa_power']['status'] == 'healthy'
+    assert snapshot['nasa_power']['data_age_hours'] == 2.0
+    assert snapshot['open_meteo']['status'] == 'down'
+    assert snapshot['open_meteo']['last_error'] == 'timeout'
+
+
+@pytest.mark.skipif(health.fcntl is None, reason='needs file locks')
+def test_one_prober_per_host_shares_its_rounds(tmp_path, mock_upstream):
+    leader = HealthProber(interval=60, health=ProviderHealth(), shared=True, state_dir=str(tmp_path))
+    follower = HealthProber(interval=60, health=ProviderHealth(), shared=True, state_dir=str(tmp_path))
+    try:
+        assert leader.run_once() is True
+        probes = sum(mock_upstream.state.calls.values())
+        assert probes >= 2
+
+        assert follower.run_once() is False
+        assert sum(mock_upstream.state.calls.values()) == probes
+        shared = follower.health.snapshot()
+        assert shared['nasa_power']['samples'] == shared['open_meteo']['samples'] == 1
+        assert shared['nasa_power']['status'] == 'healthy'
+        # A round is loaded once
+        follower.run_once()
+        assert follower.health.snapshot()['nasa_power']['samples'] == 1
+
+        # The prober goes away; the next worker to try takes over
+        leader.stop()
+        assert follower.run_once() is True
+        assert sum(mock_upstream.state.calls.values()) > probes
+    finally:
+        leader.stop()
+        follower.stop()
+
+
+def test_every_worker_probes_without_file_locks(tmp_path, mock_upstream):
+    prober = HealthProber(interval=60, shared=False, state_dir=str(tmp_path))
+
+    assert prober.run_once() is True
+    assert not (tmp_path / 'health.json').exists()
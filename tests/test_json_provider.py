@@ -0,0 +1,28 @@
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from utils import json_provider
+from utils.json_provider import VayuJSONProvider
+
+BACKENDS = ['json'] + (['orjson'] if json_provider.orjson is not None else [])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_numpy_values_and_flask_types_serialize_on_every_backend(app, monkeypatch, backend):
+    monkeypatch.setattr(json_provider, 'JSON_BACKEND', backend)
+    provider = VayuJSONProvider(app)
+    payload = {'scores': np.array([61, 72]), 'mean': np.float64(66.5), 'day': date(2025, 1, 1),
+               'ratio': Decimal('0.5')}
+
+    assert provider.loads(provider.dumps_bytes(payload)) == {
+        'day': 'Wed, 01 Jan 2025 00:00:00 GMT', 'mean': 66.5, 'ratio': '0.5', 'scores': [61, 72]}
+
+
+def test_unknown_types_are_still_refused(app, monkeypatch):
+    monkeypatch.setattr(json_provider, 'JSON_BACKEND', 'json')
+
+    with pytest.raises(TypeError):
+        VayuJSONProvider(app).dumps(object())
@@ -0,0 +1,33 @@
+from utils.metrics import MetricsRegistry
+
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.inc('vayu_test_total', {'error': 'bad "quote"\\path\nnext line'})
+
+    lines = registry.render().splitlines()
+
+    assert 'vayu_test_total{error="bad \\"quote\\"\\\\path\\nnext line"} 1' in lines
+    assert all(line.startswith(('#', 'vayu_test_total{')) for line in lines)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    for value in (0.002, 0.02, 2.0):
+        registry.observe('vayu_test_seconds', value, buckets=(0.01, 0.1, 1.0))
+
+    text = registry.render()
+
+    assert 'vayu_test_seconds_bucket{le="0.01"} 1' in text
+    assert 'vayu_test_seconds_bucket{le="1"} 2' in text
+    assert 'vayu_test_seconds_bucket{le="+Inf"} 3' in text
+    assert 'vayu_test_seconds_count 3' in text
+
+
+def test_cache_hit_ratio_gauge():
+    registry = MetricsRegistry()
+    registry.record_cache('geocode', True)
+    registry.record_cache('geocode', True)
+    registry.record_cache('geocode', False)
+
+    assert 'vayu_cache_hit_ratio{cache="geocode"} 0.666667' in registry.render()
@@ -0,0 +1,30 @@
+import pytest
+
+from mock_upstream import MockUpstream
+
+
+@pytest.mark.parametrize('unit, factor', [('ms', 1.0), ('kmh', 3.6), (None, 3.6)])
+def test_forecast_honors_windspeed_unit(unit, factor):
+    query = {'latitude': '28.61', 'longitude': '77.21', 'current_weather': 'true', 'hourly': 'windspeed_10m'}
+    if unit:
+        query['windspeed_unit'] = unit
+    # The m/s values are rounded to 0.1 before scaling, hence the tolerance
+    base = MockUpstream().forecast(dict(query, windspeed_unit='ms'))
+
+    forecast = MockUpstream().forecast(query)
+
+    assert forecast['current_weather']['windspeed'] == pytest.approx(base['current_weather']['windspeed'] * factor,
+                                                                     abs=0.25)
+    assert forecast['hourly']['windspeed_10m'][0] == pytest.approx(base['hourly']['windspeed_10m'][0] * factor,
+                                                                    abs=0.25)
+
+
+def test_open_meteo_frames_carry_metres_per_second(mock_upstream):
+    from utils.weather_api import WeatherAPI
+
+    expected = mock_upstream.state.forecast({'latitude': '28.61', 'longitude': '77.21', 'current_weather': 'true',
+                                             'windspeed_unit': 'ms'})['current_weather']['windspeed']
+
+    frame = WeatherAPI()._fetch_openmeteo_frame(28.61, 77.21)
+
+    assert frame.current['wind_speed'] == pytest.approx(expected)
@@ -0,0 +1,158 @@
+"""
+Storage backend tests, run on SQLite and on the server databases named by
+VAYU_TEST_POSTGRES_URL / VAYU_TEST_MYSQL_URL (skipped when unset or not
+reachable). A server database is emptied before and after each test.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, inspect, select
+
+from models import (AlertOutbox, FeedbackEvent, MLPrediction, User, WeatherLog, bulk_insert_alerts,
+                    bulk_insert_feedback, bulk_insert_predictions, bulk_insert_weather_logs, database_config, db,
+                    init_schema, migrate_schema)
+
+SERVER_URLS = {'postgresql': 'VAYU_TEST_POSTGRES_URL', 'mysql': 'VAYU_TEST_MYSQL_URL'}
+
+
+@pytest.fixture(params=['sqlite', 'postgresql', 'mysql'])
+def database(request, tmp_path, monkeypatch):
+    """An app context bound to an empty database of each backend"""
+    from app import create_app
+
+    if request.param == 'sqlite':
+        url = f"sqlite:///{tmp_path / 'vayu.db'}"
+    else:
+        url = os.getenv(SERVER_URLS[request.param])
+        if not url:
+            pytest.skip(f'{SERVER_URLS[request.param]} not set')
+    monkeypatch.setenv('VAYU_DATABASE_URL', url)
+    monkeypatch.chdir(tmp_path)
+    app = create_app({'VAYU_AUTO_INIT_DB': False})
+    context = app.app_context()
+    context.push()
+    try:
+        db.drop_all()
+    except Exception as e:  # Missing driver or server not running
+        context.pop()
+        pytest.skip(f'{request.param} unavailable: {e}')
+    yield app
+    db.session.remove()
+    db.drop_all()
+    context.pop()
+
+
+def test_database_config_reads_the_url_from_the_environment(database):
+    assert database.config['SQLALCHEMY_DATABASE_URI'] == os.environ['VAYU_DATABASE_URL']
+
+
+def test_database_config_defaults_to_sqlite(monkeypatch):
+    monkeypatch.delenv('VAYU_DATABASE_URL', raising=False)
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+
+    config = database_config('/data/vayu.db')
+
+    assert config['SQLALCHEMY_DATABASE_URI'] == 'sqlite:////data/vayu.db'
+    assert 'timeout' in config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args']
+    assert 'pool_size' not in config['SQLALCHEMY_ENGINE_OPTIONS']
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('postgres://u:p@db/vayu', 'postgresql://u:p@db/vayu'),
+    ('mysql://u:p@db/vayu', 'mysql+pymysql://u:p@db/vayu'),
+    ('postgresql+psycopg2://u:p@db/vayu', 'postgresql+psycopg2://u:p@db/vayu'),
+])
+def test_database_config_normalizes_server_urls(monkeypatch, url, expected):
+    monkeypatch.setenv('VAYU_DB_POOL_SIZE', '7')
+
+    config = database_config('/unused.db', url)
+
+    assert config['SQLALCHEMY_DATABASE_URI'] == expected
+    assert config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 7
+    assert config['SQLALCHEMY_ENGINE_OPTIONS']['pool_pre_ping'] is True
+
+
+def test_explicit_url_wins_over_the_environment(monkeypatch):
+    monkeypatch.setenv('VAYU_DATABASE_URL', 'postgresql://env/vayu')
+
+    assert database_config('/unused.db', 'sqlite:///other.db')['SQLALCHEMY_DATABASE_URI'] == 'sqlite:///other.db'
+
+
+def test_bulk_inserts_write_every_batch(database):
+    init_schema()
+    user = User(session_id='bulk-user')
+    db.session.add(user)
+    db.session.commit()
+    stamp = datetime(2025, 1, 1, 12)
+
+    logs = bulk_insert_weather_logs(({'user_id': user.id, 'location': 'Pune', 'temperature': float(i),
+                                      'comfort_score': i} for i in range(25)), batch_size=10)
+    predictions = bulk_insert_predictions([{'location': 'Pune', 'predicted_comfort_avg': 61.5}])
+    alerts = bulk_insert_alerts([{'user_id': user.id, 'location': 'Pune', 'direction': 'below',
+                                  'threshold': 50, 'forecast_time': stamp}])
+    feedback = bulk_insert_feedback([{'user_id': user.id, 'feedback': 'good', 'clicked_at': stamp},
+                                     {'user_id': user.id, 'feedback': 'bad'}])
+
+    assert (logs, predictions, alerts, feedback) == (25, 1, 1, 2)
+    assert db.session.scalar(select(db.func.count()).select_from(WeatherLog)) == 25
+    assert sorted(db.session.scalars(select(WeatherLog.comfort_score))) == list(range(25))
+    # Defaults the helpers fill in for columns the rows leave out
+    assert db.session.scalar(select(MLPrediction.prediction_date)) is not None
+    assert db.session.scalar(select(AlertOutbox.created_at)) is not None
+    clicked = db.session.execute(select(FeedbackEvent.clicked_at, FeedbackEvent.received_at)
+                                 .order_by(FeedbackEvent.id)).all()
+    assert clicked[0].clicked_at == stamp
+    assert abs(clicked[1].clicked_at - clicked[1].received_at) < timedelta(seconds=1)
+
+
+def test_bulk_insert_of_nothing_writes_nothing(database):
+    init_schema()
+
+    assert bulk_insert_weather_logs([]) == 0
+
+
+def test_migrate_schema_adds_missing_tables_and_columns(database):
+    legacy = MetaData()
+    Table('users', legacy, Column('id', Integer, primary_key=True),
+          Column('session_id', String(100), nullable=False, unique=True))
+    legacy.create_all(db.engine)
+
+    changes = migrate_schema()
+
+    assert 'added column users.alert_threshold' in changes
+    assert 'created table weather_logs' in changes
+    inspector = inspect(db.engine)
+    assert {column.name for column in User.__table__.columns} <= \
+        {column['name'] for column in inspector.get_columns('users')}
+    assert set(db.metadata.tables) <= set(inspector.get_table_names())
+    # A second run finds nothing left to do
+    assert migrate_schema() == []
+
+
+def test_init_schema_migrates_an_older_database(database):
+    legacy = MetaData()
+    Table('users', legacy, Column('id', Integer, primary_key=True),
+          Column('session_id', String(100), nullable=False, unique=True))
+    legacy.create_all(db.engine)
+
+    init_schema()
+
+    assert 'alert_threshold' in {column['name'] for column in inspect(db.engine).get_columns('users')}
+
+
+def test_app_serves_the_shipped_database(tmp_path, monkeypatch, mock_upstream):
+    """database/vayu.db predates several columns; booting on a copy must upgrade it"""
+    import shutil
+
+    from app import DB_DIR, create_app
+
+    shutil.copy(os.path.join(DB_DIR, 'vayu.db'), tmp_path / 'vayu.db')
+    monkeypatch.chdir(tmp_path)
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'vayu.db'}"})
+
+    response = app.test_client().get('/', query_string={'location': 'Pune'})
+
+    assert response.status_code == 200
+    assert b'Pune' in response.data
@@ -0,0 +1,44 @@
+import re
+import time
+
+from utils.refresh import RefreshCache, changed_fields, refresh_cache
+
+
+def test_poll_interval_stays_inside_the_ttl():
+    for ttl in (30, 300, 900, 3600):
+        cache = RefreshCache(ttl=ttl)
+        assert 0 < cache.poll_interval < ttl
+    assert RefreshCache(ttl=900).poll_interval == 600
+
+
+def test_a_poll_one_interval_later_is_a_cache_hit(monkeypatch):
+    cache = RefreshCache(ttl=900)
+    builds = []
+    now = time.time()
+    cache.prime('Pune', {'location': 'Pune'})
+
+    monkeypatch.setattr(time, 'time', lambda: now + cache.poll_interval + 5)
+    assert cache.inputs('pune ', lambda: builds.append(1) or {'location': 'Pune'}) == {'location': 'Pune'}
+    assert builds == []
+
+    monkeypatch.setattr(time, 'time', lambda: now + cache.ttl + 5)
+    cache.inputs('Pune', lambda: builds.append(1) or {'location': 'Pune'})
+    assert builds == [1]
+
+
+def test_changed_fields_only_returns_differences():
+    assert changed_fields({'a': 1, 'b': 2}, {'a': 1, 'b': 3, 'c': 4}) == {'b': 3, 'c': 4}
+
+
+def test_idle_tab_poll_costs_no_upstream_call(app, mock_upstream):
+    client = app.test_client()
+    page = client.get('/', query_string={'location': 'Lima'}).get_data(as_text=True)
+    interval = int(re.search(r'data-refresh-interval="(\d+)"', page).group(1))
+    version = re.search(r'data-refresh-version="(\w+)"', page).group(1)
+    assert interval == refresh_cache.poll_interval
+    mock_upstream.state.calls.clear()
+
+    response = client.get('/api/refresh', query_string={'location': 'Lima'}, headers={'If-None-Match': f'"{version}"'})
+
+    assert response.status_code == 304
+    assert sum(mock_upstream.state.calls.values()) == 0
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from utils import singleflight
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight('local', shared=False)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'temperature': 21.5}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do(('a',), fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do(('a',), fetch))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{'temperature': 21.5}] * 5
+    # Every caller gets its own copy
+    assert len({id(result) for result in results}) == 5
+
+
+@pytest.mark.skipif(singleflight.fcntl is None, reason='shared single-flight needs fcntl')
+def test_published_results_are_reused_then_removed(tmp_path):
+    flight = SingleFlight('shared', shared=True, share_window=0.2, lock_dir=str(tmp_path))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {'n': len(calls)}
+
+    assert flight.do(('cell', 1), fetch) == {'n': 1}
+    # Another worker (a second instance) within the window reads the published result
+    other = SingleFlight('shared', shared=True, share_window=0.2, lock_dir=str(tmp_path))
+    assert other.do(('cell', 1), fetch) == {'n': 1}
+    assert len(calls) == 1
+
+    time.sleep(0.3)
+    assert other.do(('cell', 1), fetch) == {'n': 2}
+
+
+@pytest.mark.skipif(singleflight.fcntl is None, reason='shared single-flight needs fcntl')
+def test_state_directory_stays_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(singleflight, 'LOCK_BUCKET_DIGITS', 1)
+    monkeypatch.setattr(singleflight, 'SWEEP_INTERVAL', 0.0)
+    flight = SingleFlight('bounded', shared=True, share_window=0.05, lock_dir=str(tmp_path))
+
+    for i in range(200):
+        flight.do(('cell', i), lambda: {'ok': True})
+    files = os.listdir(tmp_path / 'bounded')
+    assert len([name for name in files if name.endswith('.lock')]) <= 16
+
+    time.sleep(0.1)
+    flight.do(('cell', 'last'), lambda: {'ok': True})
+    last = hashlib.sha1(repr(('cell', 'last')).encode()).hexdigest()
+    assert [name for name in os.listdir(tmp_path / 'bounded') if name.endswith('.json')] == [f'{last}.json']
@@ -0,0 +1,32 @@
+import re
+
+import pytest
+
+from utils.structured_logging import begin_request, current_request_id, end_request
+
+
+@pytest.mark.parametrize('supplied', ['abc-123', 'trace.id_7', 'x' * 64])
+def test_plain_request_ids_are_kept(supplied):
+    try:
+        assert begin_request(supplied) == supplied
+        assert current_request_id() == supplied
+    finally:
+        end_request()
+
+
+@pytest.mark.parametrize('supplied', [None, '', 'x' * 65, 'id\nforged: header', 'a"b', 'a b', '{"level":"error"}'])
+def test_other_request_ids_are_replaced(supplied):
+    try:
+        request_id = begin_request(supplied)
+        assert request_id != supplied
+        assert re.fullmatch(r'[0-9a-f]{32}', request_id)
+    finally:
+        end_request()
+
+
+def test_response_echoes_only_valid_ids(app):
+    client = app.test_client()
+
+    assert client.get('/api/status', headers={'X-Request-ID': 'req-42'}).headers['X-Request-ID'] == 'req-42'
+    echoed = client.get('/api/status', headers={'X-Request-ID': 'bad id<script>'}).headers['X-Request-ID']
+    assert re.fullmatch(r'[0-9a-f]{32}', echoed)
@@ -0,0 +1,46 @@
+import os
+import time
+
+from utils.tiles import TileRenderer
+
+PROFILE = {'temp_min': 18, 'temp_max': 26, 'humidity_tolerance': 'medium'}
+
+
+def _warmer(renderer):
+    """Shift every cached cell by a degree, as a refetch with new data would"""
+    for cell, (expires, values, fingerprint) in list(renderer._cells.items()):
+        values = (values[0] + 1,) + values[1:]
+        renderer._cells[cell] = (expires, values, (round(values[0], 1),) + fingerprint[1:])
+
+
+def test_a_superseded_tile_stays_until_the_sweep_finds_it_unused(tmp_path, mock_upstream):
+    renderer = TileRenderer(directory=str(tmp_path), samples=4, max_age=600)
+    old = renderer.render(6, 45, 27, PROFILE)
+    assert renderer.render(6, 45, 27, PROFILE).key == old.key
+
+    _warmer(renderer)
+    new = renderer.render(6, 45, 27, PROFILE)
+
+    # A request that was handed the old tile can still send it
+    assert new.key != old.key
+    assert os.path.exists(old.png_path) and os.path.exists(old.json_path)
+
+    stale = time.time() - 601
+    for path in (old.png_path, old.json_path):
+        os.utime(path, (stale, stale))
+    renderer._next_sweep = 0.0
+    renderer.render(6, 45, 27, PROFILE)
+
+    assert not os.path.exists(old.png_path) and not os.path.exists(old.json_path)
+    assert os.path.exists(new.png_path) and os.path.exists(new.json_path)
+
+
+def test_serving_a_tile_keeps_it_from_the_sweep(tmp_path, mock_upstream):
+    renderer = TileRenderer(directory=str(tmp_path), samples=4, max_age=600)
+    tile = renderer.render(6, 45, 27, PROFILE)
+    stale = time.time() - 601
+    os.utime(tile.png_path, (stale, stale))
+    renderer._next_sweep = 0.0
+
+    assert renderer.render(6, 45, 27, PROFILE).key == tile.key
+    assert os.path.exists(tile.png_path)
@@ -0,0 +1,295 @@
+"""
+VAYU Admission Control
+Token buckets for clients and providers, plus per-request upstream deadlines
+
+Three layers keep a burst (one client, or a reload loop) from turning into
+upstream throttling that slows down everyone:
+
+- ClientLimiter: per-session and per-IP buckets for the routes that reach
+  the providers. A client over its rate is served the last dashboard built
+  for its location, or a 429 when there is none.
+- UpstreamLimiter: one outbound bucket per provider, shared by every
+  gunicorn worker through a small state file under a file lock. A call
+  that finds the bucket empty waits for its token, but only while the
+  request's deadline allows it and only behind a few other waiters.
+  Otherwise the call fails the way a provider error does, and the caller
+  falls back (Open-Meteo after NASA POWER, then cached data).
+- Deadlines: each request gets VAYU_REQUEST_DEADLINE seconds for its
+  upstream work. `upstream_timeout` caps every provider timeout to what is
+  left, so the 30 s provider timeouts can no longer stack up. CLI jobs have
+  no deadline: they wait for tokens and are paced rather than dropped.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from utils.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: every worker gets its own provider buckets
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DEADLINE = float(os.getenv('VAYU_REQUEST_DEADLINE', '15'))
+# Requests per minute; 0 disables the limit
+SESSION_RATE = float(os.getenv('VAYU_SESSION_RATE', '30'))
+IP_RATE = float(os.getenv('VAYU_IP_RATE', '120'))
+# A client may spend this many seconds' worth of its rate at once
+CLIENT_BURST_SECONDS = 10
+# Outbound requests per second across all workers; 0 disables the limit
+UPSTREAM_RATES = {
+    'nasa_power': float(os.getenv('VAYU_NASA_RATE', '2')),
+    'open_meteo': float(os.getenv('VAYU_OPENMETEO_RATE', '5')),
+}
+UPSTREAM_BURST_SECONDS = float(os.getenv('VAYU_UPSTREAM_BURST', '10'))
+# Calls per worker allowed to wait for a provider token at the same time
+UPSTREAM_QUEUE = int(os.getenv('VAYU_UPSTREAM_QUEUE', '8'))
+
+_deadline: ContextVar[Optional[float]] = ContextVar('vayu_request_deadline', default=None)
+_throttled: ContextVar[bool] = ContextVar('vayu_request_throttled', default=False)
+
+
+def begin_deadline(seconds: Optional[float] = None):
+    """Start the current request's upstream budget (0 means unlimited)"""
+    seconds = REQUEST_DEADLINE if seconds is None else seconds
+    _deadline.set(time.monotonic() + seconds if seconds > 0 else None)
+    _throttled.set(False)
+
+
+def end_deadline():
+    _deadline.set(None)
+    _throttled.set(False)
+
+
+def throttled() -> bool:
+    """Whether a provider call in the current request was refused a token"""
+    return _throttled.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None outside a request"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def upstream_timeout(limit: float) -> float:
+    """A provider timeout capped to the time the request has left"""
+    left = remaining()
+    return limit if left is None else max(0.5, min(limit, left))
+
+
+class TokenBucket:
+    """
+    In-process token bucket
+
+    Args:
+        rate: Tokens added per second
+        capacity: Most tokens held (the largest burst)
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._stamp = time.time()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float, stamp: float, now: float):
+        """(tokens left, seconds until a token is due, 0 when one was taken)"""
+        tokens = min(self.capacity, tokens + max(0.0, now - stamp) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate
+
+    def try_take(self) -> float:
+        """Take a token; returns 0, or the seconds to wait before one is available"""
+        with self._lock:
+            now = time.time()
+            self._tokens, wait = self._take(self._tokens, self._stamp, now)
+            self._stamp = now
+            return wait
+
+    def refund(self):
+        """Give back a token taken for a request that was turned away elsewhere"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a file, so every worker on the host
+    draws from the same budget. Falls back to in-process state when the
+    file cannot be used.
+    """
+
+    def __init__(self, rate: float, capacity: float, path: str):
+        super().__init__(rate, capacity)
+        self.path = path
+
+    def try_take(self) -> float:
+        try:
+            with open(self.path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                now = time.time()
+                try:
+                    tokens, stamp = (float(value) for value in f.read().split())
+                except ValueError:  # New or damaged file: start full
+                    tokens, stamp = self.capacity, now
+                tokens, wait = self._take(tokens, stamp, now)
+                f.seek(0)
+                f.truncate()
+                f.write(f'{tokens!r} {now!r}')
+                return wait
+        except OSError as e:
+            logger.warning("shared token bucket unavailable (%s); limiting this worker only", e)
+            return super().try_take()
+
+
+class UpstreamLimiter:
+    """
+    Outbound admission per provider
+
+    Args:
+        rates: Requests per second per provider (missing or 0: unlimited)
+        burst_seconds: Bucket capacity, in seconds of each provider's rate
+        queue: Calls per process that may wait for a token at once
+        shared: Share the buckets across processes through state files
+        state_dir: Directory for the bucket files
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, burst_seconds: Optional[float] = None,
+                 queue: Optional[int] = None, shared: Optional[bool] = None, state_dir: Optional[str] = None):
+        rates = UPSTREAM_RATES if rates is None else rates
+        burst_seconds = UPSTREAM_BURST_SECONDS if burst_seconds is None else burst_seconds
+        self.queue = UPSTREAM_QUEUE if queue is None else queue
+        if shared is None:
+            shared = os.getenv('VAYU_ADMISSION_SHARED', 'true').lower() in ('1', 'true', 'yes')
+        state_dir = state_dir or os.getenv('VAYU_ADMISSION_DIR') or \
+            os.path.join(tempfile.gettempdir(), 'vayu-admission')
+        shared = shared and fcntl is not None
+        if shared:
+            os.makedirs(state_dir, exist_ok=True)
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        for provider, rate in rates.items():
+            if rate <= 0:
+                continue
+            capacity = rate * burst_seconds
+            self._buckets[provider] = (SharedTokenBucket(rate, capacity, os.path.join(state_dir, f'{provider}.bucket'))
+                                       if shared else TokenBucket(rate, capacity))
+        self._waiting: Dict[str, int] = {provider: 0 for provider in self._buckets}
+        self._lock = threading.Lock()
+
+    def acquire(self, provider: str) -> bool:
+        """
+        Wait for permission to call a provider
+
+        Returns:
+            False when the token would arrive after the request's deadline or
+            too many calls are already waiting; the caller must not call out
+        """
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return True
+        wait = bucket.try_take()
+        if wait == 0:
+            self._count(provider, 'admitted')
+            return True
+
+        with self._lock:
+            if self._waiting[provider] >= self.queue:
+                self._reject(provider)
+                return False
+            self._waiting[provider] += 1
+        started = time.monotonic()
+        try:
+            while wait > 0:
+                left = remaining()
+                if left is not None and wait >= left:
+                    self._reject(provider)
+                    return False
+                time.sleep(wait)
+                wait = bucket.try_take()
+        finally:
+            with self._lock:
+                self._waiting[provider] -= 1
+        metrics.observe('vayu_upstream_queue_seconds', time.monotonic() - started, {'provider': provider})
+        self._count(provider, 'queued')
+        return True
+
+    def _reject(self, provider: str):
+        _throttled.set(True)
+        self._count(provider, 'rejected')
+
+    def _count(self, provider: str, result: str):
+        metrics.inc('vayu_admission_total', {'scope': provider, 'result': result})
+
+
+class ClientLimiter:
+    """
+    Per-session and per-IP request rates for the upstream-heavy routes
+
+    Buckets are kept per worker (LRU-bounded), so a client spread over N
+    workers gets up to N times the rate. That is still enough to stop a
+    reload loop or a single scraper.
+
+    Args:
+        session_rate: Requests per minute per session (0: unlimited)
+        ip_rate: Requests per minute per client address (0: unlimited)
+        max_clients: Buckets kept per scope before the oldest is dropped
+    """
+
+    def __init__(self, session_rate: Optional[float] = None, ip_rate: Optional[float] = None,
+                 max_clients: int = 10000):
+        self.rates = {'session': SESSION_RATE if session_rate is None else session_rate,
+                      'ip': IP_RATE if ip_rate is None else ip_rate}
+        self.max_clients = max_clients
+        self._buckets: Dict[str, 'OrderedDict[str, TokenBucket]'] = {scope: OrderedDict() for scope in self.rates}
+        self._lock = threading.Lock()
+
+    def _bucket(self, scope: str, key: str) -> TokenBucket:
+        with self._lock:
+            buckets = self._buckets[scope]
+            bucket = buckets.get(key)
+            if bucket is None:
+                rate = self.rates[scope] / 60
+                bucket = buckets[key] = TokenBucket(rate, rate * CLIENT_BURST_SECONDS)
+                while len(buckets) > self.max_clients:
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+            return bucket
+
+    def admit(self, session_id: Optional[str], address: Optional[str]) -> float:
+        """0 when the request may proceed, else the seconds until it would be admitted"""
+        taken = []
+        for scope, key in (('session', session_id), ('ip', address)):
+            if not key or self.rates[scope] <= 0:
+                continue
+            bucket = self._bucket(scope, key)
+            wait = bucket.try_take()
+            if wait > 0:
+                # A rejected request spends nothing from the client's other budgets
+                for earlier in taken:
+                    earlier.refund()
+                metrics.inc('vayu_admission_total', {'scope': scope, 'result': 'rejected'})
+                return wait
+            taken.append(bucket)
+        return 0.0
+
+
+# Shared by every WeatherAPI/NASAPowerAPI instance in the process
+upstream_limiter = UpstreamLimiter()
+client_limiter = ClientLimiter()
+
+metrics.describe('vayu_admission_total', 'Admission decisions by scope (session, ip or provider)')
+metrics.describe('vayu_upstream_queue_seconds', 'Time provider calls waited for an outbound token')
@@ -0,0 +1,216 @@
+"""
+VAYU Comfort Alerts
+Tell users when their comfort score will cross their threshold in the next hours
+
+Subscribers (users with an alert_threshold) are grouped by their snapped
+Open-Meteo cell and, inside a cell, by identical comfort profile. Every
+cell's hourly forecast comes from one batched multi-coordinate request,
+every distinct profile is scored once over the forecast window with the
+vectorized calculator, and the result fans out to all users sharing that
+profile. Each cell's inputs (forecast window plus its subscribers) are
+fingerprinted, so a scheduled run only re-evaluates cells whose data
+changed. Alerts are written to the alert_outbox table; delivery is left
+to whatever reads it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from models import AlertOutbox, User, bulk_insert_alerts, db
+from utils.comfort_calculator import PROFILE_KEYS, ComfortCalculator
+from utils.metrics import metrics
+from utils.singleflight import OPENMETEO_GRID, grid_cell
+from utils.weather_api import WeatherAPI
+
+logger = logging.getLogger(__name__)
+
+ALERT_HORIZON_HOURS = int(os.getenv('VAYU_ALERT_HORIZON_HOURS', '12'))
+ALERT_STATE = os.getenv('VAYU_ALERT_STATE', '.vayu-alerts.json')
+
+HOURLY_VARIABLES = 'temperature_2m,relativehumidity_2m,windspeed_10m,precipitation_probability'
+
+# Bump when scoring or crossing rules change so every cell is re-evaluated
+ALERT_VERSION = 1
+
+
+def crossings(scores: np.ndarray, thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    First crossing of each threshold over an hourly score series
+
+    Returns (hour index, starts above) per threshold. The index is -1 when
+    the score stays on the same side of that threshold for the whole window.
+    """
+    above = scores[None, :] >= thresholds[:, None]
+    changed = above != above[:, :1]
+    first = np.where(changed.any(axis=1), changed.argmax(axis=1), -1)
+    return first, above[:, 0]
+
+
+def _read_state(path: str) -> Dict[str, str]:
+    try:
+        with open(path) as f:
+            return json.load(f).get('cells', {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def _write_state(path: str, cells: Dict[str, str]):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': ALERT_VERSION, 'cells': cells}, f)
+    os.replace(tmp, path)
+
+
+class AlertEvaluator:
+    """
+    Evaluates comfort alerts for every subscriber
+
+    Args:
+        weather_api: Client used for geocoding and batched forecasts
+        horizon: Hours ahead to look for a threshold crossing
+        state_path: JSON file holding per-cell fingerprints between runs
+            (None keeps them in memory only)
+    """
+
+    def __init__(self, weather_api: Optional[WeatherAPI] = None, horizon: Optional[int] = None,
+                 state_path: Optional[str] = ALERT_STATE):
+        self.weather_api = weather_api or WeatherAPI()
+        self.horizon = horizon or ALERT_HORIZON_HOURS
+        self.state_path = state_path
+        self._coordinates: Dict[str, Optional[Tuple[float, float]]] = {}
+        self._fingerprints: Dict[str, str] = _read_state(state_path) if state_path else {}
+
+    def _locate(self, names) -> Dict[str, Tuple[float, float]]:
+        """Coordinates per location name, geocoding each name once per process"""
+        for name in names:
+            if name not in self._coordinates:
+                coords = self.weather_api.get_coordinates(name)
+                self._coordinates[name] = (coords['lat'], coords['lon']) if coords else None
+        return {name: self._coordinates[name] for name in names if self._coordinates[name]}
+
+    def _subscribers(self) -> Dict[Tuple[int, int], Dict[tuple, List[Any]]]:
+        """cell -> profile tuple -> subscriber rows"""
+        users = User.__table__
+        rows = db.session.execute(
+            select(users.c.id, users.c.location, users.c.alert_threshold,
+                   *(users.c[key] for key in PROFILE_KEYS))
+            .where(users.c.alert_threshold.isnot(None), users.c.location.isnot(None))
+            .order_by(users.c.id)).all()
+        coordinates = self._locate({row.location for row in rows})
+
+        cells: Dict[Tuple[int, int], Dict[tuple, List[Any]]] = defaultdict(lambda: defaultdict(list))
+        for row in rows:
+            if row.location not in coordinates:
+                continue
+            lat, lon = coordinates[row.location]
+            cells[grid_cell(lat, lon, OPENMETEO_GRID)][tuple(row[3:])].append(row)
+        return cells
+
+    def _window(self, frame, now: np.datetime64) -> Optional[Dict[str, np.ndarray]]:
+        """The next `horizon` hours (hour 0 = now) of a forecast frame"""
+        start = int(np.searchsorted(frame.time, now))
+        if len(frame.time) - start < 2:
+            return None
+        stop = start + self.horizon + 1
+        return {name: frame.column(name)[start:stop] for name in ('time',) + frame.COLUMNS}
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Evaluate every subscriber cell once; returns run statistics
+
+        Must run inside an app context.
+        """
+        started = time.perf_counter()
+        cells = self._subscribers()
+        stats = {'users': sum(len(u) for groups in cells.values() for u in groups.values()),
+                 'cells': len(cells), 'evaluated': 0, 'profiles': 0, 'alerts': 0}
+        if not cells:
+            stats['seconds'] = time.perf_counter() - started
+            return stats
+
+        keys = list(cells)
+        lat_step, lon_step = OPENMETEO_GRID
+        centers = [((i + 0.5) * lat_step - 90, (j + 0.5) * lon_step - 180) for i, j in keys]
+        with metrics.stage('alerts_fetch'):
+            frames = self.weather_api.fetch_openmeteo_batch(centers, hourly=HOURLY_VARIABLES,
+                                                            forecast_days=2)
+
+        now = np.datetime64(datetime.utcnow().replace(minute=0, second=0, microsecond=0), 'm')
+        candidates: List[Dict[str, Any]] = []
+        fingerprints: Dict[str, str] = {}
+        for cell, frame in zip(keys, frames):
+            window = self._window(frame, now) if frame is not None else None
+            if window is None:
+                continue
+            groups = cells[cell]
+            signature = sorted((row.id, row.alert_threshold, row.location, list(profile))
+                               for profile, rows in groups.items() for row in rows)
+            digest = json.dumps([ALERT_VERSION, self.horizon, str(window['time'][0]),
+                                 [np.round(window[name], 1).tolist() for name in frame.COLUMNS],
+                                 signature], default=str)
+            cell_key = f'{cell[0]}:{cell[1]}'
+            fingerprint = hashlib.sha1(digest.encode()).hexdigest()
+            if self._fingerprints.get(cell_key) == fingerprint:
+                continue
+            fingerprints[cell_key] = fingerprint
+            stats['evaluated'] += 1
+
+            for profile, rows in groups.items():
+                calc = ComfortCalculator({key: value for key, value in zip(PROFILE_KEYS, profile)
+                                          if value is not None})
+                scores = np.round(calc.score_arrays(window['temperature'], window['humidity'],
+                                                    window['wind_speed'],
+                                                    window['precipitation_probability'])['overall'])
+                stats['profiles'] += 1
+                thresholds = np.array([row.alert_threshold for row in rows], dtype=np.float64)
+                first, starts_above = crossings(scores, thresholds)
+                for row, hour, above in zip(rows, first.tolist(), starts_above.tolist()):
+                    if hour < 0:
+                        continue
+                    candidates.append({
+                        'user_id': row.id,
+                        'location': row.location,
+                        'direction': 'below' if above else 'above',
+                        'threshold': row.alert_threshold,
+                        'current_score': int(scores[0]),
+                        'predicted_score': int(scores[hour]),
+                        'forecast_time': window['time'][hour].astype(datetime),
+                    })
+
+        stats['alerts'] = self._write(candidates, now.astype(datetime))
+        metrics.inc('vayu_alerts_total', amount=stats['alerts'])
+        metrics.inc('vayu_alert_cells_total', {'result': 'evaluated'}, stats['evaluated'])
+        metrics.inc('vayu_alert_cells_total', {'result': 'unchanged'},
+                    stats['cells'] - stats['evaluated'])
+
+        self._fingerprints.update(fingerprints)
+        if self.state_path and fingerprints:
+            _write_state(self.state_path, self._fingerprints)
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+    @staticmethod
+    def _write(candidates: List[Dict[str, Any]], now: datetime) -> int:
+        """Insert alerts, skipping users already told about an upcoming crossing"""
+        if not candidates:
+            return 0
+        outbox = AlertOutbox.__table__
+        pending = set(db.session.execute(
+            select(outbox.c.user_id, outbox.c.direction)
+            .where(outbox.c.forecast_time >= now,
+                   outbox.c.user_id.in_({alert['user_id'] for alert in candidates}))).all())
+        fresh = [alert for alert in candidates if (alert['user_id'], alert['direction']) not in pending]
+        return bulk_insert_alerts(fresh) if fresh else 0
+
+
+metrics.describe('vayu_alerts_total', 'Comfort alerts written to the outbox')
+metrics.describe('vayu_alert_cells_total', 'Subscriber cells re-evaluated vs skipped as unchanged')
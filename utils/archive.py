@@ -0,0 +1,183 @@
+"""
+VAYU Weather Log Archive
+Move old weather_logs rows into compressed, partitioned columnar files
+
+Layout (one directory tree per table):
+
+    <VAYU_ARCHIVE_DIR>/weather_logs/location=<slug>-<hash>/month=YYYY-MM/part-<first id>-<rows>.npz
+
+Each part is a NumPy .npz holding one array per column. A part is written
+atomically before its rows are deleted from the live table, and its name is
+derived from the rows it contains, so re-running after a crash between the
+two steps overwrites the same file instead of duplicating rows.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, delete, select
+
+from models import WeatherLog, db
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv('VAYU_ARCHIVE_DIR', 'archive')
+
+FLOAT_COLUMNS = ('temperature', 'humidity', 'wind_speed', 'precipitation', 'comfort_score')
+
+
+def _table_dir(archive_dir: Optional[str] = None) -> str:
+    return os.path.join(archive_dir or ARCHIVE_DIR, 'weather_logs')
+
+
+def _location_dir(location: str, archive_dir: Optional[str] = None) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '-', location.lower()).strip('-')[:40] or 'location'
+    digest = hashlib.sha1(location.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(_table_dir(archive_dir), f'location={slug}-{digest}')
+
+
+def _write_part(directory: str, columns: Dict[str, np.ndarray]) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{int(columns['id'][0])}-{len(columns['id'])}.npz")
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.part-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return path
+
+
+def _columns(rows) -> Dict[str, np.ndarray]:
+    """Column arrays for a group of weather_logs rows (NULL floats become NaN)"""
+    columns = {
+        'id': np.array([row.id for row in rows], dtype=np.int64),
+        'user_id': np.array([row.user_id for row in rows], dtype=np.int64),
+        'timestamp': np.array([row.timestamp for row in rows], dtype='datetime64[us]'),
+        'user_feedback': np.array([row.user_feedback or '' for row in rows], dtype=str),
+    }
+    for name in FLOAT_COLUMNS:
+        columns[name] = np.array([getattr(row, name) for row in rows], dtype=np.float64)
+    return columns
+
+
+def archive_weather_logs(before: datetime, batch_size: int = 5000,
+                         archive_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Move weather_logs rows older than `before` into the archive
+
+    Rows are processed in id order, batch_size at a time: each batch is split
+    by location and month, written as one part per group, then deleted from
+    the live table in the same iteration. Returns rows moved, parts written
+    and their total size in bytes.
+    """
+    table = WeatherLog.__table__
+    query = (select(table)
+             .where(table.c.timestamp < before, table.c.id > bindparam('after'))
+             .order_by(table.c.id)
+             .limit(batch_size))
+    stats = {'rows': 0, 'parts': 0, 'bytes': 0}
+    last_id = 0
+    while True:
+        rows = db.session.execute(query, {'after': last_id}).all()
+        if not rows:
+            break
+
+        groups: Dict[tuple, List[Any]] = defaultdict(list)
+        for row in rows:
+            groups[(row.location, row.timestamp.strftime('%Y-%m'))].append(row)
+        for (location, month), group in groups.items():
+            location_dir = _location_dir(location, archive_dir)
+            path = _write_part(os.path.join(location_dir, f'month={month}'), _columns(group))
+            marker = os.path.join(location_dir, 'location.json')
+            if not os.path.exists(marker):
+                with open(marker, 'w') as f:
+                    json.dump({'location': location}, f)
+            stats['parts'] += 1
+            stats['bytes'] += os.path.getsize(path)
+
+        db.session.execute(delete(table).where(table.c.id.in_([row.id for row in rows])))
+        db.session.commit()
+        stats['rows'] += len(rows)
+        last_id = rows[-1].id
+        logger.debug("archived %s rows up to id %s", stats['rows'], last_id)
+    return stats
+
+
+def archived_locations(archive_dir: Optional[str] = None) -> Dict[str, str]:
+    """Location name -> partition directory for every archived location"""
+    root = _table_dir(archive_dir)
+    locations = {}
+    if not os.path.isdir(root):
+        return locations
+    for entry in sorted(os.listdir(root)):
+        try:
+            with open(os.path.join(root, entry, 'location.json')) as f:
+                locations[json.load(f)['location']] = os.path.join(root, entry)
+        except (OSError, ValueError, KeyError):
+            continue
+    return locations
+
+
+def _month_overlaps(month: str, since: Optional[datetime], until: Optional[datetime]) -> bool:
+    start = np.datetime64(month, 'M')
+    if until is not None and start.astype('datetime64[us]') >= np.datetime64(until, 'us'):
+        return False
+    if since is not None and (start + 1).astype('datetime64[us]') <= np.datetime64(since, 'us'):
+        return False
+    return True
+
+
+def _part_paths(location: Optional[str], since: Optional[datetime], until: Optional[datetime],
+                archive_dir: Optional[str]) -> Iterator[tuple]:
+    locations = archived_locations(archive_dir)
+    if location is not None:
+        locations = {location: locations[location]} if location in locations else {}
+    for name, location_dir in locations.items():
+        for month_dir in sorted(os.listdir(location_dir)):
+            if not month_dir.startswith('month=') or not _month_overlaps(month_dir[6:], since, until):
+                continue
+            month_path = os.path.join(location_dir, month_dir)
+            for part in sorted(os.listdir(month_path)):
+                if part.startswith('part-') and part.endswith('.npz'):
+                    yield name, os.path.join(month_path, part)
+
+
+def archived_row_bound(location: Optional[str] = None, since: Optional[datetime] = None,
+                       until: Optional[datetime] = None, archive_dir: Optional[str] = None) -> int:
+    """Upper bound on archived rows matching the filters, from part names alone"""
+    return sum(int(path[:-4].rsplit('-', 1)[1]) for _, path in _part_paths(location, since, until, archive_dir))
+
+
+def iter_archive(location: Optional[str] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None,
+                 archive_dir: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield archived parts as column dicts (plus 'location'), filtered by time
+
+    Partitions outside the location and month range are skipped without
+    being opened.
+    """
+    for name, path in _part_paths(location, since, until, archive_dir):
+        with np.load(path, allow_pickle=False) as data:
+            part = {key: data[key] for key in data.files}
+        keep = np.ones(len(part['id']), dtype=bool)
+        if since is not None:
+            keep &= part['timestamp'] >= np.datetime64(since, 'us')
+        if until is not None:
+            keep &= part['timestamp'] < np.datetime64(until, 'us')
+        if not keep.all():
+            part = {key: values[keep] for key, values in part.items()}
+        if len(part['id']):
+            part['location'] = name
+            yield part
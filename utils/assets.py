@@ -0,0 +1,215 @@
+"""
+VAYU Static Asset Pipeline
+Minified, content-hashed and precompressed CSS/JS with a manifest
+
+`build_assets` minifies every entry in ASSET_SOURCES, writes it under
+static/dist with a content hash in its name (css/style.3f2a9c1b7d4e.css),
+plus .gz and (when the optional `brotli` package is installed) .br
+variants, and records logical -> hashed names in dist/manifest.json.
+Templates reference assets through `asset_url('css/style.css')`, which
+resolves through the manifest. Because a hashed name never changes
+content, /assets/ responses are cached as immutable for a year. The
+service worker (static/js/sw.js, served as /sw.js) gets the manifest's
+URLs baked in, so it precaches exactly the current build.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Any, Dict, Optional
+
+from flask import Flask, abort, current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped; gzip is always produced
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Logical names (relative to the static folder) that go through the pipeline
+ASSET_SOURCES = ('css/style.css', 'css/onboarding.css', 'js/comfort.js', 'js/main.js')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+SERVICE_WORKER = 'js/sw.js'
+
+_MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+_CSS_STRING = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+
+def minify_css(text: str) -> str:
+    """Drop comments and insignificant whitespace (quoted strings are left alone)"""
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    parts = _CSS_STRING.split(text)
+    for i in range(0, len(parts), 2):
+        code = re.sub(r'\s+', ' ', parts[i])
+        # Spaces around ':' stay: in selectors they are significant (a :hover)
+        code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+        parts[i] = code.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(text: str) -> str:
+    """
+    Line-level JS minification: indentation, blank lines and whole-line
+    comments go, code is left untouched (no renaming or joining of lines,
+    so automatic semicolon insertion behaves exactly as in the source)
+    """
+    lines, in_block = [], False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if in_block:
+            in_block = '*/' not in stripped
+            continue
+        if stripped.startswith('/*'):
+            in_block = '*/' not in stripped
+            continue
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+def _write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.asset-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _source_digest(static_folder: str) -> str:
+    digest = hashlib.sha256()
+    for name in ASSET_SOURCES:
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            digest.update(name.encode() + b'\0' + f.read())
+    return digest.hexdigest()
+
+
+def load_manifest(static_folder: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_assets(static_folder: str) -> Dict[str, Any]:
+    """
+    Build every asset and write the manifest; returns the manifest
+
+    Files of the previous build are kept (pages rendered before a deploy
+    still reference them); anything older is removed.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    previous = load_manifest(static_folder) or {}
+    manifest: Dict[str, Any] = {'source_digest': _source_digest(static_folder), 'assets': {}, 'sizes': {}}
+    for name in ASSET_SOURCES:
+        with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+            source = f.read()
+        minify = minify_css if name.endswith('.css') else minify_js
+        data = minify(source).encode('utf-8')
+        stem, ext = os.path.splitext(name)
+        hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        path = os.path.join(dist, hashed)
+        _write(path, data)
+        # mtime=0 keeps the .gz byte-identical across rebuilds
+        _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        sizes = {'source': len(source.encode('utf-8')), 'minified': len(data),
+                 'gzip': os.path.getsize(path + '.gz')}
+        if brotli is not None:
+            _write(path + '.br', brotli.compress(data, quality=11))
+            sizes['brotli'] = os.path.getsize(path + '.br')
+        manifest['assets'][name] = hashed
+        manifest['sizes'][name] = sizes
+
+    keep = set(manifest['assets'].values()) | set(previous.get('assets', {}).values())
+    for root, _, files in os.walk(dist):
+        for filename in files:
+            relative = os.path.relpath(os.path.join(root, filename), dist).replace(os.sep, '/')
+            base = re.sub(r'\.(gz|br)$', '', relative)
+            if relative != MANIFEST and base not in keep:
+                os.remove(os.path.join(root, filename))
+
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+class Assets:
+    """Manifest lookups for templates and precompressed, immutable serving"""
+
+    def __init__(self):
+        self.manifest: Dict[str, str] = {}
+        self.version = 'dev'
+
+    def init_app(self, app: Flask, build: bool = True):
+        """Load the manifest, rebuilding it first when the sources changed"""
+        manifest = load_manifest(app.static_folder)
+        if build:
+            try:
+                if manifest is None or manifest.get('source_digest') != _source_digest(app.static_folder):
+                    manifest = build_assets(app.static_folder)
+                    logger.info("built %s static assets", len(manifest['assets']))
+            except OSError as e:
+                # A read-only deploy can still run from a manifest built at release time
+                logger.warning("static asset build failed: %s", e)
+        self.manifest = (manifest or {}).get('assets', {})
+        self.version = (manifest or {}).get('source_digest', 'dev')[:12]
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def url(self, filename: str) -> str:
+        """URL of a static asset: its fingerprinted build, or the plain file"""
+        hashed = self.manifest.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('vayu.asset', filename=hashed)
+
+    def send(self, filename: str):
+        """Response for a built asset, precompressed when the client accepts it"""
+        path = safe_join(os.path.join(current_app.static_folder, DIST_DIR), filename)
+        if path is None or filename == MANIFEST or not os.path.isfile(path):
+            abort(404)
+        mimetype = _MIMETYPES.get(os.path.splitext(filename)[1])
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+                encoding, path = candidate, path + suffix
+                break
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def service_worker(self, enabled: bool = True):
+        """
+        The service worker script for the current build
+
+        It is never cached for long (browsers compare it byte for byte to
+        find updates). Disabled, it is a kill switch that clears its caches
+        and unregisters itself from browsers that installed it earlier.
+        """
+        with open(os.path.join(current_app.static_folder, SERVICE_WORKER), encoding='utf-8') as f:
+            source = minify_js(f.read())
+        config = {'version': self.version, 'enabled': enabled,
+                  'precache': [self.url(name) for name in ASSET_SOURCES]}
+        response = current_app.response_class(f'const VAYU_SW = {json.dumps(config)};\n{source}',
+                                               mimetype='text/javascript')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.add_etag()
+        return response.make_conditional(request)
+
+
+assets = Assets()
@@ -0,0 +1,167 @@
+"""
+VAYU Comfort Score Backfill
+Recompute stored WeatherLog.comfort_score values with the current ComfortCalculator
+
+The id range is split into one partition per worker process. Each worker
+walks its partition in keyset-paginated chunks (weather_logs joined with
+users), scores every profile group in the chunk with the vectorized
+calculator and writes only the changed scores back with one executemany
+per chunk. After every committed chunk the worker records its last id in a
+checkpoint directory, so an interrupted run resumes where it stopped.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, create_engine, func, select, update
+
+from models import User, WeatherLog
+from utils.comfort_calculator import PROFILE_KEYS, ComfortCalculator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _write_json(path: str, payload: Dict[str, Any]):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def score_chunk(rows, calculators: Dict[Tuple, ComfortCalculator]) -> List[Dict[str, int]]:
+    """
+    Rescore one chunk of (id, temperature, humidity, wind_speed, precipitation,
+    comfort_score, *profile) rows; returns updates for the scores that changed
+    """
+    groups: Dict[Tuple, List[int]] = defaultdict(list)
+    for index, row in enumerate(rows):
+        groups[tuple(row[6:])].append(index)
+
+    weather = np.array([tuple(row[1:5]) for row in rows], dtype=np.float64)
+    # Missing readings fall back to the same defaults calculate() uses
+    weather = np.where(np.isnan(weather), [20.0, 50.0, 0.0, 0.0], weather)
+
+    updates = []
+    for profile_key, indices in groups.items():
+        calc = calculators.get(profile_key)
+        if calc is None:
+            profile = {name: value for name, value in zip(PROFILE_KEYS, profile_key) if value is not None}
+            calc = calculators[profile_key] = ComfortCalculator(profile)
+        block = weather[indices]
+        scores = np.round(calc.score_arrays(block[:, 0], block[:, 1], block[:, 2], block[:, 3])['overall'])
+        for index, score in zip(indices, scores.astype(int).tolist()):
+            if rows[index][5] != score:
+                updates.append({'b_id': rows[index][0], 'b_score': score})
+    return updates
+
+
+def _backfill_partition(database_url: str, engine_options: Dict[str, Any], part: Dict[str, Any],
+                        state_path: str, chunk_size: int) -> Dict[str, Any]:
+    """Walk one id range in keyset order (runs in a worker process)"""
+    engine = create_engine(database_url, **engine_options)
+    logs, users = WeatherLog.__table__, User.__table__
+    query = (select(logs.c.id, logs.c.temperature, logs.c.humidity, logs.c.wind_speed,
+                    logs.c.precipitation, logs.c.comfort_score,
+                    *(users.c[name] for name in PROFILE_KEYS))
+             .join_from(logs, users, logs.c.user_id == users.c.id)
+             .where(logs.c.id > bindparam('after'), logs.c.id <= part['hi'])
+             .order_by(logs.c.id)
+             .limit(chunk_size))
+    write = (update(logs).where(logs.c.id == bindparam('b_id'))
+             .values(comfort_score=bindparam('b_score')))
+
+    state = _read_json(state_path) or {'last_id': part['lo'] - 1, 'rows': 0, 'updated': 0, 'seconds': 0.0}
+    calculators: Dict[Tuple, ComfortCalculator] = {}
+    started = time.perf_counter() - state['seconds']
+    try:
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(query, {'after': state['last_id']}).all()
+                if not rows:
+                    break
+                updates = score_chunk(rows, calculators)
+                if updates:
+                    conn.execute(write, updates)
+            state['last_id'] = rows[-1][0]
+            state['rows'] += len(rows)
+            state['updated'] += len(updates)
+            state['seconds'] = time.perf_counter() - started
+            _write_json(state_path, state)
+    finally:
+        engine.dispose()
+    state['done'] = True
+    _write_json(state_path, state)
+    return state
+
+
+def backfill_scores(database_url: str, engine_options: Dict[str, Any], checkpoint_dir: str,
+                    workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    restart: bool = False) -> Dict[str, Any]:
+    """
+    Rescore every weather log; resumes from checkpoint_dir unless restart
+
+    Must run inside an app context (to plan the id partitions). Returns
+    totals: rows scanned, rows updated, elapsed seconds and rows/sec for
+    this invocation. The checkpoint directory is removed once all
+    partitions finish, so the next run starts from the beginning.
+    """
+    from models import db
+
+    plan_path = os.path.join(checkpoint_dir, 'plan.json')
+    if restart:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    plan = _read_json(plan_path)
+    if plan is None:
+        lo, hi = db.session.execute(select(func.min(WeatherLog.id), func.max(WeatherLog.id))).one()
+        if lo is None:
+            return {'rows': 0, 'updated': 0, 'seconds': 0.0, 'rows_per_sec': 0.0, 'resumed': False}
+        workers = workers or os.cpu_count() or 1
+        step = -(-(hi - lo + 1) // workers)
+        plan = {'partitions': [{'lo': start, 'hi': min(start + step - 1, hi)}
+                               for start in range(lo, hi + 1, step)]}
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        _write_json(plan_path, plan)
+        resumed = False
+    else:
+        resumed = True
+        logger.info("resuming backfill from %s", checkpoint_dir)
+
+    states = [os.path.join(checkpoint_dir, f'part-{i}.json') for i in range(len(plan['partitions']))]
+    pending = []
+    for part, path in zip(plan['partitions'], states):
+        state = _read_json(path) or {'rows': 0, 'updated': 0}
+        if not state.get('done'):
+            pending.append((part, path, state))
+
+    # Workers open their own connections; don't hand them the app's pool
+    db.engine.dispose()
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, len(pending))) as pool:
+        futures = [pool.submit(_backfill_partition, database_url, engine_options, part, path, chunk_size)
+                   for part, path, _ in pending]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    # Count only this invocation's work, not what earlier runs checkpointed
+    rows = sum(result['rows'] - state['rows'] for result, (_, _, state) in zip(results, pending))
+    updated = sum(result['updated'] - state['updated'] for result, (_, _, state) in zip(results, pending))
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    return {'rows': rows, 'updated': updated, 'seconds': elapsed,
+            'rows_per_sec': rows / elapsed if elapsed else 0.0, 'resumed': resumed}
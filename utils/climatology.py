@@ -0,0 +1,224 @@
+"""
+VAYU Climatology
+"Best time of year" answers from NASA POWER's multi-decade daily record
+
+The daily series for a NASA grid cell is downloaded once and cached as an
+.npz file. For each (cell, comfort profile) pair, every day of the record
+is scored in one vectorized pass and reduced to a small index: comfort
+percentiles per day of year and a summary per week. Queries only read that
+index (kept in memory, and on disk next to the series), so they never
+rescan decades of data.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from utils.comfort_calculator import ComfortCalculator, profile_hash
+from utils.metrics import metrics
+from utils.nasa_power_api import NASAPowerAPI
+from utils.singleflight import grid_cell
+
+logger = logging.getLogger(__name__)
+
+CLIMATOLOGY_DIR = os.getenv('VAYU_CLIMATOLOGY_DIR', 'climatology')
+FIRST_YEAR = 1981  # Start of the NASA POWER daily record
+COMFORTABLE_SCORE = 70  # A day at or above this counts as comfortable
+WEEKS = 52  # Day 365 of the (no-leap) calendar joins the last week
+
+# Bump when the index layout or its reduction changes
+INDEX_VERSION = 1
+
+
+def _last_full_year() -> int:
+    # NASA POWER finalizes data with a ~3 month delay
+    return (datetime.utcnow() - timedelta(days=100)).year - 1
+
+
+def _save_npz(path: str, arrays: Dict[str, np.ndarray]):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.clim-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _load_npz(path: str) -> Optional[Dict[str, np.ndarray]]:
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return {key: data[key] for key in data.files}
+    except (OSError, ValueError):
+        return None
+
+
+def _calendar_day(dates: np.ndarray) -> np.ndarray:
+    """0-364 day of a no-leap year; Feb 29 folds into Feb 28"""
+    years = dates.astype('datetime64[Y]')
+    doy = (dates - years.astype('datetime64[D]')).astype(np.int64)
+    year = years.astype(np.int64) + 1970
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return np.where(leap & (doy >= 59), np.maximum(doy - 1, 58), doy)
+
+
+def build_index(series: Dict[str, np.ndarray], profile: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Score every day of the record for a profile and reduce it per day/week
+
+    Returns arrays: day_p10/day_p50/day_p90/day_share (365 values) and
+    week_median/week_share (52 values); *_share is the fraction of years in
+    which the day (or week) was comfortable.
+    """
+    dates = series['date']
+    # Daily precipitation (mm/day) to the probability-like % the scorer expects,
+    # the same mapping NASAPowerAPI uses for the current day
+    rain = np.minimum(series['precipitation'] * 10, 100)
+    scores = ComfortCalculator(profile).score_arrays(
+        series['temperature'], series['humidity'], series['wind_speed'], rain)['overall']
+    # Days with any missing reading stay out of the distributions
+    missing = np.isnan(series['temperature']) | np.isnan(series['humidity']) | \
+        np.isnan(series['wind_speed']) | np.isnan(rain)
+    scores = np.where(missing, np.nan, scores)
+
+    years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    grid = np.full((years.max() - years.min() + 1, 365), np.nan)
+    grid[years - years.min(), _calendar_day(dates)] = scores
+    comfortable = np.where(np.isnan(grid), np.nan, grid >= COMFORTABLE_SCORE)
+
+    week_median = np.empty(WEEKS)
+    week_share = np.empty(WEEKS)
+    with warnings.catch_warnings():
+        # Days or weeks with no valid readings become NaN without a warning
+        warnings.simplefilter('ignore', RuntimeWarning)
+        day_p10, day_p50, day_p90 = np.nanpercentile(grid, [10, 50, 90], axis=0)
+        day_share = np.nanmean(comfortable, axis=0)
+        for week in range(WEEKS):
+            columns = slice(week * 7, 365 if week == WEEKS - 1 else week * 7 + 7)
+            week_median[week] = np.nanmedian(grid[:, columns])
+            week_share[week] = np.nanmean(comfortable[:, columns])
+
+    return {
+        'day_p10': day_p10, 'day_p50': day_p50, 'day_p90': day_p90,
+        'day_share': day_share,
+        'week_median': week_median, 'week_share': week_share,
+        'years': np.array([years.min(), years.max()]),
+    }
+
+
+class Climatology:
+    """
+    Per-cell daily history and per-profile comfort indexes
+
+    Args:
+        nasa: NASA POWER client used to download missing series
+        directory: Cache directory for series and index files
+        max_indexes: Indexes kept in memory (LRU)
+    """
+
+    def __init__(self, nasa: Optional[NASAPowerAPI] = None, directory: Optional[str] = None,
+                 max_indexes: int = 256):
+        self.nasa = nasa or NASAPowerAPI()
+        self.directory = directory or CLIMATOLOGY_DIR
+        self.max_indexes = max_indexes
+        self._indexes: 'OrderedDict[tuple, Dict[str, np.ndarray]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cell_dir(self, lat: float, lon: float, first: int, last: int) -> str:
+        i, j = grid_cell(lat, lon)
+        return os.path.join(self.directory, f'cell-{i}-{j}-{first}-{last}')
+
+    def series(self, lat: float, lon: float, first_year: int = FIRST_YEAR,
+               last_year: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Daily record for the cell containing (lat, lon), downloaded on first use"""
+        last_year = last_year or _last_full_year()
+        path = os.path.join(self._cell_dir(lat, lon, first_year, last_year), 'series.npz')
+        cached = _load_npz(path)
+        metrics.record_cache('climatology_series', cached is not None)
+        if cached is not None:
+            return cached
+
+        history = self.nasa.get_daily_history(lat, lon, first_year, last_year)
+        if not history:
+            return None
+        series = {'date': np.array(history['date'], dtype='datetime64[D]')}
+        for name in ('temperature', 'humidity', 'wind_speed', 'precipitation'):
+            series[name] = np.array(history[name], dtype=np.float64)  # None -> NaN
+        _save_npz(path, series)
+        logger.info("cached %s days of NASA POWER history for cell %s", len(series['date']),
+                    grid_cell(lat, lon))
+        return series
+
+    def index(self, lat: float, lon: float, profile: Dict[str, Any]) -> Optional[Dict[str, np.ndarray]]:
+        """Comfort index for a profile in the cell containing (lat, lon)"""
+        first, last = FIRST_YEAR, _last_full_year()
+        key = (grid_cell(lat, lon), first, last, profile_hash(profile, 'climatology', INDEX_VERSION))
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+        metrics.record_cache('climatology_index', index is not None)
+        if index is not None:
+            return index
+
+        path = os.path.join(self._cell_dir(lat, lon, first, last), f'index-{key[3]}.npz')
+        index = _load_npz(path)
+        if index is None:
+            series = self.series(lat, lon, first, last)
+            if series is None:
+                return None
+            with metrics.stage('climatology_index'):
+                index = build_index(series, profile)
+            _save_npz(path, index)
+
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def best_weeks(self, lat: float, lon: float, profile: Dict[str, Any],
+                   top: int = 5) -> Optional[Dict[str, Any]]:
+        """The most comfortable weeks of the year, best first"""
+        index = self.index(lat, lon, profile)
+        if index is None:
+            return None
+
+        # Rank by how often the week is comfortable, then by its typical score
+        order = np.lexsort((-index['week_median'], -index['week_share']))
+        reference = date(2001, 1, 1)  # Any non-leap year
+
+        def number(value, digits: int) -> Optional[float]:
+            return None if np.isnan(value) else round(float(value), digits)
+
+        def describe(week: int) -> Dict[str, Any]:
+            start = reference + timedelta(days=week * 7)
+            end = reference + timedelta(days=364 if week == WEEKS - 1 else week * 7 + 6)
+            return {
+                'week': week + 1,
+                'start': start.strftime('%b %d'),
+                'end': end.strftime('%b %d'),
+                'median_score': number(index['week_median'][week], 1),
+                'comfortable_share': number(index['week_share'][week], 3),
+            }
+
+        return {
+            'years': [int(index['years'][0]), int(index['years'][1])],
+            'profile_hash': profile_hash(profile),
+            'best_weeks': [describe(int(week)) for week in order[:top]],
+            'weekly_median': [number(value, 1) for value in index['week_median']],
+        }
+
+
+# Shared so every request hits the same in-memory index cache
+climatology = Climatology()
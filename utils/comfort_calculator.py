@@ -3,9 +3,47 @@ VAYU Comfort Calculator
 Advanced algorithm for personalized weather comfort scoring
 """
 
+import hashlib
+import json
 import math
 from typing import Dict, Any
 
+import numpy as np
+
+# User fields that change a comfort score
+PROFILE_KEYS = ('temp_min', 'temp_max', 'humidity_tolerance', 'wind_tolerance',
+                'rain_preference', 'activity_level')
+
+
+def profile_hash(profile: Dict[str, Any], *salt: Any) -> str:
+    """
+    Stable short hash of the scoring-relevant profile fields
+
+    Cache keys built from it are shared by every user with the same
+    preferences; `salt` lets callers fold in their own format version.
+    """
+    fields = {key: profile.get(key) for key in PROFILE_KEYS}
+    payload = json.dumps([list(salt), fields], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+# Preference tables shared by the scalar and vectorized scoring paths
+ACTIVITY_DECAY = {'low': 3, 'medium': 5, 'high': 7}
+HUMIDITY_RANGES = {
+    'low': (20, 50),      # Prefers dry conditions
+    'medium': (30, 70),   # Moderate humidity
+    'high': (40, 85)      # Comfortable with high humidity
+}
+WIND_RANGES_KMH = {
+    'low': (0, 15),      # Prefers calm conditions
+    'medium': (5, 25),   # Light breeze preferred
+    'high': (10, 35)     # Enjoys stronger winds
+}
+RAIN_SCORES = {  # (<=20%, <=50%, >50% chance)
+    'dislike': (100, 60, 20),
+    'neutral': (95, 75, 50),
+    'like': (80, 90, 85)
+}
+
 class ComfortCalculator:
     """Calculate personalized weather comfort scores"""
     
@@ -54,6 +92,54 @@ class ComfortCalculator:
             }
         }
     
+    def score_arrays(self, temperature, humidity, wind_speed, precipitation) -> Dict[str, np.ndarray]:
+        """
+        Vectorized comfort scoring over aligned arrays (e.g. hourly series)
+
+        Produces the same numbers as calculate() element by element, without
+        the per-point recommendation text.
+
+        Returns:
+            Dict of float arrays: 'overall' plus the four breakdown components
+        """
+        temperature = np.asarray(temperature, dtype=np.float64)
+        humidity = np.asarray(humidity, dtype=np.float64)
+        wind_kmh = np.asarray(wind_speed, dtype=np.float64) * 3.6
+        precipitation = np.asarray(precipitation, dtype=np.float64)
+
+        temp_min = self.profile.get('temp_min', 18)
+        temp_max = self.profile.get('temp_max', 26)
+        factor = ACTIVITY_DECAY.get(self.profile.get('activity_level', 'medium'), 5)
+        distance = np.maximum(temp_min - temperature, 0) + np.maximum(temperature - temp_max, 0)
+        temp_score = np.where(distance > 0, 100 * np.exp(-distance / factor), 100.0)
+
+        h_min, h_max = HUMIDITY_RANGES[self.profile.get('humidity_tolerance', 'medium')]
+        h_distance = np.maximum(h_min - humidity, 0) + np.maximum(humidity - h_max, 0)
+        humidity_score = np.maximum(0, 100 - h_distance * 1.5)
+
+        w_min, w_max = WIND_RANGES_KMH[self.profile.get('wind_tolerance', 'medium')]
+        wind_score = np.where(wind_kmh < w_min, 80.0,
+                              np.maximum(0, 100 - np.maximum(wind_kmh - w_max, 0) * 2.5))
+
+        low, moderate, high = RAIN_SCORES[self.profile.get('rain_preference', 'neutral')]
+        precip_score = np.where(precipitation <= 20, low, np.where(precipitation <= 50, moderate, high))
+        precip_score = precip_score.astype(np.float64)
+
+        overall = (temp_score * self.weights['temperature'] + humidity_score * self.weights['humidity']
+                   + wind_score * self.weights['wind'] + precip_score * self.weights['precipitation'])
+        return {
+            'overall': overall,
+            'temperature': temp_score,
+            'humidity': humidity_score,
+            'wind': wind_score,
+            'precipitation': precip_score,
+        }
+
+    def score_frame(self, frame) -> np.ndarray:
+        """Hourly overall comfort scores for a WeatherFrame"""
+        return self.score_arrays(frame.temperature, frame.humidity,
+                                 frame.wind_speed, frame.precipitation_probability)['overall']
+
     def _temperature_comfort(self, temperature: float) -> float:
         """Calculate temperature comfort score"""
         temp_min = self.profile.get('temp_min', 18)
@@ -69,8 +155,7 @@ class ComfortCalculator:
             distance = temperature - temp_max
         
         # Exponential decay with activity level adjustment
-        activity_factor = {'low': 3, 'medium': 5, 'high': 7}
-        factor = activity_factor.get(self.profile.get('activity_level', 'medium'), 5)
+        factor = ACTIVITY_DECAY.get(self.profile.get('activity_level', 'medium'), 5)
         
         return max(0, 100 * math.exp(-distance / factor))
     
@@ -78,13 +163,7 @@ class ComfortCalculator:
         """Calculate humidity comfort score"""
         tolerance = self.profile.get('humidity_tolerance', 'medium')
         
-        comfort_ranges = {
-            'low': (20, 50),      # Prefers dry conditions
-            'medium': (30, 70),   # Moderate humidity
-            'high': (40, 85)      # Comfortable with high humidity
-        }
-        
-        min_comfort, max_comfort = comfort_ranges[tolerance]
+        min_comfort, max_comfort = HUMIDITY_RANGES[tolerance]
         
         if min_comfort <= humidity <= max_comfort:
             return 100
@@ -103,13 +182,7 @@ class ComfortCalculator:
         tolerance = self.profile.get('wind_tolerance', 'medium')
         
         # Wind comfort thresholds (km/h)
-        thresholds = {
-            'low': (0, 15),      # Prefers calm conditions
-            'medium': (5, 25),   # Light breeze preferred
-            'high': (10, 35)     # Enjoys stronger winds
-        }
-        
-        min_wind, max_wind = thresholds[tolerance]
+        min_wind, max_wind = WIND_RANGES_KMH[tolerance]
         
         if min_wind <= wind_kmh <= max_wind:
             return 100
@@ -124,12 +197,13 @@ class ComfortCalculator:
         """Calculate precipitation comfort score"""
         rain_preference = self.profile.get('rain_preference', 'neutral')
         
+        low, moderate, high = RAIN_SCORES[rain_preference]
         if precipitation <= 20:  # Low chance of rain
-            return {'dislike': 100, 'neutral': 95, 'like': 80}[rain_preference]
+            return low
         elif precipitation <= 50:  # Moderate chance
-            return {'dislike': 60, 'neutral': 75, 'like': 90}[rain_preference]
+            return moderate
         else:  # High chance of rain
-            return {'dislike': 20, 'neutral': 50, 'like': 85}[rain_preference]
+            return high
     
     def _calculate_weights(self) -> Dict[str, float]:
         """Calculate comfort parameter weights based on activity level"""
@@ -214,4 +288,32 @@ class ComfortCalculator:
         elif precip > 40:
             recommendations.append("Possible rain. Consider bringing an umbrella.")
         
-        return recommendations if recommendations else ["Weather conditions noted in your assessment."]
\ No newline at end of file
+        return recommendations if recommendations else ["Weather conditions noted in your assessment."]
+
+
+def classify_comfort(score: float) -> tuple:
+    """NASA-enhanced comfort classification of a dashboard score"""
+    if score >= 85:
+        return "Excellent Conditions", "green"
+    elif score >= 70:
+        return "Very Comfortable", "lightgreen"
+    elif score >= 55:
+        return "Comfortable", "orange"
+    elif score >= 35:
+        return "Uncomfortable", "red"
+    else:
+        return "Poor Conditions", "darkred"
+
+
+def ml_blend_weight(provider: str) -> float:
+    """Share of the location model's prediction in the dashboard score"""
+    return 0.4 if provider == 'NASA POWER' else 0.3  # Higher ML weight for NASA's satellite data
+
+
+def blend_score(formula_score: float, ml_predicted, provider: str) -> int:
+    """Blend the formula score with the location model's prediction"""
+    if ml_predicted is None:
+        # No trained model for this location yet: formula score only
+        return round(formula_score)
+    beta = ml_blend_weight(provider)
+    return round(beta * ml_predicted + (1 - beta) * formula_score)
@@ -0,0 +1,149 @@
+"""
+VAYU Comfort Test Vectors
+Shared expected scores that keep static/js/comfort.js in step with ComfortCalculator
+
+The settings page previews preference changes with a JavaScript port of
+the scoring, so the two implementations must agree. `build_vectors`
+scores a fixed, seeded mix of profiles and conditions with the Python
+calculator (boundary values included). `flask vayu-comfort-vectors --write`
+stores the result in utils/comfort_vectors.json, and `flask
+vayu-comfort-vectors` replays the file through both implementations
+(the JS one under node). A scoring change that is not mirrored on the
+other side fails that check.
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+from typing import Any, Dict, List, Optional
+
+from utils.comfort_calculator import (ComfortCalculator, HUMIDITY_RANGES, WIND_RANGES_KMH, blend_score,
+                                      classify_comfort, ml_blend_weight)
+
+VECTOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'comfort_vectors.json')
+COMFORT_JS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'js', 'comfort.js')
+VECTOR_VERSION = 1
+# Raw component scores may differ in the last bits between libm and V8's exp()
+TOLERANCE = 1e-9
+
+_NODE_CHECK = ("const comfort = require(process.argv[1]);"
+               "const vectors = require(process.argv[2]);"
+               "const failures = comfort.checkVectors(vectors, %r);"
+               "console.log(JSON.stringify(failures));"
+               "process.exit(failures.length ? 1 : 0);" % TOLERANCE)
+
+
+def _profiles(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    levels = ('low', 'medium', 'high')
+    profiles = []
+    for _ in range(count):
+        temp_min = rng.randint(0, 28)
+        profiles.append({
+            'temp_min': temp_min,
+            'temp_max': temp_min + rng.randint(2, 14),
+            'humidity_tolerance': rng.choice(levels),
+            'wind_tolerance': rng.choice(levels),
+            'rain_preference': rng.choice(('dislike', 'neutral', 'like')),
+            'activity_level': rng.choice(levels),
+        })
+    return profiles
+
+
+def _conditions(rng: random.Random, profile: Dict[str, Any]) -> Dict[str, float]:
+    """Random conditions, or values sitting exactly on one of the profile's boundaries"""
+    weather = {
+        'temperature': round(rng.uniform(-15, 45), 1),
+        'relativehumidity_2m': rng.randint(0, 100),
+        'windspeed_10m': round(rng.uniform(0, 16), 2),
+        'precipitation_probability': rng.randint(0, 100),
+    }
+    edge = rng.randrange(6)
+    if edge == 0:
+        weather['temperature'] = rng.choice((profile['temp_min'], profile['temp_max']))
+    elif edge == 1:
+        weather['relativehumidity_2m'] = rng.choice(HUMIDITY_RANGES[profile['humidity_tolerance']])
+    elif edge == 2:
+        weather['windspeed_10m'] = rng.choice(WIND_RANGES_KMH[profile['wind_tolerance']]) / 3.6
+    elif edge == 3:
+        weather['precipitation_probability'] = rng.choice((20, 21, 50, 51))
+    return weather
+
+
+def _score(profile: Dict[str, Any], weather: Dict[str, float], ml_predicted: Optional[float],
+           provider: str) -> Dict[str, Any]:
+    calc = ComfortCalculator(profile)
+    result = calc.calculate(weather)
+    arrays = calc.score_arrays([weather['temperature']], [weather['relativehumidity_2m']],
+                               [weather['windspeed_10m']], [weather['precipitation_probability']])
+    dashboard_score = blend_score(result['overall_score'], ml_predicted, provider)
+    dashboard_level, dashboard_color = classify_comfort(dashboard_score)
+    return {
+        'scores': {name: float(values[0]) for name, values in arrays.items()},
+        'overall_score': result['overall_score'],
+        'comfort_level': result['comfort_level'],
+        'comfort_color': result['comfort_color'],
+        'breakdown': result['breakdown'],
+        'dashboard_score': dashboard_score,
+        'dashboard_level': dashboard_level,
+        'dashboard_color': dashboard_color,
+    }
+
+
+def build_vectors(count: int = 200, seed: int = 2024) -> Dict[str, Any]:
+    """Score `count` seeded cases with the Python implementation"""
+    rng = random.Random(seed)
+    cases = []
+    for profile in _profiles(rng, count):
+        weather = _conditions(rng, profile)
+        ml_predicted = None if rng.random() < 0.25 else round(rng.uniform(0, 100), 2)
+        provider = rng.choice(('NASA POWER', 'Open-Meteo'))
+        case = {'profile': profile, 'weather': weather, 'ml_predicted': ml_predicted, 'provider': provider,
+                'ml_weight': ml_blend_weight(provider)}
+        case['expected'] = _score(profile, weather, ml_predicted, provider)
+        cases.append(case)
+    return {'version': VECTOR_VERSION, 'seed': seed, 'cases': cases}
+
+
+def write_vectors(path: str = VECTOR_FILE, **kwargs: Any) -> int:
+    vectors = build_vectors(**kwargs)
+    # One case per line keeps regenerated files reviewable in a diff
+    cases = ',\n'.join(json.dumps(case, sort_keys=True, separators=(',', ':')) for case in vectors['cases'])
+    with open(path, 'w') as f:
+        f.write(f'{{"version":{vectors["version"]},"seed":{vectors["seed"]},"cases":[\n{cases}\n]}}\n')
+    return len(vectors['cases'])
+
+
+def _mismatches(expected: Dict[str, Any], actual: Dict[str, Any]) -> List[str]:
+    failures = []
+    for key, value in expected.items():
+        if key == 'scores':
+            failures += [f'scores.{name}' for name, score in value.items()
+                         if abs(actual['scores'][name] - score) > TOLERANCE]
+        elif actual[key] != value:
+            failures.append(key)
+    return failures
+
+
+def check_python(path: str = VECTOR_FILE) -> List[str]:
+    """Cases whose Python scores no longer match the vector file"""
+    with open(path) as f:
+        vectors = json.load(f)
+    failures = []
+    for i, case in enumerate(vectors['cases']):
+        actual = _score(case['profile'], case['weather'], case['ml_predicted'], case['provider'])
+        failures += [f'case {i}: {field}' for field in _mismatches(case['expected'], actual)]
+    return failures
+
+
+def check_js(path: str = VECTOR_FILE) -> Optional[List[str]]:
+    """Cases the JS port gets wrong, or None when node is not installed"""
+    node = shutil.which('node')
+    if node is None:
+        return None
+    result = subprocess.run([node, '-e', _NODE_CHECK, COMFORT_JS, path],
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode not in (0, 1):
+        return [result.stderr.strip() or f'node exited with {result.returncode}']
+    return json.loads(result.stdout or '[]')
@@ -0,0 +1,128 @@
+"""
+VAYU Location Compare
+Score several locations side by side for one comfort profile
+
+Geocoding and weather fetches for all locations run in parallel threads
+through the shared single-flight layer, so comparing five cities costs
+about one location's latency. All current conditions are scored in one
+vectorized pass and all hourly columns in another, with a single
+ComfortCalculator. Nothing is written to the database.
+"""
+
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.comfort_calculator import ComfortCalculator, classify_comfort
+from utils.metrics import metrics
+from utils.weather_api import WeatherAPI
+from utils.weather_frame import WeatherFrame
+
+logger = logging.getLogger(__name__)
+
+COMPARE_MAX_LOCATIONS = int(os.getenv('VAYU_COMPARE_MAX', '5'))
+
+
+def parse_locations(values: Iterable[str], limit: Optional[int] = None) -> List[str]:
+    """
+    Location names from repeated and/or comma-separated query values
+
+    Blank entries and case-insensitive duplicates are dropped; at most
+    `limit` names (default VAYU_COMPARE_MAX) are kept.
+    """
+    limit = limit or COMPARE_MAX_LOCATIONS
+    names: Dict[str, str] = {}
+    for value in values:
+        for name in value.split(','):
+            name = name.strip()
+            if name and name.lower() not in names:
+                names[name.lower()] = name
+    return list(names.values())[:limit]
+
+
+def _fetch(weather_api: WeatherAPI, name: str) -> Tuple[Optional[Dict[str, Any]], Optional[WeatherFrame]]:
+    coords = weather_api.get_coordinates(name)
+    if not coords:
+        return None, None
+    return coords, weather_api.fetch_weather(coords['lat'], coords['lon'], use_nasa=True)
+
+
+def fetch_locations(names: List[str], weather_api: Optional[WeatherAPI] = None) -> List[tuple]:
+    """(coords, frame) per name, fetched in parallel; either may be None"""
+    weather_api = weather_api or WeatherAPI()
+    if len(names) <= 1:
+        return [_fetch(weather_api, name) for name in names]
+    with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix='vayu-compare') as pool:
+        # Each task runs in a copy of the request context so logs keep the request id
+        futures = [pool.submit(contextvars.copy_context().run, _fetch, weather_api, name) for name in names]
+        return [future.result() for future in futures]
+
+
+def compare_locations(names: List[str], profile: Dict[str, Any],
+                      weather_api: Optional[WeatherAPI] = None) -> Dict[str, Any]:
+    """
+    Side-by-side comfort for several locations
+
+    Returns one entry per requested name, in request order (with an 'error'
+    for names that could not be resolved or fetched), plus the name of the
+    most comfortable location.
+    """
+    with metrics.stage('compare_fetch'):
+        fetched = fetch_locations(names, weather_api)
+    found = [(name, coords, frame) for name, (coords, frame) in zip(names, fetched) if frame is not None]
+
+    calc = ComfortCalculator(profile)
+    scored: Dict[str, Dict[str, Any]] = {}
+    if found:
+        with metrics.stage('scoring'):
+            current = np.array([[frame.current[column] for column in WeatherFrame.COLUMNS]
+                                for _, _, frame in found], dtype=np.float64)
+            now = calc.score_arrays(*current.T)
+            # Every location's hourly columns in one pass, split back afterwards
+            lengths = [len(frame) for _, _, frame in found]
+            hourly = calc.score_arrays(*(np.concatenate([frame.column(column) for _, _, frame in found])
+                                         for column in WeatherFrame.COLUMNS))['overall']
+            offsets = np.cumsum([0] + lengths)
+
+        for i, (name, coords, frame) in enumerate(found):
+            score = int(round(now['overall'][i]))
+            comfort_level, comfort_color = classify_comfort(score)
+            scores = hourly[offsets[i]:offsets[i + 1]]
+            scored[name] = {
+                'query': name,
+                'location': coords,
+                'provider': frame.provider,
+                'data_quality': frame.data_quality,
+                'weather': {
+                    'temperature': round(frame.current['temperature'], 1),
+                    'humidity': round(frame.current['humidity']),
+                    'wind_speed': round(frame.current['wind_speed'] * 3.6, 1),  # km/h
+                    'precipitation_probability': round(frame.current['precipitation_probability']),
+                },
+                'comfort': {
+                    'overall_score': score,
+                    'comfort_level': comfort_level,
+                    'comfort_color': comfort_color,
+                    'breakdown': {part: int(round(now[part][i]))
+                                  for part in ('temperature', 'humidity', 'wind', 'precipitation')},
+                },
+                'hourly': [{'time': str(frame.time[h])[11:16],
+                            'temperature': round(float(frame.temperature[h]), 1),
+                            'comfort': int(round(scores[h]))}
+                           for h in range(0, min(len(frame), 24), 2)],
+            }
+
+    results = []
+    for name, (coords, _) in zip(names, fetched):
+        if name in scored:
+            results.append(scored[name])
+        else:
+            error = 'Location not found' if coords is None else 'Weather data temporarily unavailable'
+            results.append({'query': name, 'error': error})
+
+    best = max(scored.values(), key=lambda r: r['comfort']['overall_score'], default=None)
+    return {'locations': results, 'best': best['query'] if best else None}
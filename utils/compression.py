@@ -0,0 +1,116 @@
+"""
+VAYU Response Compression
+Negotiated gzip/brotli compression for HTML, JSON and other text responses
+
+Buffered responses at or above VAYU_COMPRESS_MIN_SIZE bytes are compressed
+with the best encoding the client accepts. Brotli needs the optional
+`brotli` package; gzip is always available. Streamed (chunked) responses
+can be compressed incrementally as well: every chunk is flushed as soon as
+it is produced, so streaming latency is unchanged. Responses that already
+carry a Content-Encoding (the precompressed /assets/ files) are left alone.
+"""
+
+import gzip
+import os
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('VAYU_COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_STREAMS = os.getenv('VAYU_COMPRESS_STREAMS', 'true').lower() in ('1', 'true', 'yes')
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Good ratio at a per-request CPU cost close to gzip -6
+
+COMPRESSIBLE = frozenset({
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+})
+# Files sent with direct passthrough are only buffered up to this size
+BUFFER_LIMIT = 4 * 1024 * 1024
+
+
+def _chunked(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            out = compressor.process(chunk) + compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 = gzip container
+        for chunk in chunks:
+            out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if out:
+                yield out
+        yield compressor.flush()
+
+
+class Compression:
+    """
+    after_request hook that compresses eligible responses
+
+    Args:
+        min_size: Smallest body (bytes) worth compressing
+        streams: Also compress streamed responses chunk by chunk
+    """
+
+    def __init__(self, min_size: Optional[int] = None, streams: Optional[bool] = None):
+        self.min_size = COMPRESS_MIN_SIZE if min_size is None else min_size
+        self.streams = COMPRESS_STREAMS if streams is None else streams
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def init_app(self, app: Flask):
+        app.after_request(self.compress)
+
+    def compress(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+        # The representation depends on Accept-Encoding even when we send it as is
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        if response.direct_passthrough:
+            if response.content_length is None or response.content_length > BUFFER_LIMIT:
+                return response
+            response.direct_passthrough = False  # small file: read it and compress below
+            buffered = True
+        else:
+            buffered = not response.is_streamed
+
+        if not buffered:
+            if not self.streams:
+                return response
+            original = response.response
+            response.response = _chunked(response.iter_encoded(), encoding)
+            if hasattr(original, 'close'):
+                response.call_on_close(original.close)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            if encoding == 'br':
+                response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+            else:
+                response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))
+
+        response.headers['Content-Encoding'] = encoding
+        # Byte-level validators no longer describe the encoded body
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compression = Compression()
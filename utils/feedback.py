@@ -0,0 +1,217 @@
+"""
+VAYU Feedback Ingestion
+Append-only feedback events, folded into weather_logs and training in bulk
+
+/feedback only appends rows to feedback_events (one INSERT per request, for
+a single click or a batch). Nothing on that path reads or updates
+weather_logs, so a burst of clicks does not contend with dashboard writes.
+`fold_feedback` consumes the events that no fold has marked yet. It
+attaches each click to the user's latest weather log at the time of the
+click. The log updates and the events' folded_at marks commit in one
+transaction, so every event is applied exactly once. Unlike an id offset,
+this holds on PostgreSQL and MySQL, where ids can commit out of order. Then each
+location whose labels changed is retrained once. The fold runs in the
+background a few seconds after a click (VAYU_FEEDBACK_FOLD_DELAY) or from
+`flask vayu-feedback`.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select, update
+
+from models import ConsumerOffset, FeedbackEvent, WeatherLog, bulk_insert_feedback, db
+from utils.metrics import metrics
+from utils.ml_engine import MLEngine
+
+logger = logging.getLogger(__name__)
+
+# Seconds between a click and the background fold; 0 leaves folding to `flask vayu-feedback`
+FEEDBACK_FOLD_DELAY = float(os.getenv('VAYU_FEEDBACK_FOLD_DELAY', '5'))
+FEEDBACK_VALUES = ('good', 'bad')
+FEEDBACK_MAX_BATCH = 100
+# Replayed offline clicks older than this are stamped with their arrival time
+MAX_CLICK_AGE = timedelta(days=7)
+# A click only labels a weather log the user saw within this window before it
+LOOKBACK = timedelta(hours=24)
+CONSUMER = 'feedback-fold'
+
+
+def parse_events(payload: Any, received_at: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+    """
+    (feedback, clicked_at) pairs from a request payload
+
+    Accepts {'feedback': 'good'} or {'events': [{'feedback': 'good',
+    'queued_at': <ms since epoch>}, ...]}. `queued_at` is set by the
+    service worker for clicks made offline.
+
+    Raises:
+        ValueError: Not an object, an unknown feedback value or an oversized batch
+    """
+    if not isinstance(payload, Mapping):
+        raise ValueError('Send a JSON object')
+    received_at = received_at or datetime.utcnow()
+    items = payload.get('events') if isinstance(payload.get('events'), list) else [payload]
+    if not items or len(items) > FEEDBACK_MAX_BATCH:
+        raise ValueError(f'Send between 1 and {FEEDBACK_MAX_BATCH} feedback events')
+    events = []
+    for item in items:
+        value = item.get('feedback') if isinstance(item, dict) else None
+        if value not in FEEDBACK_VALUES:
+            raise ValueError(f"Feedback must be one of {', '.join(FEEDBACK_VALUES)}")
+        clicked_at = received_at
+        try:
+            queued = datetime.utcfromtimestamp(float(item['queued_at']) / 1000)
+            if received_at - MAX_CLICK_AGE <= queued <= received_at:
+                clicked_at = queued
+        except (KeyError, TypeError, ValueError, OverflowError, OSError):
+            pass
+        events.append((value, clicked_at))
+    return events
+
+
+def record_feedback(user_id: int, events: List[Tuple[str, datetime]]) -> int:
+    """Append events for a user in one statement; returns the number written"""
+    written = bulk_insert_feedback({'user_id': user_id, 'feedback': value, 'clicked_at': clicked_at}
+                                   for value, clicked_at in events)
+    metrics.inc('vayu_feedback_events_total', amount=written)
+    return written
+
+
+def _adopt_offset():
+    """Mark events an earlier, offset-based fold already applied, then drop its offset"""
+    row = db.session.get(ConsumerOffset, CONSUMER)
+    if row is None:
+        return
+    db.session.execute(update(FeedbackEvent)
+                       .where(FeedbackEvent.id <= row.position, FeedbackEvent.folded_at.is_(None))
+                       .values(folded_at=row.updated_at or datetime.utcnow()))
+    db.session.delete(row)
+    db.session.commit()
+
+
+def _latest_logs(events: List[Any]) -> Dict[int, Tuple[List[datetime], List[Tuple[int, str]]]]:
+    """Per user: log timestamps (sorted) and (log id, location), covering the batch's clicks"""
+    users = {event.user_id for event in events}
+    earliest = min(event.clicked_at for event in events) - LOOKBACK
+    latest = max(event.clicked_at for event in events)
+    rows = db.session.execute(
+        select(WeatherLog.user_id, WeatherLog.timestamp, WeatherLog.id, WeatherLog.location)
+        .where(WeatherLog.user_id.in_(users), WeatherLog.timestamp.between(earliest, latest))
+        .order_by(WeatherLog.user_id, WeatherLog.timestamp, WeatherLog.id))
+    logs: Dict[int, Tuple[List[datetime], List[Tuple[int, str]]]] = defaultdict(lambda: ([], []))
+    for user_id, timestamp, log_id, location in rows:
+        logs[user_id][0].append(timestamp)
+        logs[user_id][1].append((log_id, location))
+    return logs
+
+
+def fold_feedback(batch_size: int = 5000, train: bool = True) -> Dict[str, Any]:
+    """
+    Apply every event not yet folded to weather_logs
+
+    Returns:
+        Stats: events read, logs labelled, events without a log to label,
+        retrained locations and seconds taken
+    """
+    started = time.perf_counter()
+    stats = {'events': 0, 'labelled': 0, 'unmatched': 0, 'locations': [], 'seconds': 0.0}
+    touched = set()
+    _adopt_offset()
+    while True:
+        events = db.session.execute(
+            select(FeedbackEvent.id, FeedbackEvent.user_id, FeedbackEvent.feedback, FeedbackEvent.clicked_at)
+            .where(FeedbackEvent.folded_at.is_(None)).order_by(FeedbackEvent.id).limit(batch_size)).all()
+        if not events:
+            break
+
+        logs = _latest_logs(events)
+        labels: Dict[int, Tuple[datetime, str]] = {}  # The latest click on a log wins, even if replayed later
+        for event in events:
+            timestamps, entries = logs.get(event.user_id, ((), ()))
+            i = bisect.bisect_right(timestamps, event.clicked_at) - 1
+            # The batch's window reaches back from its earliest click, so later clicks can find older logs
+            if i < 0 or event.clicked_at - timestamps[i] > LOOKBACK:
+                stats['unmatched'] += 1
+                continue
+            log_id, location = entries[i]
+            if log_id not in labels or labels[log_id][0] <= event.clicked_at:
+                labels[log_id] = (event.clicked_at, event.feedback)
+            touched.add(location)
+
+        # Claiming only still-unfolded rows keeps concurrent folds from double-applying
+        claimed = db.session.execute(
+            update(FeedbackEvent)
+            .where(FeedbackEvent.id.in_([event.id for event in events]), FeedbackEvent.folded_at.is_(None))
+            .values(folded_at=datetime.utcnow())).rowcount
+        if claimed != len(events):
+            db.session.rollback()
+            logger.info("Feedback fold raced another consumer; retrying with what is left")
+            continue
+        if labels:
+            db.session.execute(update(WeatherLog), [{'id': log_id, 'user_feedback': value}
+                                                    for log_id, (_, value) in labels.items()])
+        db.session.commit()
+        stats['events'] += len(events)
+        stats['labelled'] += len(labels)
+
+    if train and touched:
+        for location in sorted(touched):
+            with metrics.stage('training'):
+                MLEngine().train_on_all(location)
+    stats['locations'] = sorted(touched)
+    stats['seconds'] = time.perf_counter() - started
+    metrics.inc('vayu_feedback_folded_total', amount=stats['events'])
+    return stats
+
+
+class FeedbackFolder:
+    """
+    Debounced background fold: the first click schedules one run after
+    `delay` seconds, and every click until then rides along with it
+
+    Args:
+        delay: Seconds to wait (0 disables background folding)
+    """
+
+    def __init__(self, delay: Optional[float] = None):
+        self.delay = FEEDBACK_FOLD_DELAY if delay is None else delay
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def schedule(self, app):
+        if self.delay <= 0:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.delay, self._run, args=(app,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self, app):
+        with self._lock:
+            self._timer = None
+        with app.app_context():
+            try:
+                stats = fold_feedback()
+                logger.info("Feedback folded", extra={'fields': {
+                    'events': stats['events'], 'labelled': stats['labelled'],
+                    'locations': len(stats['locations']), 'seconds': round(stats['seconds'], 3)}})
+            except Exception as e:
+                logger.error("Feedback fold failed: %s", e, exc_info=True)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+feedback_folder = FeedbackFolder()
+
+metrics.describe('vayu_feedback_events_total', 'Feedback events appended by /feedback')
+metrics.describe('vayu_feedback_folded_total', 'Feedback events folded into weather_logs')
@@ -0,0 +1,333 @@
+"""
+VAYU Provider Health
+Live latency/success statistics per provider, a background prober and the router built on them
+
+Every NASA POWER and Open-Meteo weather fetch reports its latency, whether
+it succeeded and how old its data is. Real traffic and a background prober
+both feed these reports. The prober makes one small request per provider
+every VAYU_HEALTH_PROBE_INTERVAL seconds, so the numbers stay current when
+traffic is light. `ProviderHealth.route` turns the stats into a provider
+order for each fetch:
+
+- NASA POWER stays first (it is the primary source), unless one of these
+  holds: its expected cost (EWMA latency divided by success rate) exceeds
+  Open-Meteo's by more than VAYU_ROUTE_SLACK seconds, its data is older
+  than VAYU_MAX_DATA_AGE_HOURS, or it is failing (several failures in a
+  row, or a success rate below one half).
+- A failing provider is still tried last, so a recovery is noticed.
+
+Each worker keeps its own stats, but only one process per host probes.
+Every worker runs the prober thread; the one holding the prober lock file
+in VAYU_ADMISSION_DIR probes and publishes each round to a state file next
+to it, and the others load that round into their own stats. When the
+holder exits its lock is released and the next worker to try takes over.
+Without file locks (Windows, or VAYU_ADMISSION_SHARED off) every worker
+probes for itself.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from utils.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: every worker probes for itself
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = float(os.getenv('VAYU_HEALTH_PROBE_INTERVAL', '60'))
+ROUTE_SLACK = float(os.getenv('VAYU_ROUTE_SLACK', '1.0'))
+MAX_DATA_AGE = float(os.getenv('VAYU_MAX_DATA_AGE_HOURS', '240')) * 3600
+# Probe point (lat, lon); the default is the dashboard's default location
+PROBE_POINT = tuple(float(v) for v in os.getenv('VAYU_HEALTH_PROBE_POINT', '28.61,77.21').split(','))
+PROVIDERS = ('nasa_power', 'open_meteo')
+EWMA_ALPHA = 0.3
+FAILING_STREAK = 3
+# Stats older than this no longer steer routing
+STATS_TTL = 30 * 60
+
+# Set on the prober thread while it probes, to collect what the fetches report
+_probe_round = threading.local()
+
+
+class _Stats:
+    __slots__ = ('latency', 'success', 'recent', 'samples', 'streak', 'data_age', 'last_ok', 'last_error',
+                 'updated')
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.success: Optional[float] = None
+        self.recent: Deque[float] = deque(maxlen=50)
+        self.samples = 0
+        self.streak = 0  # Consecutive failures
+        self.data_age: Optional[float] = None
+        self.last_ok: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.updated = 0.0
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else previous + EWMA_ALPHA * (value - previous)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ProviderHealth:
+    """
+    Rolling health of each provider
+
+    Args:
+        slack: Seconds of extra expected cost NASA POWER may have before it is demoted
+        max_data_age: Seconds of data age beyond which a provider is demoted
+    """
+
+    def __init__(self, slack: Optional[float] = None, max_data_age: Optional[float] = None):
+        self.slack = ROUTE_SLACK if slack is None else slack
+        self.max_data_age = MAX_DATA_AGE if max_data_age is None else max_data_age
+        self._stats: Dict[str, _Stats] = {provider: _Stats() for provider in PROVIDERS}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float, ok: bool, data_age: Optional[float] = None,
+               error: Optional[str] = None):
+        """Report one upstream call; `data_age` is how old (seconds) the returned data is"""
+        with self._lock:
+            stats = self._stats.setdefault(provider, _Stats())
+            stats.latency = _ewma(stats.latency, seconds)
+            stats.success = _ewma(stats.success, 1.0 if ok else 0.0)
+            stats.samples += 1
+            stats.updated = time.time()
+            if ok:
+                stats.recent.append(seconds)
+                stats.streak = 0
+                stats.last_ok = stats.updated
+                if data_age is not None:
+                    stats.data_age = data_age
+            else:
+                stats.streak += 1
+                stats.last_error = error
+        results = getattr(_probe_round, 'results', None)
+        if results is not None:
+            results.append([provider, seconds, ok, data_age, error])
+        metrics.observe('vayu_provider_latency_seconds', seconds, {'provider': provider})
+
+    def _failing(self, stats: _Stats) -> bool:
+        return stats.streak >= FAILING_STREAK or (stats.success is not None and stats.success < 0.5)
+
+    def _cost(self, stats: _Stats) -> float:
+        """Expected seconds to a usable answer: each failure costs another attempt"""
+        return stats.latency / max(stats.success, 0.05)
+
+    def route(self, providers: Optional[List[str]] = None, record: bool = True) -> List[str]:
+        """Provider order for the next fetch (primary first when it is competitive)"""
+        order = list(providers or PROVIDERS)
+        now = time.time()
+        with self._lock:
+            stats = {p: self._stats[p] for p in order if p in self._stats and
+                     self._stats[p].samples and now - self._stats[p].updated < STATS_TTL}
+            if len(stats) < 2:
+                return order
+
+            def demoted(provider: str) -> bool:
+                s = stats.get(provider)
+                if s is None:
+                    return False
+                if self._failing(s) or (s.data_age is not None and s.data_age > self.max_data_age):
+                    return True
+                # Only a working alternative can take over
+                best = min((self._cost(other) for name, other in stats.items()
+                            if name != provider and not self._failing(other)), default=None)
+                return best is not None and self._cost(s) > best + self.slack
+
+            flags = {provider: demoted(provider) for provider in order}
+        # Stable: healthy providers keep their priority order, demoted ones follow
+        routed = [p for p in order if not flags[p]] + [p for p in order if flags[p]]
+        if record and routed != order:
+            metrics.inc('vayu_provider_reroutes_total', {'primary': routed[0]})
+        return routed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Live numbers per provider, for /api/status"""
+        def ms(value):
+            return None if value is None else round(value * 1000, 1)
+
+        def iso(stamp):
+            return None if stamp is None else time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(stamp))
+
+        with self._lock:
+            result = {}
+            for provider, stats in self._stats.items():
+                recent = list(stats.recent)
+                if not stats.samples:
+                    status = 'unknown'
+                elif self._failing(stats):
+                    status = 'down'
+                elif stats.streak or stats.success < 0.9:
+                    status = 'degraded'
+                else:
+                    status = 'healthy'
+                result[provider] = {
+                    'status': status,
+                    'samples': stats.samples,
+                    'latency_ewma_ms': ms(stats.latency),
+                    'latency_p50_ms': ms(_percentile(recent, 0.5)),
+                    'latency_p95_ms': ms(_percentile(recent, 0.95)),
+                    'success_rate': None if stats.success is None else round(stats.success, 3),
+                    'consecutive_failures': stats.streak,
+                    'data_age_hours': None if stats.data_age is None else round(stats.data_age / 3600, 1),
+                    'last_success': iso(stats.last_ok),
+                    'last_error': stats.last_error,
+                    'updated': iso(stats.updated or None),
+                }
+        return result
+
+
+class HealthProber:
+    """
+    Background thread that probes every provider on an interval
+
+    Started by the first request a worker serves, so CLI commands and
+    imports never spawn it. Only the process holding the host's prober
+    lock sends probes; the others import the rounds it publishes.
+
+    Args:
+        interval: Seconds between probe rounds (0 disables probing)
+        health: Stats that probe rounds from other processes are loaded into
+        shared: Elect one prober per host through a lock file
+        state_dir: Directory for the lock and the published rounds
+    """
+
+    def __init__(self, interval: Optional[float] = None, health: Optional[ProviderHealth] = None,
+                 shared: Optional[bool] = None, state_dir: Optional[str] = None):
+        self.interval = PROBE_INTERVAL if interval is None else interval
+        self.health = health or provider_health
+        if shared is None:
+            shared = os.getenv('VAYU_ADMISSION_SHARED', 'true').lower() in ('1', 'true', 'yes')
+        self.state_dir = state_dir or os.getenv('VAYU_ADMISSION_DIR') or \
+            os.path.join(tempfile.gettempdir(), 'vayu-admission')
+        self.shared = shared and fcntl is not None
+        self._held = None  # Open lock file while this process is the prober
+        self._seen = 0.0  # Time of the last published round loaded
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='vayu-health-prober', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._held is not None:
+            self._held.close()  # Releases the lock for another worker
+            self._held = None
+
+    def probe(self) -> List[list]:
+        """
+        One probe round; results reach provider_health through the fetches' own reporting
+
+        Returns:
+            The round's reports as [provider, seconds, ok, data_age, error]
+        """
+        from utils.weather_api import WeatherAPI
+
+        lat, lon = PROBE_POINT
+        api = WeatherAPI()
+        _probe_round.results = results = []
+        try:
+            for name, fetch in (('nasa_power', lambda: api.nasa_api._fetch_current_weather(lat, lon, 'ag')),
+                                ('open_meteo', lambda: api._request_openmeteo_weather(lat, lon))):
+                try:
+                    fetch()  # Bypasses single-flight: a probe must reach the provider
+                except Exception as e:
+                    logger.warning("health probe of %s failed: %s", name, e)
+        finally:
+            _probe_round.results = None
+        return results
+
+    def run_once(self) -> bool:
+        """One interval: probe and publish as the host's prober, or load its latest round; True if this probed"""
+        if not self.shared:
+            self.probe()
+            return True
+        if not self._elected():
+            self._load()
+            return False
+        self._publish(self.probe())
+        return True
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.state_dir, name)
+
+    def _elected(self) -> bool:
+        """Whether this process holds the prober lock, taking it when it is free"""
+        if self._held is not None:
+            return True
+        f = None
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            f = open(self._path('health-prober.lock'), 'a')
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:  # Another worker probes (or the directory is unusable)
+            if f is not None:
+                f.close()
+            return False
+        self._held = f
+        logger.info("Worker %d is now the provider health prober for this host", os.getpid())
+        return True
+
+    def _publish(self, results: List[list]):
+        path = self._path('health.json')
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'at': time.time(), 'results': results}, f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("health probe round not published: %s", e)
+
+    def _load(self):
+        """Record the prober's latest round into this worker's stats, once"""
+        try:
+            with open(self._path('health.json')) as f:
+                published = json.load(f)
+            at, results = float(published['at']), published['results']
+        except (OSError, ValueError, KeyError, TypeError):  # Nothing published yet
+            return
+        if at <= self._seen:
+            return
+        self._seen = at
+        for provider, seconds, ok, data_age, error in results:
+            self.health.record(provider, seconds, ok, data_age=data_age, error=error)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning("health prober round failed: %s", e)
+            self._stop.wait(self.interval)
+
+
+# Shared by every WeatherAPI instance in the process
+provider_health = ProviderHealth()
+health_prober = HealthProber()
+
+metrics.describe('vayu_provider_latency_seconds', 'Latency of weather fetches per provider (traffic and probes)')
+metrics.describe('vayu_provider_reroutes_total', 'Fetches routed away from the default provider order')
@@ -0,0 +1,75 @@
+"""
+VAYU JSON Provider
+Flask JSON provider backed by orjson, with native NumPy support
+
+With the optional `orjson` package installed, jsonify() and request.get_json()
+go through it. Responses are produced as bytes with no intermediate str, and
+NumPy arrays and scalars are serialized directly instead of through
+.tolist(). Without orjson (or with VAYU_JSON_BACKEND=json) the stdlib
+encoder is used, and NumPy values are converted in `default`. Output
+matches Flask's own provider: sorted keys, HTTP dates, pretty-printed in
+debug mode.
+"""
+
+import os
+from typing import Any
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib json with a NumPy-aware default
+    orjson = None
+
+JSON_BACKEND = os.getenv('VAYU_JSON_BACKEND', 'auto').lower()
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    # Flask's own conversions (dates, decimals, UUIDs, dataclasses, __html__)
+    return DefaultJSONProvider.default(o)
+
+
+class VayuJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with an orjson fast path"""
+
+    default = staticmethod(_default)
+
+    def __init__(self, app):
+        super().__init__(app)
+        backend = JSON_BACKEND if JSON_BACKEND != 'auto' else ('orjson' if orjson else 'json')
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError("VAYU_JSON_BACKEND=orjson but the orjson package is not installed")
+        self.backend = backend
+
+    def _options(self) -> int:
+        # Dates go through `default` so they keep Flask's HTTP date format
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return (options | orjson.OPT_SORT_KEYS) if self.sort_keys else options
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Compact UTF-8 JSON for obj"""
+        if self.backend == 'orjson':
+            return orjson.dumps(obj, default=_default, option=self._options())
+        return self.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self.backend == 'orjson' and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if self.backend != 'orjson' or self.compact is False or (self.compact is None and self._app.debug):
+            # Pretty-printed output stays on the stdlib path
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
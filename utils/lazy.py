@@ -0,0 +1,37 @@
+"""
+VAYU Lazy Imports
+Defer loading of heavy third-party modules until first attribute access
+"""
+
+import importlib
+import importlib.util
+from types import ModuleType
+
+
+class _LazyModule(ModuleType):
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_vayu_module'] = None
+
+    def __getattr__(self, attr: str):
+        module = self.__dict__['_vayu_module']
+        if module is None:
+            # import_module holds the per-module import lock, so concurrent
+            # first accesses from several request threads are safe
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_vayu_module'] = module
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return a module proxy that only imports `name` when first used
+
+    The real module is still registered in sys.modules under its own name, so
+    code that imports it normally (or patches it in tests) sees the same object.
+    """
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named '{name}'")
+    return _LazyModule(name)
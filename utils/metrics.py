@@ -0,0 +1,189 @@
+"""
+VAYU Request Metrics
+In-process counters and latency histograms exposed in Prometheus text format
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets (seconds) covering in-process work up to slow upstream calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    """Label value escaping required by the text exposition format"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    body = ','.join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return '{' + body + '}'
+
+
+class _Histogram:
+    """Fixed-bucket histogram; counts are cumulative only when rendered"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Minimal metrics registry for VAYU
+
+    Counters and histograms are keyed by metric name plus a sorted label tuple.
+    Every update is a dict lookup and an integer add under one lock, so the
+    overhead per observation stays in the low microseconds.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, text: str):
+        """Register HELP text for a metric"""
+        self._help[name] = text
+
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, amount: float = 1):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None,
+                buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Record a histogram observation"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Time a named pipeline stage and count failures"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('vayu_stage_errors_total', {'stage': stage})
+            raise
+        finally:
+            self.observe('vayu_stage_duration_seconds', time.perf_counter() - start, {'stage': stage})
+
+    def record_upstream(self, provider: str, ok: bool):
+        """Count an outbound call to a weather/geocoding provider"""
+        self.inc('vayu_upstream_requests_total',
+                 {'provider': provider, 'outcome': 'success' if ok else 'error'})
+
+    def record_cache(self, cache: str, hit: bool):
+        """Count a cache lookup"""
+        self.inc('vayu_cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+    def counter_value(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _ratio_lines(self, counter: str, group_label: str, outcome_label: str,
+                     numerator: str, gauge: str) -> List[str]:
+        """Derive a per-group ratio gauge (e.g. cache hit ratio) from a counter"""
+        totals: Dict[str, List[float]] = {}
+        for key, value in self._counters.get(counter, {}).items():
+            labels = dict(key)
+            group = labels.get(group_label)
+            if group is None:
+                continue
+            entry = totals.setdefault(group, [0.0, 0.0])
+            entry[1] += value
+            if labels.get(outcome_label) == numerator:
+                entry[0] += value
+        lines = []
+        if totals:
+            lines.append(f'# TYPE {gauge} gauge')
+            for group, (num, total) in sorted(totals.items()):
+                ratio = num / total if total else 0.0
+                lines.append(f'{gauge}{_format_labels(((group_label, group),))} {ratio:.6f}')
+        return lines
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} counter')
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f'{name}{_format_labels(key)} {value:g}')
+
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+                for key, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(key, ("le", f"{bound:g}"))} {cumulative}')
+                    lines.append(f'{name}_bucket{_format_labels(key, ("le", "+Inf"))} {hist.count}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {hist.total:.6f}')
+                    lines.append(f'{name}_count{_format_labels(key)} {hist.count}')
+
+            lines += self._ratio_lines('vayu_cache_requests_total', 'cache', 'result', 'hit',
+                                       'vayu_cache_hit_ratio')
+            lines += self._ratio_lines('vayu_upstream_requests_total', 'provider', 'outcome', 'error',
+                                       'vayu_upstream_error_ratio')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry(enabled=os.getenv('VAYU_METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no'))
+
+metrics.describe('vayu_http_requests_total', 'HTTP requests by endpoint and status code')
+metrics.describe('vayu_http_request_duration_seconds', 'End-to-end request latency by endpoint')
+metrics.describe('vayu_stage_duration_seconds', 'Latency of individual pipeline stages')
+metrics.describe('vayu_stage_errors_total', 'Pipeline stages that raised an exception')
+metrics.describe('vayu_upstream_requests_total', 'Outbound provider calls by outcome')
+metrics.describe('vayu_cache_requests_total', 'Cache lookups by result')
@@ -1,53 +1,100 @@
-import pickle, os
-from sklearn.linear_model import LinearRegression
-from models import WeatherLog, MLPrediction, db
+import pickle, os, re, hashlib, tempfile
+from models import MLPrediction, db
+from utils.training_data import load_training_data
 
+# Legacy single-model artifact, still used when a location has no model yet
 MODEL_PATH = 'comfort_model.pkl'
+# Per-location artifacts written by train_on_all and `flask vayu-retrain`
+MODEL_DIR = os.getenv('VAYU_MODEL_DIR', 'comfort_models')
+
+def _new_model():
+    # scikit-learn costs over a second to import, so only pay for it when
+    # a request actually trains or predicts
+    from sklearn.linear_model import LinearRegression
+    return LinearRegression()
+
+def model_path(location, model_dir=None):
+    """Artifact path for a location's model (readable slug + hash for uniqueness)."""
+    slug = re.sub(r'[^a-z0-9]+', '-', location.lower()).strip('-')[:40] or 'location'
+    digest = hashlib.sha1(location.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(model_dir or MODEL_DIR, f'{slug}-{digest}.pkl')
+
+def save_model(model, path):
+    """Pickle to a temp file beside the target, then rename it into place.
+
+    Readers never see a half-written model, even with several workers or a
+    batch retrain writing the same location at once.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.model-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(model, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def load_model(location):
+    """Location model if one was trained, else the legacy shared model, else None."""
+    for path in (model_path(location), MODEL_PATH):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+    return None
 
 class MLEngine:
     def __init__(self):
-        # Always create a fresh LinearRegression instance
-        self.model = LinearRegression()
+        # Model is created lazily on first train/predict
+        self.model = None
 
     def train_on_all(self, location):
         """Retrain on all logged feedback for this location."""
-        # Fetch all logs with user_feedback
-        logs = WeatherLog.query.filter(
-            WeatherLog.location == location,
-            WeatherLog.user_feedback.isnot(None)
-        ).all()
-        
-        if not logs:
-            return  # No data yet
-        
-        X = [[log.temperature, log.humidity, log.wind_speed, log.precipitation] for log in logs]
-        y = [log.comfort_score for log in logs]
-
-        # Fit the model on the full dataset
-        self.model.fit(X, y)
+        # Stream the feature columns of logs with user_feedback into arrays
+        data = load_training_data(location)
+
+        if len(data) < 2:
+            return  # Not enough data yet
+
+        # Fit a fresh model on the full dataset
+        self.model = _new_model()
+        self.model.fit(data.X, data.y)
 
         # Persist model to disk
-        with open(MODEL_PATH, 'wb') as f:
-            pickle.dump(self.model, f)
+        save_model(self.model, model_path(location))
 
-    def predict_and_store(self, location, weather_conditions):
-        """Predict comfort and save to MLPrediction."""
+    def predict(self, location, weather_conditions):
+        """Predict comfort without storing it.
+
+        Returns None when no trained model exists for the location yet.
+        """
         X_pred = [[
             weather_conditions['temperature'],
             weather_conditions['humidity'],
             weather_conditions['wind_speed'],
             weather_conditions['precipitation']
         ]]
-        
-        # Load persisted model if exists
-        if os.path.exists(MODEL_PATH):
-            with open(MODEL_PATH, 'rb') as f:
-                self.model = pickle.load(f)
-        
+
+        # Prefer the freshly trained model, then whatever is persisted
+        if self.model is None:
+            self.model = load_model(location)
+        if self.model is None:
+            return None
+
         # Perform prediction
         pred_score = round(self.model.predict(X_pred)[0])
         # Clamp prediction to [0, 100]
-        pred_score = max(0, min(100, pred_score))
+        return max(0, min(100, pred_score))
+
+    def predict_and_store(self, location, weather_conditions):
+        """Predict comfort and save to MLPrediction.
+
+        Returns None when no trained model exists for the location yet.
+        """
+        pred_score = self.predict(location, weather_conditions)
+        if pred_score is None:
+            return None
 
         # Save to database
         mlp = MLPrediction(
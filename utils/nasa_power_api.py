@@ -4,11 +4,24 @@ Integrates with NASA's Prediction of Worldwide Energy Resources (POWER) API
 for comprehensive meteorological data from satellite observations.
 """
 
-import requests
 import json
+import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Any
 import logging
+from utils.lazy import lazy_import
+from utils.metrics import metrics
+from utils.admission import upstream_limiter, upstream_timeout
+from utils.health import provider_health
+from utils.singleflight import upstream_flight, grid_cell
+from utils.structured_logging import log_payload
+
+requests = lazy_import('requests')
+logger = logging.getLogger(__name__)
+
+# NASA POWER marks missing values with -999
+FILL_VALUE = -999.0
 
 class NASAPowerAPI:
     """
@@ -19,7 +32,9 @@ class NASAPowerAPI:
     """
     
     def __init__(self):
-        self.base_url = "https://power.larc.nasa.gov/api/temporal"
+        # Endpoints are overridable so benchmarks can point at a local stand-in
+        self.base_url = os.getenv('VAYU_NASA_POWER_URL', "https://power.larc.nasa.gov/api/temporal")
+        self.geocoding_base = os.getenv('VAYU_GEOCODING_URL', "https://geocoding-api.open-meteo.com/v1")
         self.parameters = {
             # Temperature parameters
             'T2M': 'Temperature at 2 Meters (°C)',
@@ -56,10 +71,16 @@ class NASAPowerAPI:
         For now, we'll use a simple geocoding service, but NASA recommends
         using their coordinate validation
         """
+        key = ('geocode', location.strip().lower())
+        return upstream_flight.do(key, lambda: self._get_coordinates(location))
+
+    def _get_coordinates(self, location: str) -> Optional[Dict[str, Any]]:
+        if not upstream_limiter.acquire('open_meteo'):
+            return None
         try:
             # Using a basic geocoding service - in production you'd want
             # to integrate with NASA's coordinate validation
-            geocoding_url = f"https://geocoding-api.open-meteo.com/v1/search"
+            geocoding_url = f"{self.geocoding_base}/search"
             params = {
                 'name': location,
                 'count': 1,
@@ -67,9 +88,11 @@ class NASAPowerAPI:
                 'format': 'json'
             }
             
-            response = requests.get(geocoding_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            with metrics.stage('geocode'):
+                response = requests.get(geocoding_url, params=params, timeout=upstream_timeout(10))
+                response.raise_for_status()
+                data = response.json()
+            metrics.record_upstream('open_meteo_geocoding', True)
             
             if data.get('results'):
                 result = data['results'][0]
@@ -83,7 +106,8 @@ class NASAPowerAPI:
             return None
             
         except Exception as e:
-            logging.error(f"Geocoding error: {e}")
+            metrics.record_upstream('open_meteo_geocoding', False)
+            logger.error("Geocoding error: %s", e)
             return None
     
     def fetch_current_weather(self, lat: float, lon: float, 
@@ -91,6 +115,8 @@ class NASAPowerAPI:
         """
         Fetch current weather data from NASA POWER API
         
+        Concurrent callers for the same grid cell share one upstream request.
+        
         Args:
             lat: Latitude 
             lon: Longitude
@@ -99,6 +125,24 @@ class NASAPowerAPI:
         Returns:
             Dictionary containing current weather data
         """
+        end_day = (datetime.now() - timedelta(days=7)).strftime('%Y%m%d')
+        key = ('nasa_daily', grid_cell(lat, lon), community, end_day)
+        return upstream_flight.do(key, lambda: self._fetch_current_weather(lat, lon, community))
+
+    def _fetch_current_weather(self, lat: float, lon: float, community: str) -> Optional[Dict[str, Any]]:
+        """One upstream request (also the health probe), reported to provider_health"""
+        if not upstream_limiter.acquire('nasa_power'):
+            return None
+        started = time.perf_counter()
+        weather_data = self._request_current_weather(lat, lon, community)
+        data_age = None
+        if weather_data is not None:
+            data_age = (datetime.now() - datetime.strptime(weather_data['date'], '%Y%m%d')).total_seconds()
+        provider_health.record('nasa_power', time.perf_counter() - started, weather_data is not None,
+                               data_age=data_age, error=None if weather_data else 'no usable daily data')
+        return weather_data
+
+    def _request_current_weather(self, lat: float, lon: float, community: str) -> Optional[Dict[str, Any]]:
         try:
             # Get recent data (NASA POWER has ~3 month delay for final data)
             end_date = datetime.now() - timedelta(days=7)  # Account for data delay
@@ -131,16 +175,18 @@ class NASAPowerAPI:
                 'format': 'JSON'
             }
             
-            print(f"NASA POWER API Request: {url}")
-            print(f"Parameters: {params}")
+            logger.debug("NASA POWER API request: %s", url)
+            log_payload(logger, 'nasa_power_daily_params', params)
             
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
+            with metrics.stage('nasa_daily'):
+                response = requests.get(url, params=params, timeout=upstream_timeout(30))
+                response.raise_for_status()
+                data = response.json()
+            metrics.record_upstream('nasa_power', True)
+            log_payload(logger, 'nasa_power_daily', data)
             
             if 'properties' not in data or 'parameter' not in data['properties']:
-                print(f"Unexpected NASA POWER API response structure: {data}")
+                logger.warning("Unexpected NASA POWER API response structure (keys: %s)", list(data))
                 return None
             
             # Extract the most recent day's data
@@ -148,11 +194,11 @@ class NASAPowerAPI:
             dates = list(parameters_data.get('T2M', {}).keys())
             
             if not dates:
-                print("No temperature data available from NASA POWER")
+                logger.warning("No temperature data available from NASA POWER")
                 return None
             
             latest_date = max(dates)
-            print(f"Using NASA POWER data from: {latest_date}")
+            logger.debug("Using NASA POWER data from: %s", latest_date)
             
             # Process weather data for VAYU
             weather_data = self._process_nasa_data(parameters_data, latest_date)
@@ -170,10 +216,11 @@ class NASAPowerAPI:
             return weather_data
             
         except requests.exceptions.RequestException as e:
-            logging.error(f"NASA POWER API request failed: {e}")
+            metrics.record_upstream('nasa_power', False)
+            logger.error("NASA POWER API request failed: %s", e)
             return None
         except Exception as e:
-            logging.error(f"NASA POWER data processing error: {e}")
+            logger.error("NASA POWER data processing error: %s", e)
             return None
     
     def _process_nasa_data(self, parameters_data: Dict, date: str) -> Dict[str, Any]:
@@ -276,11 +323,22 @@ class NASAPowerAPI:
         else:  # Moderate conditions
             return {'condition': 'partly_cloudy', 'icon': '⛅', 'description': 'Partly Cloudy'}
     
-    def get_hourly_forecast(self, lat: float, lon: float, days: int = 1) -> Optional[List[Dict]]:
+    def get_hourly_forecast(self, lat: float, lon: float, days: int = 1) -> Optional[Dict[str, List]]:
         """
         Get hourly weather forecast (limited by NASA POWER data availability)
         Note: NASA POWER has data delay, so this provides historical hourly data
+        
+        Returns:
+            Columnar dict of aligned lists: time, temperature, humidity,
+            wind_speed and precipitation (first 24 hours)
         """
+        end_day = (datetime.now() - timedelta(days=7)).strftime('%Y%m%d')
+        key = ('nasa_hourly', grid_cell(lat, lon), days, end_day)
+        return upstream_flight.do(key, lambda: self._get_hourly_forecast(lat, lon, days))
+
+    def _get_hourly_forecast(self, lat: float, lon: float, days: int) -> Optional[Dict[str, List]]:
+        if not upstream_limiter.acquire('nasa_power'):
+            return None
         try:
             end_date = datetime.now() - timedelta(days=7)
             start_date = end_date - timedelta(days=days)
@@ -298,49 +356,114 @@ class NASAPowerAPI:
                 'time-standard': 'LST'  # Local Solar Time
             }
             
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
+            try:
+                with metrics.stage('nasa_hourly'):
+                    response = requests.get(url, params=params, timeout=upstream_timeout(30))
+                    response.raise_for_status()
+                    data = response.json()
+            except requests.exceptions.RequestException:
+                metrics.record_upstream('nasa_power_hourly', False)
+                raise
+            metrics.record_upstream('nasa_power_hourly', True)
+            log_payload(logger, 'nasa_power_hourly', data)
             parameters_data = data['properties']['parameter']
-            
-            # Process hourly data
-            hourly_data = []
             temp_data = parameters_data.get('T2M', {})
+            humidity_data = parameters_data.get('RH2M', {})
+            wind_data = parameters_data.get('WS2M', {})
+            precip_data = parameters_data.get('PRECTOTCORR', {})
+            
+            # Columnar result: one list per variable rather than a dict per hour
+            hourly = {'time': [], 'temperature': [], 'humidity': [], 'wind_speed': [], 'precipitation': []}
             
-            for datetime_str, temp in temp_data.items():
+            # YYYYMMDDHH keys sort chronologically; keep the first 24 hours
+            for stamp in sorted(temp_data):
                 try:
-                    dt = datetime.strptime(datetime_str, '%Y%m%d%H')
-                    hour_data = {
-                        'datetime': dt.isoformat(),
-                        'hour': dt.strftime('%H:00'),
-                        'temperature': round(float(temp), 1),
-                        'humidity': round(float(parameters_data.get('RH2M', {}).get(datetime_str, 50)), 1),
-                        'wind_speed': round(float(parameters_data.get('WS2M', {}).get(datetime_str, 0)), 1),
-                        'precipitation': round(float(parameters_data.get('PRECTOTCORR', {}).get(datetime_str, 0)) / 24, 2),  # Convert daily to hourly
-                        'icon': self._get_hour_icon(float(temp))
-                    }
-                    hourly_data.append(hour_data)
+                    temp = float(temp_data[stamp])
+                    humidity = float(humidity_data.get(stamp, 50))
+                    wind_speed = float(wind_data.get(stamp, 0))
+                    precipitation = float(precip_data.get(stamp, 0))
                 except (ValueError, TypeError):
                     continue
+                if temp <= FILL_VALUE:
+                    continue
+                
+                hourly['time'].append(f"{stamp[:4]}-{stamp[4:6]}-{stamp[6:8]}T{stamp[8:10]}:00")
+                hourly['temperature'].append(round(temp, 1))
+                hourly['humidity'].append(round(humidity, 1))
+                hourly['wind_speed'].append(round(wind_speed, 1))
+                hourly['precipitation'].append(round(precipitation / 24, 2))  # Convert daily to hourly
+                if len(hourly['time']) == 24:
+                    break
             
-            return sorted(hourly_data, key=lambda x: x['datetime'])[:24]  # Last 24 hours
+            return hourly if hourly['time'] else None
             
         except Exception as e:
-            logging.error(f"NASA POWER hourly data error: {e}")
+            logger.error("NASA POWER hourly data error: %s", e)
             return None
     
-    def _get_hour_icon(self, temp: float) -> str:
-        """Simple icon assignment based on temperature"""
-        if temp < 0:
-            return '❄️'
-        elif temp < 10:
-            return '🌤️'
-        elif temp < 25:
-            return '⛅'
-        else:
-            return '☀️'
-    
+    def get_daily_history(self, lat: float, lon: float, start_year: int,
+                          end_year: int) -> Optional[Dict[str, List]]:
+        """
+        Get the daily record for whole calendar years (climatology input)
+        
+        Returns:
+            Columnar dict of aligned lists: date (YYYY-MM-DD), temperature,
+            humidity, wind_speed and precipitation (mm/day); missing values
+            are None
+        """
+        key = ('nasa_history', grid_cell(lat, lon), start_year, end_year)
+        return upstream_flight.do(key, lambda: self._get_daily_history(lat, lon, start_year, end_year))
+
+    def _get_daily_history(self, lat: float, lon: float, start_year: int,
+                           end_year: int) -> Optional[Dict[str, List]]:
+        params = {
+            'parameters': 'T2M,RH2M,WS2M,PRECTOTCORR',
+            'community': 'ag',
+            'longitude': lon,
+            'latitude': lat,
+            'start': f'{start_year}0101',
+            'end': f'{end_year}1231',
+            'format': 'JSON'
+        }
+        if not upstream_limiter.acquire('nasa_power'):
+            return None
+        try:
+            with metrics.stage('nasa_history'):
+                # Decades of daily values: allow for a slow response
+                response = requests.get(f"{self.base_url}/daily/point", params=params, timeout=upstream_timeout(120))
+                response.raise_for_status()
+                data = response.json()
+            metrics.record_upstream('nasa_power_history', True)
+        except requests.exceptions.RequestException as e:
+            metrics.record_upstream('nasa_power_history', False)
+            logger.error("NASA POWER history request failed: %s", e)
+            return None
+
+        try:
+            parameters_data = data['properties']['parameter']
+        except (KeyError, TypeError):
+            logger.warning("Unexpected NASA POWER history response structure")
+            return None
+
+        def column(name: str, stamps: List[str]) -> List[Optional[float]]:
+            values = parameters_data.get(name, {})
+            out = []
+            for stamp in stamps:
+                value = values.get(stamp)
+                out.append(None if value is None or float(value) <= FILL_VALUE else float(value))
+            return out
+
+        stamps = sorted(parameters_data.get('T2M', {}))
+        if not stamps:
+            return None
+        return {
+            'date': [f"{stamp[:4]}-{stamp[4:6]}-{stamp[6:8]}" for stamp in stamps],
+            'temperature': column('T2M', stamps),
+            'humidity': column('RH2M', stamps),
+            'wind_speed': column('WS2M', stamps),
+            'precipitation': column('PRECTOTCORR', stamps),
+        }
+
     def get_api_info(self) -> Dict[str, Any]:
         """
         Get information about NASA POWER API capabilities
@@ -0,0 +1,126 @@
+"""
+VAYU Dashboard Refresh
+Cheap, side-effect free updates for dashboard tabs that are already open
+
+Open tabs poll /api/refresh instead of reloading the page. The expensive
+part of a dashboard (geocoding, weather fetch, precipitation merge, ML
+prediction) is cached per location for REFRESH_TTL seconds, so a poll
+within that window only rescores cached conditions. The page polls at an
+interval derived from the TTL (`RefreshCache.poll_interval`), so the two
+cannot drift apart. Every payload is
+identified by a version hash of its contents. A tab that already has the
+current version gets a 304. A tab holding a recent older version gets
+only the fields that changed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from utils.metrics import metrics
+
+REFRESH_TTL = float(os.getenv('VAYU_REFRESH_TTL', '900'))
+# Open tabs poll at two thirds of the TTL (10 minutes by default), so a poll
+# lands while the inputs built for the previous one (or for another tab on
+# the same location) are still fresh
+REFRESH_POLL_FRACTION = 2 / 3
+# Expired inputs still stand in for a fresh build when admission control or the providers refuse one
+STALE_MAX_AGE = float(os.getenv('VAYU_STALE_MAX_AGE', '21600'))
+
+
+def data_version(payload: Dict[str, Any]) -> str:
+    """Stable short hash of a refresh payload"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+
+def changed_fields(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level fields of `new` that differ from `old`"""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+class RefreshCache:
+    """
+    Per-location dashboard inputs plus recently served payloads
+
+    Args:
+        ttl: Seconds a location's inputs are reused before rebuilding
+        max_locations: Locations kept in memory (LRU)
+        max_versions: Served payloads kept for computing deltas (LRU)
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_locations: int = 512, max_versions: int = 4096):
+        self.ttl = REFRESH_TTL if ttl is None else ttl
+        self.max_locations = max_locations
+        self.max_versions = max_versions
+        # location key -> (expires_at, inputs)
+        self._inputs: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._payloads: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def poll_interval(self) -> int:
+        """Seconds between /api/refresh polls from an open tab"""
+        return max(1, int(self.ttl * REFRESH_POLL_FRACTION))
+
+    def inputs(self, location: str, build: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Cached inputs for a location, calling build() when missing or expired"""
+        key = location.strip().lower()
+        with self._lock:
+            entry = self._inputs.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._inputs.move_to_end(key)
+                metrics.record_cache('refresh', True)
+                return entry[1]
+        metrics.record_cache('refresh', False)
+        inputs = build()
+        if inputs is not None:
+            self.prime(location, inputs)
+        return inputs
+
+    def peek(self, location: str) -> Optional[Dict[str, Any]]:
+        """Cached inputs for a location if still fresh, without building them"""
+        with self._lock:
+            entry = self._inputs.get(location.strip().lower())
+        return entry[1] if entry is not None and entry[0] > time.time() else None
+
+    def stale(self, location: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Cached inputs for a location even past their TTL, up to `max_age` seconds old"""
+        max_age = STALE_MAX_AGE if max_age is None else max_age
+        with self._lock:
+            entry = self._inputs.get(location.strip().lower())
+        if entry is None or time.time() - (entry[0] - self.ttl) > max_age:
+            metrics.record_cache('stale', False)
+            return None
+        metrics.record_cache('stale', True)
+        return entry[1]
+
+    def prime(self, location: str, inputs: Dict[str, Any]):
+        """Store inputs a full page render has just computed"""
+        with self._lock:
+            self._inputs[location.strip().lower()] = (time.time() + self.ttl, inputs)
+            self._inputs.move_to_end(location.strip().lower())
+            while len(self._inputs) > self.max_locations:
+                self._inputs.popitem(last=False)
+
+    def remember(self, payload: Dict[str, Any]) -> str:
+        """Record a served payload; returns its version"""
+        version = data_version(payload)
+        with self._lock:
+            self._payloads[version] = payload
+            self._payloads.move_to_end(version)
+            while len(self._payloads) > self.max_versions:
+                self._payloads.popitem(last=False)
+        return version
+
+    def payload(self, version: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._payloads.get(version)
+
+
+# Shared so polls from every tab hit the same cache
+refresh_cache = RefreshCache()
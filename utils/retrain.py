@@ -0,0 +1,136 @@
+"""
+VAYU Batch Retrain
+Train every location's comfort model in parallel from one columnar snapshot
+
+The parent streams all labelled rows once (ordered by location) into two
+memory-mapped arrays on disk. Worker processes map the same files read-only
+and receive only (location, start, stop) offsets, so the training data is
+never pickled across the pool.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.training_data import FEATURES, count_training_rows, iter_location_chunks
+
+logger = logging.getLogger(__name__)
+
+# Most recent share of each location's rows held out to report R²
+HOLDOUT_FRACTION = 0.2
+
+# Read-only views of the shared snapshot, opened once per worker process
+_shared: Dict[str, np.ndarray] = {}
+
+
+def snapshot_training_data(directory: str, chunk_size: int = 5000,
+                           **filters) -> Tuple[Dict[str, Tuple[int, int]], int]:
+    """
+    Write all training rows to X.f64/y.f64 memmaps in `directory`
+
+    Returns ({location: (start, stop)}, row count). Rows of one location are
+    contiguous and in insertion order.
+    """
+    capacity = count_training_rows(**filters)
+    width = len(FEATURES)
+    offsets: Dict[str, Tuple[int, int]] = {}
+    if not capacity:
+        return offsets, 0
+
+    X = np.memmap(os.path.join(directory, 'X.f64'), dtype=np.float64, mode='w+', shape=(capacity, width))
+    y = np.memmap(os.path.join(directory, 'y.f64'), dtype=np.float64, mode='w+', shape=(capacity,))
+    filled = 0
+    for location, X_chunk, y_chunk in iter_location_chunks(FEATURES, chunk_size, **filters):
+        end = filled + len(y_chunk)
+        if end > capacity:
+            # Rows logged after the count are left for the next run
+            break
+        X[filled:end] = X_chunk
+        y[filled:end] = y_chunk
+        start = offsets[location][0] if location in offsets else filled
+        offsets[location] = (start, end)
+        filled = end
+    X.flush()
+    y.flush()
+    del X, y
+    return offsets, filled
+
+
+def _init_worker(directory: str, rows: int):
+    # Mapping only the filled prefix; the files may be longer
+    _shared['X'] = np.memmap(os.path.join(directory, 'X.f64'), dtype=np.float64, mode='r',
+                             shape=(rows, len(FEATURES)))
+    _shared['y'] = np.memmap(os.path.join(directory, 'y.f64'), dtype=np.float64, mode='r',
+                             shape=(rows,))
+
+
+def _train_location(location: str, start: int, stop: int, model_dir: str) -> Dict[str, Any]:
+    """Fit, score and persist one location's model (runs in a worker)"""
+    from utils.ml_engine import _new_model, model_path, save_model
+
+    started = time.perf_counter()
+    X, y = _shared['X'][start:stop], _shared['y'][start:stop]
+    rows = stop - start
+
+    # Score on a time-ordered holdout, then refit on everything
+    r2 = None
+    split = rows - int(rows * HOLDOUT_FRACTION)
+    if rows - split >= 2:
+        model = _new_model().fit(X[:split], y[:split])
+        r2 = float(model.score(X[split:], y[split:]))
+
+    model = _new_model().fit(X, y)
+    path = model_path(location, model_dir)
+    save_model(model, path)
+    return {'location': location, 'rows': rows, 'r2': r2,
+            'seconds': time.perf_counter() - started, 'path': path}
+
+
+def retrain_all(workers: Optional[int] = None, min_rows: int = 10, chunk_size: int = 5000,
+                model_dir: Optional[str] = None, **filters) -> List[Dict[str, Any]]:
+    """
+    Retrain every location with at least min_rows labelled rows
+
+    Must run inside an app context (for the database snapshot). Returns one
+    report dict per location: rows, holdout R² (None when too few rows),
+    fit seconds and artifact path, or an `error` message.
+    """
+    from utils.ml_engine import MODEL_DIR
+
+    model_dir = model_dir or MODEL_DIR
+    scratch = tempfile.mkdtemp(prefix='vayu-retrain-')
+    try:
+        started = time.perf_counter()
+        offsets, rows = snapshot_training_data(scratch, chunk_size, **filters)
+        jobs = [(location, start, stop) for location, (start, stop) in offsets.items()
+                if stop - start >= max(min_rows, 2)]
+        logger.info("retrain snapshot: %s rows, %s locations (%s eligible) in %.2fs",
+                    rows, len(offsets), len(jobs), time.perf_counter() - started)
+        if not jobs:
+            return []
+
+        # Release the app's pooled connections so forked workers don't share them
+        from models import db
+        db.engine.dispose()
+
+        reports = []
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker,
+                                 initargs=(scratch, rows)) as pool:
+            futures = {pool.submit(_train_location, location, start, stop, model_dir): location
+                       for location, start, stop in jobs}
+            for future in as_completed(futures):
+                try:
+                    reports.append(future.result())
+                except Exception as e:
+                    logger.error("retrain failed for %s: %s", futures[future], e)
+                    reports.append({'location': futures[future], 'error': str(e)})
+        return sorted(reports, key=lambda report: report['location'])
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
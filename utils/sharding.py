@@ -0,0 +1,218 @@
+"""
+VAYU Location Sharding
+Consistent-hash ownership of locations across app nodes, with in-app forwarding
+
+Each node caches geocodes, provider data, dashboard inputs and per-location
+models in memory. Behind a plain load balancer every node ends up building
+all of them, so hit rates fall as nodes are added. With VAYU_SHARD_NODES
+listing every node's base URL and VAYU_SHARD_SELF naming this one, a request
+for a location is served by the location's owner on a consistent-hash ring.
+Any other node forwards the request to the owner and relays the answer.
+Sessions are signed cookies and the database is shared, so which node is
+asked first makes no difference to the client.
+
+Requests are keyed by the normalized location name, which is also the key
+of the refresh cache, geocode flights and location models. The snapped
+cell is only known after geocoding, and that is one of the things the owner
+should do. Tiles are keyed by their z/x/y address.
+
+Membership follows reachability. A node that refuses a connection is
+marked down for VAYU_SHARD_RETRY seconds. Its locations move to the next
+node on the ring, and only those locations move. When the node answers
+again they move back. Adding a node to VAYU_SHARD_NODES moves about 1/N of
+the locations to it. A forward that fails after connecting is served
+locally, so sharding never turns into an error.
+"""
+
+import bisect
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SHARD_NODES = [node.strip().rstrip('/') for node in os.getenv('VAYU_SHARD_NODES', '').split(',') if node.strip()]
+SHARD_SELF = os.getenv('VAYU_SHARD_SELF', '').strip().rstrip('/')
+# Points per node on the ring; more points spread locations more evenly
+SHARD_VNODES = int(os.getenv('VAYU_SHARD_VNODES', '64'))
+# Seconds an unreachable node stays out of the ring
+SHARD_RETRY = float(os.getenv('VAYU_SHARD_RETRY', '30'))
+SHARD_CONNECT_TIMEOUT = 1.0
+SHARD_READ_TIMEOUT = float(os.getenv('VAYU_SHARD_TIMEOUT', '30'))
+
+# Set on forwarded requests: the original client address, and a signature
+# over it. A request carrying the hop header is always served where it lands.
+CLIENT_HEADER = 'X-Vayu-Shard-Client'
+HOP_HEADER = 'X-Vayu-Shard-Hop'
+# Not relayed in either direction (RFC 9110 section 7.6.1, plus values requests/werkzeug recompute)
+HOP_BY_HOP = frozenset(('connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te',
+                        'trailer', 'transfer-encoding', 'upgrade', 'host', 'content-length'))
+
+
+def location_key(location: str) -> str:
+    """Shard key of a location name (the same normalization the refresh cache uses)"""
+    return 'loc:' + location.strip().lower()
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent-hash ring
+
+    Args:
+        nodes: Node names
+        vnodes: Points placed on the ring per node
+    """
+
+    def __init__(self, nodes: List[str], vnodes: Optional[int] = None):
+        vnodes = SHARD_VNODES if vnodes is None else vnodes
+        points = sorted((_hash(f'{node}#{i}'), node) for node in set(nodes) for i in range(max(1, vnodes)))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """The node that owns a key (the first point clockwise from its hash)"""
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[i]
+
+
+class ShardRouter:
+    """
+    Decides which node serves a key and forwards requests to it
+
+    Args:
+        nodes: Base URLs of every node (this one included)
+        self_node: This node's base URL, as written in `nodes`
+        vnodes: Ring points per node
+        retry: Seconds a node that refused a connection stays out of the ring
+    """
+
+    def __init__(self, nodes: Optional[List[str]] = None, self_node: Optional[str] = None,
+                 vnodes: Optional[int] = None, retry: Optional[float] = None):
+        self.nodes = list(dict.fromkeys(SHARD_NODES if nodes is None else nodes))
+        self.self_node = SHARD_SELF if self_node is None else self_node
+        self.vnodes = SHARD_VNODES if vnodes is None else vnodes
+        self.retry = SHARD_RETRY if retry is None else retry
+        self.enabled = len(self.nodes) > 1 and self.self_node in self.nodes
+        if self.nodes and not self.enabled:
+            logger.warning("Sharding disabled: VAYU_SHARD_SELF %r is not one of %d VAYU_SHARD_NODES",
+                           self.self_node, len(self.nodes))
+        self._down: Dict[str, float] = {}  # node -> time it may rejoin
+        self._rings: Dict[FrozenSet[str], HashRing] = {}
+        self._session = None
+        self._lock = threading.Lock()
+
+    def live_nodes(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            for node in [node for node, until in self._down.items() if until <= now]:
+                del self._down[node]
+                logger.info("Shard node %s rejoins the ring", node)
+            return [node for node in self.nodes if node not in self._down]
+
+    def _ring(self) -> HashRing:
+        live = frozenset(self.live_nodes()) | {self.self_node}
+        ring = self._rings.get(live)
+        if ring is None:
+            # One ring per membership seen; there are only a handful
+            ring = self._rings[live] = HashRing(sorted(live), self.vnodes)
+        return ring
+
+    def owner(self, key: str) -> str:
+        """The live node that owns a key (this node when sharding is off)"""
+        if not self.enabled:
+            return self.self_node
+        return self._ring().owner(key)
+
+    def mark_down(self, node: str):
+        with self._lock:
+            self._down[node] = time.time() + self.retry
+        logger.warning("Shard node %s unreachable; its locations move for %.0fs", node, self.retry)
+
+    def sign(self, secret: str, address: str) -> str:
+        return hmac.new(secret.encode(), address.encode(), hashlib.sha256).hexdigest()
+
+    def forwarded_client(self, secret: str, headers) -> Optional[str]:
+        """The client address of a request another node forwarded here, when its signature holds"""
+        address, signature = headers.get(CLIENT_HEADER, ''), headers.get(HOP_HEADER, '')
+        if address and hmac.compare_digest(signature, self.sign(secret, address)):
+            return address
+        return None
+
+    def _http(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def forward(self, node: str, request, secret: str):
+        """
+        Relay a request to its owner
+
+        Returns:
+            A Flask response, or None when the request should be served
+            locally (the owner is unreachable or failed mid-request)
+        """
+        import requests
+        from flask import Response
+
+        headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_BY_HOP}
+        # The body is relayed as the owner encoded it, so only ask for what the client accepts
+        headers['Accept-Encoding'] = request.headers.get('Accept-Encoding', 'identity')
+        address = request.remote_addr or ''
+        headers[CLIENT_HEADER] = address
+        headers[HOP_HEADER] = self.sign(secret, address)
+
+        started = time.perf_counter()
+        try:
+            upstream = self._http().request(request.method, node + request.full_path.rstrip('?'),
+                                            headers=headers, data=request.get_data(), stream=True,
+                                            allow_redirects=False,
+                                            timeout=(SHARD_CONNECT_TIMEOUT, SHARD_READ_TIMEOUT))
+            try:
+                body = upstream.raw.read(decode_content=False)
+            finally:
+                upstream.close()
+        except requests.ConnectionError as e:
+            self.mark_down(node)
+            metrics.inc('vayu_shard_requests_total', {'result': 'failover'})
+            logger.debug("Forward to %s failed: %s", node, e)
+            return None
+        except requests.RequestException as e:
+            metrics.inc('vayu_shard_requests_total', {'result': 'failover'})
+            logger.warning("Forward to %s failed: %s; serving locally", node, e)
+            return None
+        metrics.observe('vayu_shard_forward_seconds', time.perf_counter() - started)
+        metrics.inc('vayu_shard_requests_total', {'result': 'forwarded'})
+
+        response = Response(body, status=upstream.status_code)
+        for name, value in upstream.raw.headers.items():
+            if name.lower() not in HOP_BY_HOP:
+                response.headers.add(name, value)
+        return response
+
+    def status(self) -> Dict[str, Any]:
+        """Ring membership, for /api/status"""
+        now = time.time()
+        live = self.live_nodes()
+        with self._lock:
+            down = {node: round(until - now, 1) for node, until in self._down.items()}
+        return {'enabled': self.enabled, 'self': self.self_node, 'nodes': self.nodes,
+                'live': live, 'down_for_seconds': down, 'vnodes': self.vnodes}
+
+
+shard_router = ShardRouter()
+
+metrics.describe('vayu_shard_requests_total', 'Sharded requests by outcome (local, forwarded, failover)')
+metrics.describe('vayu_shard_forward_seconds', 'Time spent relaying requests to their owner node')
@@ -0,0 +1,206 @@
+"""
+VAYU Single-Flight
+Collapse concurrent upstream fetches for the same key into one request.
+
+Within a process, callers for a key that is already in flight wait for the
+leader and receive a copy of its result. Across gunicorn workers, the leader
+holds a file lock for the key and publishes its result to a small JSON file;
+workers that were blocked on the lock (or arrive within the share window)
+read that file instead of calling the provider again. Keys share a fixed set
+of lock files, and result files are deleted once the share window has
+passed, so the directory does not grow with the number of keys.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process collapsing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# NASA POWER's native grid (MERRA-2): 0.5° latitude x 0.625° longitude
+NASA_GRID = (0.5, 0.625)
+# Open-Meteo resolves forecasts on roughly an 11 km grid
+OPENMETEO_GRID = (0.1, 0.1)
+# Keys share this many lock files (the first hex digits of their digest), so
+# the lock directory stays bounded however many locations are fetched
+LOCK_BUCKET_DIGITS = 3
+# Seconds between sweeps of expired result files for keys nobody asked for again
+SWEEP_INTERVAL = 60.0
+
+
+def grid_cell(lat: float, lon: float, grid: Tuple[float, float] = NASA_GRID) -> Tuple[int, int]:
+    """Snap a coordinate to the index of its provider grid cell"""
+    return int((lat + 90) // grid[0]), int((lon + 180) // grid[1])
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key
+
+    Args:
+        name: Label used for metrics and the lock directory
+        shared: Also collapse across processes through file locks
+        share_window: Seconds a published result stays reusable by other workers
+        lock_dir: Directory for lock and result files
+    """
+
+    def __init__(self, name: str, shared: Optional[bool] = None, share_window: Optional[float] = None,
+                 lock_dir: Optional[str] = None):
+        self.name = name
+        if shared is None:
+            shared = os.getenv('VAYU_SINGLEFLIGHT_SHARED', 'true').lower() in ('1', 'true', 'yes')
+        self.shared = shared and fcntl is not None
+        self.share_window = share_window if share_window is not None else \
+            float(os.getenv('VAYU_SINGLEFLIGHT_WINDOW', '10'))
+        self.lock_dir = lock_dir or os.getenv('VAYU_SINGLEFLIGHT_DIR') or \
+            os.path.join(tempfile.gettempdir(), 'vayu-singleflight')
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        if self.shared:
+            os.makedirs(os.path.join(self.lock_dir, name), exist_ok=True)
+
+    def do(self, key: Tuple, fn: Callable[[], Any]) -> Any:
+        """Run fn once for all concurrent callers with the same key"""
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+
+        with self._lock:
+            call = self._calls.get(digest)
+            leader = call is None
+            if leader:
+                call = self._calls[digest] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            self._count('collapsed_local')
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = self._shared_call(digest, fn) if self.shared else self._lead(fn)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(digest, None)
+                waiters = call.waiters
+            call.done.set()
+        # Callers may mutate what they get back, so the pristine result stays
+        # with the waiters while they copy it
+        return copy.deepcopy(call.result) if waiters else call.result
+
+    def _lead(self, fn: Callable[[], Any]) -> Any:
+        self._count('executed')
+        return fn()
+
+    def _shared_call(self, digest: str, fn: Callable[[], Any]) -> Any:
+        directory = os.path.join(self.lock_dir, self.name)
+        try:
+            lock_file = open(os.path.join(directory, digest[:LOCK_BUCKET_DIGITS] + '.lock'), 'a')
+        except OSError as e:
+            logger.warning("single-flight lock unavailable (%s); fetching directly", e)
+            return self._lead(fn)
+
+        path = os.path.join(directory, digest + '.json')
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                published = self._read_published(path)
+                if published is not None:
+                    self._count('collapsed_shared')
+                    return published
+
+                result = self._lead(fn)
+                # Failures (None) are not published so the next worker retries
+                if result is not None:
+                    self._publish(path, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._maybe_sweep(directory)
+
+    def _read_published(self, path: str) -> Any:
+        """A result published within the share window; an expired one is removed (the caller holds its lock)"""
+        try:
+            if time.time() - os.path.getmtime(path) > self.share_window:
+                os.remove(path)
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _maybe_sweep(self, directory: str):
+        """
+        Remove expired results (and leftover temp files) of every key, at most
+        once per SWEEP_INTERVAL per process. This runs without the other keys'
+        locks: a result that is replaced while being swept only costs one
+        extra fetch.
+        """
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + SWEEP_INTERVAL
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(('.json', '.tmp')):
+                        continue
+                    try:
+                        if now - entry.stat().st_mtime > self.share_window:
+                            os.remove(entry.path)
+                    except OSError:  # Removed or replaced by another worker meanwhile
+                        continue
+        except OSError as e:
+            logger.debug("single-flight sweep incomplete: %s", e)
+
+    def _publish(self, path: str, result: Any):
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(result, f, default=str)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.debug("single-flight result not shareable: %s", e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _count(self, result: str):
+        metrics.inc('vayu_singleflight_calls_total', {'flight': self.name, 'result': result})
+
+
+# Shared by every WeatherAPI/NASAPowerAPI instance in the process
+upstream_flight = SingleFlight('upstream')
+
+metrics.describe('vayu_singleflight_calls_total',
+                 'Upstream fetches executed vs collapsed onto an in-flight call')
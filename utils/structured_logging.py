@@ -0,0 +1,110 @@
+"""
+VAYU Structured Logging
+JSON-lines logging with per-request ids and sampled debug output
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+_request_id: ContextVar[Optional[str]] = ContextVar('vayu_request_id', default=None)
+_sampled: ContextVar[bool] = ContextVar('vayu_request_sampled', default=False)
+
+# Client-supplied request ids are echoed into logs and headers, so only plain tokens are kept
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+_configured = False
+_sample_rate = 0.0
+
+
+class JsonFormatter(logging.Formatter):
+    """Render log records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = _request_id.get()
+        if request_id:
+            entry['request_id'] = request_id
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampledDebugFilter(logging.Filter):
+    """Drop DEBUG records unless the current request was sampled"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or _sampled.get()
+
+
+def configure_logging(level: Optional[str] = None, sample_rate: Optional[float] = None,
+                      json_lines: Optional[bool] = None):
+    """
+    Install the VAYU log handler on the root logger (idempotent)
+
+    Level, debug sample rate and output format come from VAYU_LOG_LEVEL,
+    VAYU_LOG_SAMPLE_RATE and VAYU_LOG_FORMAT ('json' or 'text') unless given.
+    """
+    global _configured, _sample_rate
+    level = (level or os.getenv('VAYU_LOG_LEVEL', 'INFO')).upper()
+    if sample_rate is None:
+        sample_rate = float(os.getenv('VAYU_LOG_SAMPLE_RATE', '0'))
+    if json_lines is None:
+        json_lines = os.getenv('VAYU_LOG_FORMAT', 'json').lower() == 'json'
+    _sample_rate = max(0.0, min(1.0, sample_rate))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _configured:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_lines
+                         else logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    handler.addFilter(SampledDebugFilter())
+    root.handlers[:] = [handler]
+    _configured = True
+
+
+def begin_request(request_id: Optional[str] = None) -> str:
+    """Bind a request id to the current context and decide whether it is sampled"""
+    if not request_id or not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = uuid.uuid4().hex
+    _request_id.set(request_id)
+    # crc32 keeps the sampling decision stable for a given id across workers
+    _sampled.set(_sample_rate > 0 and (zlib.crc32(request_id.encode()) % 10000) < _sample_rate * 10000)
+    return request_id
+
+
+def end_request():
+    _request_id.set(None)
+    _sampled.set(False)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def is_sampled() -> bool:
+    return _sampled.get()
+
+
+def log_payload(logger: logging.Logger, label: str, payload: Any):
+    """Log a full upstream payload, but only for sampled requests at DEBUG level"""
+    if _sampled.get() and logger.isEnabledFor(logging.DEBUG):
+        logger.debug('%s payload', label, extra={'fields': {'payload': payload}})
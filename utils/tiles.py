@@ -0,0 +1,271 @@
+"""
+VAYU Comfort Tiles
+Personalized comfort heatmap tiles (XYZ / web mercator) with a content-addressed cache
+
+A tile samples an n x n grid of points. Points are snapped to Open-Meteo's
+~0.1° cells, and conditions for uncached cells come from one batched
+multi-coordinate request. The whole grid is scored in one vectorized pass.
+The tile key hashes the profile, the tile address and a fingerprint of
+every underlying cell's conditions. A tile is rendered again only when
+one of its cells actually changed, and identical tiles are shared by every
+user with the same preferences.
+
+Superseded tiles are not deleted when their data changes, since another
+request may be about to send them. A hit refreshes a tile's mtime, and a
+sweep (at most once per SWEEP_INTERVAL per process) removes tiles nobody
+has asked for in VAYU_TILE_MAX_AGE seconds.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.comfort_calculator import ComfortCalculator, profile_hash
+from utils.metrics import metrics
+from utils.singleflight import OPENMETEO_GRID, grid_cell
+from utils.weather_api import WeatherAPI
+
+logger = logging.getLogger(__name__)
+
+TILE_DIR = os.getenv('VAYU_TILE_DIR', 'tiles')
+TILE_SAMPLES = int(os.getenv('VAYU_TILE_SAMPLES', '8'))
+CELL_TTL = float(os.getenv('VAYU_TILE_CELL_TTL', '900'))
+# Seconds a tile stays on disk after it was last rendered or served
+TILE_MAX_AGE = float(os.getenv('VAYU_TILE_MAX_AGE', '3600'))
+SWEEP_INTERVAL = 60.0
+TILE_SIZE = 256
+MIN_ZOOM, MAX_ZOOM = 3, 14
+
+# Bump when the rendering or JSON layout changes
+TILE_VERSION = 1
+
+# Score -> color ramp (red, amber, green)
+_RAMP_STOPS = np.array([0.0, 50.0, 100.0])
+_RAMP_COLORS = np.array([[215, 48, 39], [254, 224, 139], [26, 152, 80]], dtype=np.float64)
+_ALPHA = 170
+
+
+def tile_bounds(z: int, x: int, y: int) -> Dict[str, float]:
+    """Geographic bounds of an XYZ tile"""
+    def lat(row: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / 2 ** z))))
+    return {'north': lat(y), 'south': lat(y + 1),
+            'west': x / 2 ** z * 360 - 180, 'east': (x + 1) / 2 ** z * 360 - 180}
+
+
+def sample_points(z: int, x: int, y: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitudes (one per row) and longitudes (one per column) of the sample grid"""
+    offsets = (np.arange(n) + 0.5) / n
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / 2 ** z))))
+    lons = (x + offsets) / 2 ** z * 360 - 180
+    return lats, lons
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Minimal RGBA PNG encoder (no filtering, zlib level 6)"""
+    height, width, _ = rgba.shape
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)  # leading 0 = filter type None
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (struct.pack('>I', len(data)) + tag + data
+                + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+def colorize(scores: np.ndarray, size: int = TILE_SIZE) -> np.ndarray:
+    """size x size RGBA image of an n x n score grid (NaN is transparent)"""
+    n = scores.shape[0]
+    pixels = scores[np.ix_((np.arange(size) * n) // size, (np.arange(size) * n) // size)]
+    clean = np.nan_to_num(pixels, nan=0.0)
+    rgba = np.empty(pixels.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        rgba[..., channel] = np.interp(clean, _RAMP_STOPS, _RAMP_COLORS[:, channel]).astype(np.uint8)
+    rgba[..., 3] = np.where(np.isnan(pixels), 0, _ALPHA)
+    return rgba
+
+
+class Tile:
+    __slots__ = ('key', 'png_path', 'json_path')
+
+    def __init__(self, key: str, png_path: str, json_path: str):
+        self.key = key
+        self.png_path = png_path
+        self.json_path = json_path
+
+
+class TileRenderer:
+    """
+    Renders and caches comfort tiles
+
+    Args:
+        weather_api: Client used for batched Open-Meteo fetches
+        directory: Tile cache directory
+        samples: Grid points per tile side
+        cell_ttl: Seconds cell conditions are reused before refetching
+        max_age: Seconds an unused tile is kept on disk
+    """
+
+    def __init__(self, weather_api: Optional[WeatherAPI] = None, directory: Optional[str] = None,
+                 samples: Optional[int] = None, cell_ttl: Optional[float] = None,
+                 max_cells: int = 50000, max_age: Optional[float] = None):
+        self.weather_api = weather_api or WeatherAPI()
+        self.directory = directory or TILE_DIR
+        self.samples = samples or TILE_SAMPLES
+        self.cell_ttl = CELL_TTL if cell_ttl is None else cell_ttl
+        self.max_cells = max_cells
+        self.max_age = TILE_MAX_AGE if max_age is None else max_age
+        # cell -> (expires_at, (temperature, humidity, wind_speed, precipitation), fingerprint)
+        self._cells: 'OrderedDict[Tuple[int, int], tuple]' = OrderedDict()
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _cell_conditions(self, cells: List[Tuple[int, int]]) -> Dict[Tuple[int, int], tuple]:
+        """Conditions per cell, fetching expired or unknown cells in one batch"""
+        now = time.time()
+        found, missing = {}, []
+        with self._lock:
+            for cell in cells:
+                entry = self._cells.get(cell)
+                if entry is not None and entry[0] > now:
+                    found[cell] = entry
+                else:
+                    missing.append(cell)
+        metrics.inc('vayu_tile_cells_total', {'result': 'cached'}, len(found))
+        metrics.inc('vayu_tile_cells_total', {'result': 'fetched'}, len(missing))
+        if not missing:
+            return found
+
+        # Fetch at cell centers so every point in a cell shares one reading
+        lat_step, lon_step = OPENMETEO_GRID
+        centers = [((i + 0.5) * lat_step - 90, (j + 0.5) * lon_step - 180) for i, j in missing]
+        frames = self.weather_api.fetch_openmeteo_batch(centers)
+        expires = time.time() + self.cell_ttl
+        with self._lock:
+            for cell, frame in zip(missing, frames):
+                if frame is None:
+                    continue
+                current = frame.current
+                values = (current['temperature'], current['humidity'],
+                          current['wind_speed'], current['precipitation_probability'])
+                fingerprint = (round(values[0], 1), round(values[1]), round(values[2], 1), round(values[3]))
+                entry = self._cells[cell] = (expires, values, fingerprint)
+                self._cells.move_to_end(cell)
+                found[cell] = entry
+            while len(self._cells) > self.max_cells:
+                self._cells.popitem(last=False)
+        return found
+
+    def render(self, z: int, x: int, y: int, profile: Dict[str, Any]) -> Optional[Tile]:
+        """Cached or freshly rendered tile; None when no cell had data"""
+        n = self.samples
+        lats, lons = sample_points(z, x, y, n)
+        point_cells = [grid_cell(lat, lon, OPENMETEO_GRID) for lat in lats for lon in lons]
+        cells = self._cell_conditions(list(dict.fromkeys(point_cells)))
+        if not cells:
+            return None
+
+        profile_key = profile_hash(profile)
+        fingerprints = [cells[cell][2] if cell in cells else None for cell in point_cells]
+        digest = json.dumps([TILE_VERSION, profile_key, z, x, y, n, fingerprints])
+        key = hashlib.sha1(digest.encode()).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        tile = Tile(key, base + '.png', base + '.json')
+
+        try:
+            # Marks the tile as used, so the sweep keeps it
+            os.utime(tile.png_path)
+            os.utime(tile.json_path)
+            hit = True
+        except OSError:
+            hit = False
+        metrics.record_cache('tile', hit)
+        if not hit:
+            with metrics.stage('tile_render'):
+                self._render(tile, z, x, y, lats, lons, point_cells, cells, profile, profile_key)
+        self._maybe_sweep()
+        return tile
+
+    def _maybe_sweep(self):
+        """Remove tiles (and leftover temp files) unused for max_age, at most once per SWEEP_INTERVAL"""
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + SWEEP_INTERVAL
+        try:
+            with os.scandir(self.directory) as buckets:
+                for bucket in buckets:
+                    if not bucket.is_dir():
+                        continue
+                    with os.scandir(bucket.path) as entries:
+                        for entry in entries:
+                            try:
+                                if now - entry.stat().st_mtime > self.max_age:
+                                    os.remove(entry.path)
+                            except OSError:  # Removed by another worker meanwhile
+                                continue
+        except OSError as e:
+            logger.debug("tile sweep incomplete: %s", e)
+
+    def _render(self, tile: Tile, z: int, x: int, y: int, lats: np.ndarray, lons: np.ndarray,
+                point_cells: List[Tuple[int, int]], cells: Dict[Tuple[int, int], tuple],
+                profile: Dict[str, Any], profile_key: str):
+        n = len(lats)
+        values = np.array([cells[cell][1] if cell in cells else (np.nan,) * 4 for cell in point_cells],
+                          dtype=np.float64)
+        scores = ComfortCalculator(profile).score_arrays(values[:, 0], values[:, 1],
+                                                         values[:, 2], values[:, 3])['overall']
+        scores = np.where(np.isnan(values).any(axis=1), np.nan, scores).reshape(n, n)
+
+        best = None
+        if not np.isnan(scores).all():
+            row, col = np.unravel_index(np.nanargmax(scores), scores.shape)
+            best = {'lat': round(float(lats[row]), 4), 'lon': round(float(lons[col]), 4),
+                    'score': int(round(scores[row, col]))}
+        payload = {
+            'z': z, 'x': x, 'y': y,
+            'key': tile.key,
+            'profile_hash': profile_key,
+            'bounds': tile_bounds(z, x, y),
+            'samples': n,
+            'lat': [round(float(v), 4) for v in lats],
+            'lon': [round(float(v), 4) for v in lons],
+            'scores': [[None if np.isnan(v) else int(round(v)) for v in row] for row in scores],
+            'best': best,
+        }
+        self._write(tile.png_path, encode_png(colorize(scores)))
+        self._write(tile.json_path, json.dumps(payload, separators=(',', ':')).encode())
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tile-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+
+# Shared so cell conditions are reused across requests
+tile_renderer = TileRenderer()
+
+metrics.describe('vayu_tile_cells_total', 'Tile grid cells served from the cell cache vs fetched upstream')
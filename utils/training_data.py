@@ -0,0 +1,302 @@
+"""
+VAYU Training Data
+Stream weather_logs into NumPy feature/target arrays without building ORM objects
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import chain, groupby
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, select
+
+from models import User, WeatherLog, db
+
+# Columns MLEngine trains on, in feature order
+FEATURES = ('temperature', 'humidity', 'wind_speed', 'precipitation')
+TARGET = 'comfort_score'
+
+# Profile columns from the users table; categorical ones are encoded as
+# ordinal codes in SQL so every chunk arrives as plain numbers
+PROFILE_LEVELS = {
+    'humidity_tolerance': ('low', 'medium', 'high'),
+    'wind_tolerance': ('low', 'medium', 'high'),
+    'rain_preference': ('dislike', 'neutral', 'like'),
+    'activity_level': ('low', 'medium', 'high'),
+}
+PROFILE_FEATURES = ('temp_min', 'temp_max') + tuple(PROFILE_LEVELS)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class TrainingData:
+    """Feature matrix `X` (rows x features) and target vector `y`"""
+
+    __slots__ = ('X', 'y', 'features')
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, features: Sequence[str]):
+        self.X = X
+        self.y = y
+        self.features = tuple(features)
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    def __repr__(self) -> str:
+        return f'<TrainingData {len(self)} rows x {len(self.features)} features>'
+
+    def to_frame(self):
+        """pandas DataFrame of features plus target (for notebooks)"""
+        import pandas as pd
+        frame = pd.DataFrame(self.X, columns=list(self.features))
+        frame[TARGET] = self.y
+        return frame
+
+
+def _feature_column(name: str):
+    """SQL expression for a feature and whether it needs the users join"""
+    if name in FEATURES:
+        return getattr(WeatherLog, name), False
+    if name in PROFILE_LEVELS:
+        codes = {level: code for code, level in enumerate(PROFILE_LEVELS[name])}
+        return case(codes, value=getattr(User, name), else_=1), True
+    if name in PROFILE_FEATURES:
+        return getattr(User, name), True
+    raise ValueError(f"unknown training feature '{name}'")
+
+
+def training_query(features: Sequence[str] = FEATURES, location: Optional[str] = None,
+                   user_id: Optional[int] = None, since: Optional[datetime] = None,
+                   until: Optional[datetime] = None, feedback_only: bool = True):
+    """SELECT of the feature columns plus the target, with the requested filters"""
+    columns, needs_user = [], False
+    for name in features:
+        column, joined = _feature_column(name)
+        columns.append(column)
+        needs_user = needs_user or joined
+
+    stmt = select(*columns, WeatherLog.comfort_score).select_from(WeatherLog)
+    if needs_user:
+        stmt = stmt.join(User, User.id == WeatherLog.user_id)
+
+    stmt = stmt.where(WeatherLog.comfort_score.isnot(None))
+    if feedback_only:
+        stmt = stmt.where(WeatherLog.user_feedback.isnot(None))
+    if location is not None:
+        stmt = stmt.where(WeatherLog.location == location)
+    if user_id is not None:
+        stmt = stmt.where(WeatherLog.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(WeatherLog.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(WeatherLog.timestamp < until)
+    return stmt
+
+
+@contextmanager
+def _connection(bind):
+    """Execute on the Flask-SQLAlchemy session, or on an explicit engine/connection"""
+    if bind is None:
+        yield db.session
+    elif hasattr(bind, 'connect'):
+        with bind.connect() as conn:
+            yield conn
+    else:
+        yield bind
+
+
+def _user_profiles(features: Sequence[str], bind):
+    """Lookup of encoded profile features by user id (for archived rows)"""
+    names = [name for name in features if name not in FEATURES]
+    stmt = select(User.id, *(_feature_column(name)[0] for name in names)).order_by(User.id)
+    with _connection(bind) as conn:
+        rows = conn.execute(stmt).all()
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    values = _to_block([row[1:] for row in rows], len(names))
+
+    def lookup(name: str, user_ids: np.ndarray) -> np.ndarray:
+        out = np.full(len(user_ids), np.nan)
+        if len(ids):
+            pos = np.minimum(np.searchsorted(ids, user_ids), len(ids) - 1)
+            found = ids[pos] == user_ids
+            out[found] = values[pos[found], names.index(name)]
+        return out
+    return lookup
+
+
+def _archive_blocks(features: Sequence[str], bind, location: Optional[str] = None,
+                    user_id: Optional[int] = None, since: Optional[datetime] = None,
+                    until: Optional[datetime] = None,
+                    feedback_only: bool = True) -> Iterator[Tuple[str, np.ndarray]]:
+    """(location, feature+target block) per archived part, with the training filters applied"""
+    from utils.archive import iter_archive
+
+    profiles = None
+    for part in iter_archive(location, since, until):
+        keep = ~np.isnan(part[TARGET])
+        if feedback_only:
+            keep &= part['user_feedback'] != ''
+        if user_id is not None:
+            keep &= part['user_id'] == user_id
+        if not keep.any():
+            continue
+        columns = []
+        for name in features:
+            if name in FEATURES:
+                columns.append(part[name][keep])
+                continue
+            if profiles is None:
+                profiles = _user_profiles(features, bind)
+            columns.append(profiles(name, part['user_id'][keep]))
+        block = np.column_stack(columns + [part[TARGET][keep]])
+        block = block[~np.isnan(block).any(axis=1)]
+        if len(block):
+            yield part['location'], block
+
+
+def iter_training_chunks(features: Sequence[str] = FEATURES, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         bind=None, include_archive: bool = True,
+                         **filters) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Yield (X, y) array pairs of at most chunk_size rows
+
+    Archived rows (see utils.archive) come first, then the live table. Rows
+    with a missing feature or target are dropped. Filters are the keyword
+    arguments of training_query (location, user_id, since, until,
+    feedback_only).
+    """
+    width = len(features)
+    if include_archive:
+        for _, block in _archive_blocks(features, bind, **filters):
+            yield block[:, :width], block[:, width]
+
+    stmt = training_query(features, **filters).execution_options(yield_per=chunk_size)
+    with _connection(bind) as conn:
+        for rows in conn.execute(stmt).partitions(chunk_size):
+            block = _to_block(rows, width + 1)
+            block = block[~np.isnan(block).any(axis=1)]
+            yield block[:, :width], block[:, width]
+
+
+def iter_location_chunks(features: Sequence[str] = FEATURES, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         bind=None, include_archive: bool = True,
+                         **filters) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    Yield (location, X, y) grouped by location from a single live scan
+
+    A location with more rows than fit in one chunk arrives as several
+    consecutive pieces (archived rows first); consumers append them in order.
+    """
+    width = len(features)
+    pending = set()
+    if include_archive:
+        from utils.archive import archived_locations
+        pending = set(archived_locations())
+        if filters.get('location') is not None:
+            pending &= {filters['location']}
+
+    def archived(name):
+        pending.discard(name)
+        for _, block in _archive_blocks(features, bind, **{**filters, 'location': name}):
+            yield name, block[:, :width], block[:, width]
+
+    current = None
+    stmt = (training_query(features, **filters)
+            .add_columns(WeatherLog.location)
+            .order_by(WeatherLog.location, WeatherLog.id)
+            .execution_options(yield_per=chunk_size))
+    with _connection(bind) as conn:
+        for rows in conn.execute(stmt).partitions(chunk_size):
+            block = _to_block([row[:-1] for row in rows], width + 1)
+            start = 0
+            for location, group in groupby(row[-1] for row in rows):
+                if location != current:
+                    current = location
+                    if location in pending:
+                        yield from archived(location)
+                stop = start + sum(1 for _ in group)
+                piece = block[start:stop]
+                piece = piece[~np.isnan(piece).any(axis=1)]
+                if len(piece):
+                    yield location, piece[:, :width], piece[:, width]
+                start = stop
+
+    # Locations that only exist in the archive
+    for name in sorted(pending):
+        yield from archived(name)
+
+
+def _to_block(rows, width: int) -> np.ndarray:
+    try:
+        # Flat copy straight from the row tuples; much faster than letting
+        # np.array inspect every Row as a nested sequence
+        flat = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * width)
+    except TypeError:
+        # NULLs present: plain tuples let NumPy map None to NaN
+        return np.array([tuple(row) for row in rows], dtype=np.float64).reshape(-1, width)
+    return flat.reshape(-1, width)
+
+
+def count_training_rows(bind=None, include_archive: bool = True, **filters) -> int:
+    """
+    Upper bound on the rows iter_training_chunks yields for these filters
+
+    Exact for the live table (before NaN filtering); archived parts are
+    counted from their file names without being opened.
+    """
+    stmt = select(func.count()).select_from(training_query(FEATURES, **filters).subquery())
+    with _connection(bind) as conn:
+        count = conn.execute(stmt).scalar_one()
+    if include_archive:
+        from utils.archive import archived_row_bound
+        count += archived_row_bound(filters.get('location'), filters.get('since'), filters.get('until'))
+    return count
+
+
+def load_training_data(location: Optional[str] = None, *, features: Sequence[str] = FEATURES,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, bind=None, include_archive: bool = True,
+                       **filters) -> TrainingData:
+    """
+    Load training rows into preallocated arrays
+
+    Rows are streamed from the database chunk by chunk. A result that spans
+    several chunks is counted once so the arrays are allocated up front,
+    so peak overhead beyond the result itself is one chunk rather than one
+    Python object per historical row.
+
+    Args:
+        location: Only rows logged for this location
+        features: Feature columns (see FEATURES and PROFILE_FEATURES)
+        chunk_size: Rows fetched per round trip
+        bind: Engine or connection to read from (default: db.session)
+        include_archive: Also scan rows moved out by `flask vayu-archive`
+        **filters: user_id, since, until, feedback_only
+    """
+    filters['location'] = location
+    chunks = iter_training_chunks(features, chunk_size, bind, include_archive, **filters)
+    first = next(chunks, None)
+    if first is None:
+        return TrainingData(np.empty((0, len(features))), np.empty(0), features)
+    second = next(chunks, None)
+    if second is None:
+        # Everything fit in one chunk: no count query, no copy
+        return TrainingData(first[0], first[1], features)
+
+    capacity = count_training_rows(bind, include_archive, **filters)
+    X = np.empty((capacity, len(features)), dtype=np.float64)
+    y = np.empty(capacity, dtype=np.float64)
+
+    filled = 0
+    for X_chunk, y_chunk in chain((first, second), chunks):
+        end = filled + len(y_chunk)
+        if end > len(y):
+            # Rows were logged between the count and the scan
+            capacity = max(end, 2 * len(y))
+            X = np.resize(X, (capacity, len(features)))
+            y = np.resize(y, capacity)
+        X[filled:end] = X_chunk
+        y[filled:end] = y_chunk
+        filled = end
+
+    return TrainingData(X[:filled], y[:filled], features)
@@ -3,12 +3,23 @@ Updated WeatherAPI for VAYU with NASA POWER Integration
 Provides both NASA POWER and Open-Meteo as fallback options
 """
 
-import requests
 import json
+import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Any
 import logging
+from utils.lazy import lazy_import
 from utils.nasa_power_api import NASAPowerAPI
+from utils.weather_frame import WeatherFrame
+from utils.metrics import metrics
+from utils.admission import upstream_limiter, upstream_timeout
+from utils.health import provider_health
+from utils.singleflight import upstream_flight, grid_cell, OPENMETEO_GRID
+from utils.structured_logging import log_payload
+
+requests = lazy_import('requests')
+logger = logging.getLogger(__name__)
 
 class WeatherAPI:
     """
@@ -18,10 +29,20 @@ class WeatherAPI:
     Fallback: Open-Meteo API (for real-time data when NASA has delays)
     """
     
+    PROVIDER_KEYS = {'NASA POWER': 'nasa_power', 'Open-Meteo': 'open_meteo'}
+    # Current fields merged across providers, sources in order of preference.
+    # The frame's own provider is consulted first; another provider is only
+    # fetched (once, with its regular request) when no source has a usable value.
+    MERGED_FIELDS = {
+        'precipitation_probability': ('nasa_power', 'open_meteo'),
+    }
+    # NASA POWER derives rain chance from the day's amount: 0 means no rain data, not no rain
+    ZERO_IS_MISSING = {('nasa_power', 'precipitation_probability')}
+    
     def __init__(self):
         self.nasa_api = NASAPowerAPI()
-        self.openmeteo_base = "https://api.open-meteo.com/v1"
-        self.geocoding_base = "https://geocoding-api.open-meteo.com/v1"
+        self.openmeteo_base = os.getenv('VAYU_OPENMETEO_URL', "https://api.open-meteo.com/v1")
+        self.geocoding_base = os.getenv('VAYU_GEOCODING_URL', "https://geocoding-api.open-meteo.com/v1")
         
         # API preference order
         self.api_providers = {
@@ -49,6 +70,8 @@ class WeatherAPI:
                 return coords
                 
             # Fallback to Open-Meteo geocoding
+            if not upstream_limiter.acquire('open_meteo'):
+                return None
             url = f"{self.geocoding_base}/search"
             params = {
                 'name': location,
@@ -57,9 +80,11 @@ class WeatherAPI:
                 'format': 'json'
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            with metrics.stage('geocode'):
+                response = requests.get(url, params=params, timeout=upstream_timeout(10))
+                response.raise_for_status()
+                data = response.json()
+            metrics.record_upstream('open_meteo_geocoding', True)
             
             if data.get('results'):
                 result = data['results'][0]
@@ -75,122 +100,133 @@ class WeatherAPI:
             return None
             
         except Exception as e:
-            logging.error(f"Geocoding error: {e}")
+            metrics.record_upstream('open_meteo_geocoding', False)
+            logger.error("Geocoding error: %s", e)
             return None
     
-    def fetch_weather(self, lat: float, lon: float, use_nasa: bool = True) -> Optional[Dict[str, Any]]:
+    def fetch_weather(self, lat: float, lon: float, use_nasa: bool = True) -> Optional[WeatherFrame]:
         """
         Fetch weather data with NASA POWER as primary source
         
+        The order comes from provider_health: NASA POWER is tried first unless
+        it is currently slow, failing or serving data that is too old, and the
+        next provider is tried whenever one returns nothing.
+        
         Args:
             lat: Latitude
             lon: Longitude  
-            use_nasa: Whether to try NASA POWER first (default: True)
+            use_nasa: Whether NASA POWER may be used at all (default: True)
             
         Returns:
-            Comprehensive weather data dictionary
+            WeatherFrame with current conditions and aligned hourly columns
         """
-        weather_data = None
-        api_used = None
-        
-        if use_nasa:
-            # Try NASA POWER API first
-            print("🛰️ Fetching weather from NASA POWER API...")
-            try:
-                nasa_data = self.nasa_api.fetch_current_weather(lat, lon)
-                if nasa_data:
-                    weather_data = self._format_nasa_for_vayu(nasa_data, lat, lon)
-                    api_used = 'NASA POWER'
-                    print("✅ NASA POWER data retrieved successfully")
-                else:
-                    print("⚠️ NASA POWER data not available, trying fallback...")
-            except Exception as e:
-                print(f"⚠️ NASA POWER API error: {e}, trying fallback...")
-                logging.error(f"NASA POWER API error: {e}")
+        frame = None
         
-        # Fallback to Open-Meteo if NASA fails or is not preferred
-        if not weather_data:
-            print("🌐 Fetching weather from Open-Meteo API...")
-            try:
-                openmeteo_data = self._fetch_openmeteo_weather(lat, lon)
-                if openmeteo_data:
-                    weather_data = openmeteo_data
-                    api_used = 'Open-Meteo'
-                    print("✅ Open-Meteo data retrieved successfully")
-            except Exception as e:
-                print(f"❌ Open-Meteo API error: {e}")
-                logging.error(f"Open-Meteo API error: {e}")
-                return None
+        # Provider order from live health: NASA POWER first unless it is slow, failing or too stale
+        order = provider_health.route() if use_nasa else ['open_meteo']
+        for provider in order:
+            frame = self._fetch_provider_frame(provider, lat, lon)
+            if frame is not None:
+                break
+            logger.info("%s data not available, trying next provider", provider)
         
-        if weather_data:
-            # Add API metadata
-            weather_data.update({
-                'api_provider': api_used,
-                'data_timestamp': datetime.now().isoformat(),
-                'coordinates': {'lat': lat, 'lon': lon}
-            })
+        if frame is not None:
+            logger.debug("Weather data ready from %s", frame.provider)
+            return frame
             
-            # Get hourly forecast
-            if api_used == 'NASA POWER':
-                hourly = self.nasa_api.get_hourly_forecast(lat, lon)
-                if hourly:
-                    weather_data['hourly'] = {
-                        'time': [h['datetime'] for h in hourly],
-                        'temperature_2m': [h['temperature'] for h in hourly],
-                        'relativehumidity_2m': [h['humidity'] for h in hourly],
-                        'windspeed_10m': [h['wind_speed'] for h in hourly],
-                        'precipitation_probability': [h['precipitation'] * 20 for h in hourly]  # Convert to probability
-                    }
-            else:
-                # Add Open-Meteo hourly data (already included)
-                pass
-                
-            print(f"🌤️ Weather data ready from {api_used}")
-            return weather_data
-            
-        print("❌ No weather data available from any source")
+        logger.warning("No weather data available from any source for (%s, %s)", lat, lon)
         return None
     
-    def _format_nasa_for_vayu(self, nasa_data: Dict, lat: float, lon: float) -> Dict[str, Any]:
+    def merged_current(self, frame: WeatherFrame) -> Dict[str, float]:
         """
-        Format NASA POWER data for VAYU compatibility
+        Current conditions of a frame with MERGED_FIELDS filled from the best source
+        
+        At most one request per other provider is made, and only for a field
+        the fetched frames cannot supply. Which provider each merged field
+        came from is recorded in frame.extras['field_sources'].
         """
-        return {
-            'current_weather': {
-                'temperature': nasa_data['temperature'],
-                'windspeed': nasa_data['wind_speed'],
-                'winddirection': 225,  # Default direction
-                'weathercode': self._get_weather_code(nasa_data['condition']),
-                'is_day': 1,
-                'time': datetime.now().isoformat()
-            },
-            'hourly': {
-                # Create synthetic hourly data based on current conditions
-                # NASA POWER provides daily data, so we'll interpolate
-                'time': [datetime.now().strftime('%Y-%m-%dT%H:00') for h in range(24)],
-                'temperature_2m': [nasa_data['temperature'] + (h % 12 - 6) * 0.5 for h in range(24)],
-                'relativehumidity_2m': [nasa_data['humidity']] * 24,
-                'windspeed_10m': [nasa_data['wind_speed']] * 24,
-                'precipitation_probability': [nasa_data['precipitation_probability']] * 24
-            },
-            'daily': {
-                'temperature_2m_max': [nasa_data['temp_max']],
-                'temperature_2m_min': [nasa_data['temp_min']],
-                'precipitation_sum': [nasa_data['precipitation']]
-            },
-            # VAYU-specific metadata
-            'location': {'lat': lat, 'lon': lon},
-            'data_source': nasa_data.get('source', 'NASA POWER'),
-            'data_quality': nasa_data.get('data_quality', 'satellite_derived'),
-            'feels_like': nasa_data.get('feels_like'),
-            'solar_irradiance': nasa_data.get('solar_irradiance'),
-            'dew_point': nasa_data.get('dew_point')
-        }
+        frames = {self.PROVIDER_KEYS[frame.provider]: frame}
+        current = dict(frame.current)
+        sources = {}
+        for field, providers in self.MERGED_FIELDS.items():
+            value, source = self._pick_field(field, providers, frames)
+            if source is None:
+                for provider in providers:
+                    if provider not in frames:
+                        frames[provider] = self._fetch_provider_frame(provider, frame.lat, frame.lon)
+                value, source = self._pick_field(field, providers, frames)
+            if source is not None:
+                current[field] = value
+                sources[field] = source
+        frame.extras['field_sources'] = sources
+        return current
+    
+    def _pick_field(self, field: str, providers: tuple, frames: Dict[str, Optional[WeatherFrame]]):
+        """(value, provider) from the first source with a usable value, else (None, None)"""
+        for provider in providers:
+            source = frames.get(provider)
+            value = source.current.get(field) if source is not None else None
+            if value is None or (not value and (provider, field) in self.ZERO_IS_MISSING):
+                continue
+            return value, provider
+        return None, None
+    
+    def _fetch_provider_frame(self, provider: str, lat: float, lon: float) -> Optional[WeatherFrame]:
+        if provider == 'nasa_power':
+            return self._fetch_nasa_frame(lat, lon)
+        return self._fetch_openmeteo_frame(lat, lon)
+    
+    def _fetch_nasa_frame(self, lat: float, lon: float) -> Optional[WeatherFrame]:
+        logger.debug("Fetching weather from NASA POWER for (%s, %s)", lat, lon)
+        try:
+            nasa_data = self.nasa_api.fetch_current_weather(lat, lon)
+            if not nasa_data:
+                return None
+            hourly = self.nasa_api.get_hourly_forecast(lat, lon)
+            frame = WeatherFrame.from_nasa(nasa_data, hourly, lat, lon)
+            frame.extras['weathercode'] = self._get_weather_code(nasa_data['condition'])
+            return frame
+        except Exception as e:
+            logger.error("NASA POWER API error: %s", e)
+            return None
+    
+    def _fetch_openmeteo_frame(self, lat: float, lon: float) -> Optional[WeatherFrame]:
+        logger.debug("Fetching weather from Open-Meteo for (%s, %s)", lat, lon)
+        try:
+            openmeteo_data = self._fetch_openmeteo_weather(lat, lon)
+            return WeatherFrame.from_openmeteo(openmeteo_data, lat, lon) if openmeteo_data else None
+        except Exception as e:
+            logger.error("Open-Meteo API error: %s", e)
+            return None
     
     def _fetch_openmeteo_weather(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
         """
         Fetch weather data from Open-Meteo API as fallback
         """
+        key = ('openmeteo_forecast', grid_cell(lat, lon, OPENMETEO_GRID))
+        return upstream_flight.do(key, lambda: self._request_openmeteo_weather(lat, lon))
+
+    def _request_openmeteo_weather(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """One upstream request (also the health probe), reported to provider_health"""
+        if not upstream_limiter.acquire('open_meteo'):
+            return None
+        started = time.perf_counter()
+        data = self._call_openmeteo_weather(lat, lon)
+        provider_health.record('open_meteo', time.perf_counter() - started, data is not None,
+                               data_age=self._openmeteo_age(data) if data else None,
+                               error=None if data else 'no usable forecast')
+        return data
+
+    def _openmeteo_age(self, data: Dict[str, Any]) -> Optional[float]:
+        """Seconds since the current_weather observation (times are in the location's zone)"""
+        try:
+            observed = datetime.strptime(data['current_weather']['time'], '%Y-%m-%dT%H:%M')
+            observed -= timedelta(seconds=data.get('utc_offset_seconds', 0))
+            return max(0.0, (datetime.utcnow() - observed).total_seconds())
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _call_openmeteo_weather(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
         try:
             url = f"{self.openmeteo_base}/forecast"
             params = {
@@ -199,12 +235,16 @@ class WeatherAPI:
                 'current_weather': 'true',
                 'hourly': 'temperature_2m,relativehumidity_2m,windspeed_10m,precipitation_probability',
                 'daily': 'temperature_2m_max,temperature_2m_min,precipitation_sum',
+                'windspeed_unit': 'ms',  # VAYU works in m/s throughout
                 'timezone': 'auto'
             }
             
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            with metrics.stage('openmeteo'):
+                response = requests.get(url, params=params, timeout=upstream_timeout(15))
+                response.raise_for_status()
+                data = response.json()
+            metrics.record_upstream('open_meteo', True)
+            log_payload(logger, 'open_meteo_forecast', data)
             
             # Add metadata for Open-Meteo
             data.update({
@@ -216,9 +256,58 @@ class WeatherAPI:
             return data
             
         except Exception as e:
-            logging.error(f"Open-Meteo API error: {e}")
+            metrics.record_upstream('open_meteo', False)
+            logger.error("Open-Meteo API error: %s", e)
             return None
     
+    def fetch_openmeteo_batch(self, points: List[tuple], batch_size: int = 100,
+                              hourly: str = 'relativehumidity_2m,precipitation_probability',
+                              forecast_days: int = 1) -> List[Optional[WeatherFrame]]:
+        """
+        Fetch current conditions for many (lat, lon) points in few requests
+        
+        Open-Meteo accepts comma-separated coordinate lists and answers with
+        one result per point, so a whole map region costs one request per
+        batch_size points instead of one per point. `hourly` and
+        `forecast_days` widen the hourly columns for callers that need them.
+        
+        Returns:
+            One WeatherFrame (or None when its batch failed) per input point
+        """
+        url = f"{self.openmeteo_base}/forecast"
+        frames: List[Optional[WeatherFrame]] = []
+        for start in range(0, len(points), batch_size):
+            batch = points[start:start + batch_size]
+            params = {
+                'latitude': ','.join(f'{lat:.4f}' for lat, _ in batch),
+                'longitude': ','.join(f'{lon:.4f}' for _, lon in batch),
+                'current_weather': 'true',
+                'hourly': hourly,
+                'windspeed_unit': 'ms',
+                'forecast_days': forecast_days
+            }
+            if not upstream_limiter.acquire('open_meteo'):
+                frames.extend([None] * len(batch))
+                continue
+            try:
+                with metrics.stage('openmeteo_batch'):
+                    response = requests.get(url, params=params, timeout=upstream_timeout(20))
+                    response.raise_for_status()
+                    data = response.json()
+                metrics.record_upstream('open_meteo_batch', True)
+            except Exception as e:
+                metrics.record_upstream('open_meteo_batch', False)
+                logger.error("Open-Meteo batch request failed (%s points): %s", len(batch), e)
+                frames.extend([None] * len(batch))
+                continue
+            
+            # A single coordinate comes back as an object rather than a list
+            results = data if isinstance(data, list) else [data]
+            for (lat, lon), result in zip(batch, results):
+                frames.append(WeatherFrame.from_openmeteo(result, lat, lon))
+            frames.extend([None] * (len(batch) - len(results)))
+        return frames
+    
     def _get_weather_code(self, condition: str) -> int:
         """
         Convert weather condition to WMO weather code
@@ -237,11 +326,16 @@ class WeatherAPI:
     def get_api_status(self) -> Dict[str, Any]:
         """
         Get status of all available weather APIs
+        
+        `status` and `live` come from provider_health (traffic and background
+        probes); `routing` is the order the next fetch would use.
         """
+        live = provider_health.snapshot()
         return {
             'primary_api': {
                 'name': 'NASA POWER',
-                'status': 'active',
+                'status': live['nasa_power']['status'],
+                'live': live['nasa_power'],
                 'description': 'Satellite-derived meteorological data',
                 'advantages': [
                     'Global satellite coverage',
@@ -258,7 +352,8 @@ class WeatherAPI:
             },
             'fallback_api': {
                 'name': 'Open-Meteo',
-                'status': 'active',
+                'status': live['open_meteo']['status'],
+                'live': live['open_meteo'],
                 'description': 'Real-time numerical weather prediction',
                 'advantages': [
                     'Real-time data',
@@ -267,7 +362,8 @@ class WeatherAPI:
                     'Fast response times'
                 ]
             },
-            'integration_strategy': 'NASA POWER primary with Open-Meteo fallback',
+            'integration_strategy': 'NASA POWER primary with Open-Meteo fallback, routed by live latency and freshness',
+            'routing': provider_health.route(record=False),
             'nasa_competition_ready': True
         }
     
@@ -328,4 +424,6 @@ class WeatherAPI:
                 'error': str(e)
             }
         
+        # Both calls above also updated the live stats the router uses
+        result['live'] = provider_health.snapshot()
         return result
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+VAYU Weather Frame
+Canonical, array-backed weather container that every provider normalizes into
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class WeatherFrame:
+    """
+    Weather for one location: scalar metadata plus aligned hourly columns
+
+    Hourly values live in float64 NumPy arrays that share the `time` index
+    (datetime64[m]). `current` holds the conditions the dashboard scores,
+    always keyed by the canonical column names in `UNITS`.
+    """
+
+    # Canonical variables and their units (wind is always m/s)
+    UNITS = {
+        'temperature': '°C',
+        'humidity': '%',
+        'wind_speed': 'm/s',
+        'precipitation_probability': '%',
+    }
+    COLUMNS = tuple(UNITS)
+
+    __slots__ = ('provider', 'data_source', 'data_quality', 'lat', 'lon', 'fetched_at',
+                 'time', 'temperature', 'humidity', 'wind_speed', 'precipitation_probability',
+                 'current', 'daily', 'extras')
+
+    def __init__(self, provider: str, lat: float, lon: float, time: np.ndarray,
+                 columns: Dict[str, np.ndarray], current: Dict[str, float],
+                 data_source: Optional[str] = None, data_quality: str = 'standard',
+                 daily: Optional[Dict[str, float]] = None, extras: Optional[Dict[str, Any]] = None):
+        self.provider = provider
+        self.data_source = data_source or provider
+        self.data_quality = data_quality
+        self.lat = lat
+        self.lon = lon
+        self.fetched_at = datetime.now()
+        self.time = np.asarray(time, dtype='datetime64[m]')
+        for name in self.COLUMNS:
+            values = np.asarray(columns.get(name, ()), dtype=np.float64)
+            if len(values) != len(self.time):
+                raise ValueError(f"column '{name}' has {len(values)} values for {len(self.time)} timestamps")
+            setattr(self, name, values)
+        self.current = current
+        self.daily = daily or {}
+        self.extras = extras or {}
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __repr__(self) -> str:
+        return f'<WeatherFrame {self.provider} ({self.lat}, {self.lon}) {len(self)}h>'
+
+    def column(self, name: str) -> np.ndarray:
+        return getattr(self, name)
+
+    def first(self, name: str, default: float) -> float:
+        """First hourly value of a column, or a default when there are no hours"""
+        values = getattr(self, name)
+        return float(values[0]) if len(values) else default
+
+    def conditions(self) -> Dict[str, float]:
+        """Current conditions in the keys ComfortCalculator.calculate expects"""
+        return {
+            'temperature': self.current['temperature'],
+            'relativehumidity_2m': self.current['humidity'],
+            'windspeed_10m': self.current['wind_speed'],
+            'precipitation_probability': self.current['precipitation_probability'],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly representation (columns become lists)"""
+        return {
+            'provider': self.provider,
+            'data_source': self.data_source,
+            'data_quality': self.data_quality,
+            'coordinates': {'lat': self.lat, 'lon': self.lon},
+            'fetched_at': self.fetched_at.isoformat(timespec='seconds'),
+            'units': self.UNITS,
+            'current': self.current,
+            'daily': self.daily,
+            'extras': self.extras,
+            'hourly': {
+                'time': np.datetime_as_string(self.time, unit='m').tolist(),
+                **{name: getattr(self, name).tolist() for name in self.COLUMNS},
+            },
+        }
+
+    # Provider normalizers -----------------------------------------------
+
+    @classmethod
+    def from_nasa(cls, daily: Dict[str, Any], hourly: Optional[Dict[str, List[Any]]],
+                  lat: float, lon: float) -> 'WeatherFrame':
+        """
+        Build a frame from NASAPowerAPI.fetch_current_weather output plus the
+        optional columnar result of NASAPowerAPI.get_hourly_forecast
+        """
+        if hourly and hourly.get('time'):
+            time = np.array(hourly['time'], dtype='datetime64[m]')
+            # NASA reports precipitation amounts; scale to a probability-like %
+            precip = np.minimum(np.asarray(hourly['precipitation'], dtype=np.float64) * 20, 100)
+            columns = {
+                'temperature': hourly['temperature'],
+                'humidity': hourly['humidity'],
+                'wind_speed': hourly['wind_speed'],
+                'precipitation_probability': precip,
+            }
+        else:
+            # Daily-only data: a single row at the observation time
+            time = np.array([datetime.now().strftime('%Y-%m-%dT%H:00')], dtype='datetime64[m]')
+            columns = {
+                'temperature': [daily['temperature']],
+                'humidity': [daily['humidity']],
+                'wind_speed': [daily['wind_speed']],
+                'precipitation_probability': [daily['precipitation_probability']],
+            }
+
+        frame = cls('NASA POWER', lat, lon, time, columns, current={},
+                    data_source=daily.get('source', 'NASA POWER'),
+                    data_quality=daily.get('data_quality', 'satellite_derived'),
+                    daily={
+                        'temp_min': daily.get('temp_min'),
+                        'temp_max': daily.get('temp_max'),
+                        'precipitation_sum': daily.get('precipitation'),
+                    },
+                    extras={
+                        'feels_like': daily.get('feels_like'),
+                        'solar_irradiance': daily.get('solar_irradiance'),
+                        'dew_point': daily.get('dew_point'),
+                        'condition': daily.get('condition'),
+                        'data_date': daily.get('date'),
+                    })
+        # Temperature and wind are the daily observation; humidity and rain
+        # chance come from the first hour when hourly data is available
+        frame.current = {
+            'temperature': daily['temperature'],
+            'humidity': frame.first('humidity', daily['humidity']),
+            'wind_speed': daily['wind_speed'],
+            'precipitation_probability': frame.first('precipitation_probability',
+                                                     daily['precipitation_probability']),
+        }
+        return frame
+
+    @classmethod
+    def from_openmeteo(cls, data: Dict[str, Any], lat: float, lon: float) -> 'WeatherFrame':
+        """Build a frame from an Open-Meteo /forecast response (wind requested in m/s)"""
+        hourly = data.get('hourly') or {}
+        times = hourly.get('time', [])
+
+        def col(name: str, default: float) -> List[float]:
+            values = hourly.get(name) or [default] * len(times)
+            return [default if v is None else v for v in values]
+
+        columns = {
+            'temperature': col('temperature_2m', 20.0),
+            'humidity': col('relativehumidity_2m', 50.0),
+            'wind_speed': col('windspeed_10m', 0.0),
+            'precipitation_probability': col('precipitation_probability', 0.0),
+        }
+        daily = data.get('daily') or {}
+
+        def first_daily(name: str) -> Optional[float]:
+            values = daily.get(name) or []
+            return values[0] if values else None
+
+        frame = cls('Open-Meteo', lat, lon, np.array(times, dtype='datetime64[m]'), columns, current={},
+                    data_source=data.get('data_source', 'Open-Meteo'),
+                    data_quality=data.get('data_quality', 'numerical_weather_model'),
+                    daily={
+                        'temp_min': first_daily('temperature_2m_min'),
+                        'temp_max': first_daily('temperature_2m_max'),
+                        'precipitation_sum': first_daily('precipitation_sum'),
+                    },
+                    extras={'weathercode': (data.get('current_weather') or {}).get('weathercode')})
+        current = data.get('current_weather') or {}
+        frame.current = {
+            'temperature': current.get('temperature', frame.first('temperature', 20.0)),
+            'humidity': frame.first('humidity', 50.0),
+            'wind_speed': current.get('windspeed', frame.first('wind_speed', 0.0)),
+            'precipitation_probability': frame.first('precipitation_probability', 0.0),
+        }
+        return frame